@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from . import checks  # noqa: F401 - регистрация проверок
+        from .metrics import instrument_connection
+
+        connection_created.connect(instrument_connection)
+        # Соединения, открытые до загрузки приложения
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection=connection)
@@ -0,0 +1,91 @@
+# avatars.py - ОБРАБОТКА АВАТАРОВ
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import StudentProfile
+from .storage import avatar_storage
+
+logger = logging.getLogger(__name__)
+
+# Поле профиля -> размер стороны квадратной миниатюры в пикселях
+AVATAR_VARIANTS = {
+    'avatar_thumb': 80,
+    'avatar_thumb_2x': 160,
+}
+AVATAR_WEBP_QUALITY = 80
+# Аватар, который меняют, пока идет обработка, обрабатывается заново не больше стольких раз
+AVATAR_MAX_ATTEMPTS = 3
+
+
+def render_avatar_variant(image, size):
+    """Квадратная миниатюра в WebP без метаданных (EXIF, ICC, GPS)"""
+    variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    variant.info = {}
+
+    buffer = BytesIO()
+    variant.save(buffer, 'WEBP', quality=AVATAR_WEBP_QUALITY, method=6)
+    return ContentFile(buffer.getvalue())
+
+
+def delete_unused_files(names):
+    """Удалить файлы аватаров, на которые не ссылается ни один профиль.
+    Хранилище адресуется содержимым: один файл может принадлежать нескольким профилям.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+    fields = ['avatar', *AVATAR_VARIANTS]
+    lookup = Q()
+    for field_name in fields:
+        lookup |= Q(**{f'{field_name}__in': names})
+    used = {name for row in StudentProfile.objects.filter(lookup).values_list(*fields) for name in row}
+    for name in names - used:
+        avatar_storage.delete(name)
+
+
+def process_avatar(profile_id):
+    """Сгенерировать миниатюры аватара профиля и сохранить их рядом с оригиналом"""
+    for _ in range(AVATAR_MAX_ATTEMPTS):
+        try:
+            profile = StudentProfile.objects.get(pk=profile_id)
+        except StudentProfile.DoesNotExist:
+            return
+        if not profile.avatar:
+            return
+
+        source_name = profile.avatar.name
+        previous = {getattr(profile, field_name).name for field_name in AVATAR_VARIANTS}
+        with profile.avatar.open('rb') as source:
+            image = Image.open(source)
+            # Учитываем поворот из EXIF до того, как метаданные будут отброшены
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        base_name = os.path.splitext(os.path.basename(source_name))[0]
+        variants = {}
+        for field_name, size in AVATAR_VARIANTS.items():
+            field = StudentProfile._meta.get_field(field_name)
+            name = field.generate_filename(profile, f'{base_name}_{size}.webp')
+            variants[field_name] = field.storage.save(name, render_avatar_variant(image, size))
+
+        # Миниатюры записываются, только если аватар не сменился за время обработки.
+        # updated_at - отметка свежести страниц кабинета (ETag)
+        saved = StudentProfile.objects.filter(pk=profile_id, avatar=source_name).update(
+            **variants, updated_at=timezone.now())
+        if saved:
+            delete_unused_files(previous - set(variants.values()))
+            logger.info("Миниатюры аватара для профиля %s готовы", profile_id)
+            return
+
+        # Пользователь загрузил новый аватар - эти миниатюры уже не нужны, обрабатываем заново
+        delete_unused_files(variants.values())
+        logger.info("Аватар профиля %s изменился во время обработки, повторяем", profile_id)
+
+    logger.warning("Аватар профиля %s менялся во время каждой из %d попыток обработки, миниатюры не созданы",
+                   profile_id, AVATAR_MAX_ATTEMPTS)
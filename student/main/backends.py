@@ -0,0 +1,25 @@
+# backends.py - АУТЕНТИФИКАЦИЯ: ПОЛЬЗОВАТЕЛЬ СЕССИИ ВМЕСТЕ С ПРОФИЛЕМ СТУДЕНТА
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class StudentProfileBackend(ModelBackend):
+    """ModelBackend, который загружает пользователя сессии вместе с профилем студента (JOIN):
+    страница кабинета получает обоих одним запросом (main/middleware.py)
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('studentprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await UserModel._default_manager.select_related('studentprofile').aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,17 @@
+# checks.py - ПРОВЕРКИ НАСТРОЕК (manage.py check --deploy)
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Паузы и лимиты ручного обновления (main/refresh.py) работают между процессами только через общий кэш"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if not backend.endswith(('LocMemCache', 'DummyCache')):
+        return []
+    return [Warning(
+        'Кэш по умолчанию хранится в памяти процесса',
+        hint='При нескольких рабочих процессах задайте REDIS_URL: иначе пауза обновления группы, '
+             'лимит нажатий студента и результаты обновлений у каждого процесса свои.',
+        id='main.W001',
+    )]
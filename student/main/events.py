@@ -0,0 +1,129 @@
+# events.py - SERVER-SENT EVENTS: УВЕДОМЛЕНИЯ ОБ ИЗМЕНЕНИИ РАСПИСАНИЯ ГРУППЫ
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Комментарий в поток раз в столько секунд, чтобы прокси не закрывали простаивающие соединения
+SSE_KEEPALIVE_SECONDS = getattr(settings, 'SSE_KEEPALIVE_SECONDS', 25)
+# Через сколько миллисекунд браузер переподключается после обрыва
+SSE_RETRY_MS = 5000
+
+
+class GroupChannel:
+    """Канал одной группы в одном цикле событий.
+
+    Все подписчики группы ждут одно общее asyncio.Event: публикация - одно set()
+    на цикл, а не запись в очередь каждого соединения. Подписчик хранит только
+    номер последней отправленной версии; пропущенные промежуточные версии не нужны -
+    клиенту достаточно последней.
+    """
+    __slots__ = ('loop', 'event', 'version', 'message', 'subscribers', 'keepalive_handle')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.version = 0
+        self.message = None
+        self.subscribers = 0
+        self.keepalive_handle = None
+
+    def notify(self, message=None):
+        """Разбудить подписчиков (вызывается в потоке цикла). message=None - только keepalive"""
+        if message is not None:
+            self.message = message
+            self.version += 1
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    def keepalive(self):
+        self.notify()
+        self.keepalive_handle = self.loop.call_later(SSE_KEEPALIVE_SECONDS, self.keepalive)
+
+
+class ScheduleBroker:
+    """Брокер уведомлений внутри процесса: (заведение, группа) -> каналы по циклам событий.
+
+    publish() можно вызывать из любого потока (синхронизация расписания идет
+    в потоках sync_to_async и фоновых задач).
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            channels = self._channels.setdefault(key, {})
+            channel = channels.get(loop)
+            if channel is None:
+                channel = channels[loop] = GroupChannel(loop)
+                channel.keepalive_handle = loop.call_later(SSE_KEEPALIVE_SECONDS, channel.keepalive)
+            channel.subscribers += 1
+        return channel
+
+    def unsubscribe(self, key, channel):
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers:
+                return
+            channels = self._channels.get(key, {})
+            if channels.get(channel.loop) is channel:
+                del channels[channel.loop]
+                if not channels:
+                    del self._channels[key]
+        channel.keepalive_handle.cancel()
+
+    def publish(self, key, payload):
+        """Отправить событие всем подписчикам группы. Возвращает число уведомленных каналов"""
+        message = json.dumps(payload, ensure_ascii=False)
+        with self._lock:
+            channels = list(self._channels.get(key, {}).values())
+        for channel in channels:
+            try:
+                channel.loop.call_soon_threadsafe(channel.notify, message)
+            except RuntimeError:
+                # Цикл событий уже закрыт - его подписчиков больше нет
+                logger.debug("Канал %s: цикл событий закрыт", key)
+        return len(channels)
+
+    def subscriber_count(self, key=None):
+        with self._lock:
+            groups = [self._channels.get(key, {})] if key is not None else list(self._channels.values())
+            return sum(channel.subscribers for channels in groups for channel in channels.values())
+
+
+broker = ScheduleBroker()
+
+
+def group_key(institution, group):
+    return institution, group
+
+
+def publish_schedule_change(institution, group, **payload):
+    return broker.publish(group_key(institution, group), {'group': group, **payload})
+
+
+async def schedule_event_stream(institution, group):
+    """Поток SSE для одного соединения: событие schedule при изменении, иначе keepalive"""
+    key = group_key(institution, group)
+    channel = broker.subscribe(key)
+    seen = channel.version
+    try:
+        yield f'retry: {SSE_RETRY_MS}\n\n'
+        while True:
+            # Версия могла смениться, пока отправлялось предыдущее сообщение
+            if channel.version == seen:
+                await channel.event.wait()
+                if channel.version == seen:
+                    yield ': keepalive\n\n'
+                    continue
+            seen = channel.version
+            yield f'event: schedule\ndata: {channel.message}\n\n'
+    finally:
+        broker.unsubscribe(key, channel)
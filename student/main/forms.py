@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
+from .avatars import delete_unused_files
+from .institutions import default_institution, institution_choices
 from .models import StudentProfile
 
 
@@ -63,6 +65,11 @@ class CustomUserCreationForm(UserCreationForm):
             'placeholder': '255077'
         })
     )
+    # Выбор показывается, только если заведений несколько
+    institution = forms.ChoiceField(
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
 
     class Meta:
         model = User
@@ -84,6 +91,11 @@ class CustomUserCreationForm(UserCreationForm):
             'class': 'form-control',
             'placeholder': 'Повторите пароль'
         })
+        self.fields['institution'].choices = institution_choices()
+        self.fields['institution'].initial = default_institution()
+
+    def clean_institution(self):
+        return self.cleaned_data['institution'] or default_institution()
 
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -92,11 +104,13 @@ class CustomUserCreationForm(UserCreationForm):
         user.last_name = self.cleaned_data['last_name']
 
         if commit:
+            # Профиль создается сигналом post_save сразу с группой и номером билета
+            user.profile_defaults = {
+                'group': self.cleaned_data['group'],
+                'student_id': self.cleaned_data['student_id'],
+                'institution': self.cleaned_data['institution'],
+            }
             user.save()
-            profile, created = StudentProfile.objects.get_or_create(user=user)
-            profile.group = self.cleaned_data['group']
-            profile.student_id = self.cleaned_data['student_id']
-            profile.save()
 
         return user
 
@@ -122,4 +136,22 @@ class ProfileUpdateForm(forms.ModelForm):
                 'class': 'form-control',
                 'accept': 'image/*'
             }),
-        }
\ No newline at end of file
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файлы прежнего аватара: после замены удаляются, если на них больше никто не ссылается
+        self.previous_avatar_files = [self.instance.avatar.name, self.instance.avatar_thumb.name,
+                                      self.instance.avatar_thumb_2x.name]
+
+    def save(self, commit=True):
+        profile = super().save(commit=False)
+        if 'avatar' in self.changed_data:
+            # Старые миниатюры больше не соответствуют аватару, пока не готовы новые - показываем оригинал
+            profile.avatar_thumb = None
+            profile.avatar_thumb_2x = None
+        if commit:
+            profile.save()
+            if 'avatar' in self.changed_data:
+                delete_unused_files(self.previous_avatar_files)
+        return profile
\ No newline at end of file
@@ -0,0 +1,110 @@
+# freshness.py - УСЛОВНЫЕ GET-ЗАПРОСЫ (ETag) ДЛЯ СТРАНИЦ КАБИНЕТА
+import hashlib
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+from .refresh import refresh_pending
+from .timetable import schedule_state
+
+
+@lru_cache(maxsize=None)
+def release():
+    """Версия кода: settings.RELEASE, иначе время изменения шаблонов и статики приложения.
+    После выкладки ETag меняется - браузер не получит 304 на страницу со старой разметкой.
+    """
+    if getattr(settings, 'RELEASE', ''):
+        return settings.RELEASE
+    app_dir = Path(__file__).resolve().parent
+    paths = [path for directory in ('templates', 'static') for path in (app_dir / directory).rglob('*')]
+    return str(max((path.stat().st_mtime_ns for path in paths), default=0))
+
+
+def profile_marker(request, profile):
+    """Профиль, оценки и зачетка студента. Отметки берутся из профиля, который middleware
+    читает из БД в каждом запросе (без кэша между запросами), - отдельных запросов нет,
+    а изменение оценки видно сразу
+    """
+    return profile.updated_at, profile.records_changed_at
+
+
+def schedule_marker(request, profile):
+    """Версия расписания группы - один агрегирующий запрос по индексу. Пустое расписание
+    страница пытается загрузить из ИСУ, такой ответ не кэшируем.
+    """
+    if not profile.group:
+        return None
+    lessons, version = schedule_state(profile.institution, profile.group)
+    return version if lessons else None
+
+
+def refresh_marker(request, profile):
+    """Запущенное студентом обновление расписания: пока его результат не показан, 304 не отвечаем"""
+    return None if refresh_pending(request.session) else 'idle'
+
+
+def page_etag(request, user, profile, markers):
+    """ETag страницы или None, если отвечать 304 нельзя"""
+    if request.method not in ('GET', 'HEAD') or profile is None:
+        return None
+    # Ожидающие уведомления выводятся в шаблоне: страницу нужно отрисовать
+    if len(messages.get_messages(request)):
+        return None
+    parts = [release(), user.pk, timezone.localdate(), request.META.get('CSRF_COOKIE', '')]
+    for marker in markers:
+        value = marker(request, profile)
+        if value is None:
+            return None
+        parts.append(value)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def _not_modified(request, etag):
+    response = get_conditional_response(request, etag=quote_etag(etag)) if etag else None
+    if response is not None:
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _with_etag(response, etag):
+    if etag and response.status_code == 200 and not response.streaming and not response.has_header('ETag'):
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(*markers):
+    """Ответить 304 до запросов и шаблонов представления, если у браузера актуальная копия.
+
+    ETag складывается из версии кода, пользователя, даты, CSRF-токена и отметок изменений
+    markers (функции (request, profile) -> значение или None). Ставится после login_required.
+    """
+    markers = (profile_marker, *markers)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                # Пользователь и профиль уже загружены login_required/middleware в асинхронном контексте
+                user, profile = await request.auser(), await request.aprofile()
+                etag = await sync_to_async(page_etag)(request, user, profile, markers)
+                not_modified = _not_modified(request, etag)
+                if not_modified is not None:
+                    return not_modified
+                return _with_etag(await view(request, *args, **kwargs), etag)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                etag = page_etag(request, request.user, request.profile, markers)
+                not_modified = _not_modified(request, etag)
+                if not_modified is not None:
+                    return not_modified
+                return _with_etag(view(request, *args, **kwargs), etag)
+        return wrapper
+    return decorator
@@ -0,0 +1,29 @@
+# institutions.py - УЧЕБНЫЕ ЗАВЕДЕНИЯ: ИСТОЧНИК РАСПИСАНИЯ И БАЗА ДАННЫХ (ШАРД) КАЖДОГО
+from django.conf import settings
+
+PRIMARY_DB = 'default'
+
+
+def default_institution():
+    return getattr(settings, 'DEFAULT_INSTITUTION', 'uust')
+
+
+def get_institution(slug=None):
+    """Настройки заведения из settings.INSTITUTIONS ({} для неизвестного)"""
+    return getattr(settings, 'INSTITUTIONS', {}).get(slug or default_institution(), {})
+
+
+def institution_choices():
+    return [(slug, config.get('name', slug)) for slug, config in getattr(settings, 'INSTITUTIONS', {}).items()]
+
+
+def institution_database(slug=None):
+    """Псевдоним БД, в которой лежат данные заведения"""
+    return get_institution(slug).get('database', PRIMARY_DB)
+
+
+def shard_databases():
+    """Отдельные базы заведений (кроме основной)"""
+    return {
+        config.get('database', PRIMARY_DB) for config in getattr(settings, 'INSTITUTIONS', {}).values()
+    } - {PRIMARY_DB}
@@ -0,0 +1,84 @@
+# isu_stub.py - ЗАГЛУШКА API ИСУ ДЛЯ НАГРУЗОЧНЫХ ТЕСТОВ И БЕНЧМАРКОВ
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+DAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+LESSON_TIMES = ['08:00-09:30', '09:45-11:15', '11:30-13:00', '13:45-15:15']
+
+
+def fake_group_schedule(group_name, lessons_per_day=3):
+    """Правдоподобное расписание группы в формате API ИСУ"""
+    return [
+        {
+            'day': day,
+            'lessons': [
+                {
+                    'time': LESSON_TIMES[n % len(LESSON_TIMES)],
+                    'subject': f'Дисциплина {(day_index * lessons_per_day + n) % 12}',
+                    'type': 'Лекция' if n % 2 == 0 else 'Практика',
+                    'teacher': f'Преподаватель {(day_index + n) % 8}',
+                    'room': f'{300 + (day_index * 7 + n) % 20}',
+                    'week_type': '',
+                }
+                for n in range(lessons_per_day)
+            ],
+        }
+        for day_index, day in enumerate(DAYS)
+    ]
+
+
+class ISUStubServer:
+    """HTTP-сервер, отвечающий как API ИСУ, с настраиваемой задержкой ответа"""
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        stub = self
+        self.delay = delay
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if stub.delay:
+                    time.sleep(stub.delay)
+                path = unquote(self.path.split('?')[0]).rstrip('/')
+                if path.endswith('/groups'):
+                    body = [f'ГР-{i:03d}' for i in range(50)]
+                elif '/schedule/group/' in path:
+                    body = fake_group_schedule(path.rsplit('/', 1)[-1])
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/api'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='isu-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
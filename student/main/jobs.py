@@ -0,0 +1,184 @@
+# jobs.py - ОТЛОЖЕННЫЕ ЗАДАЧИ
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .models import Course, Grade, RealSchedule, normalize_subject
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Очередь фоновых задач с дедупликацией по ключу.
+
+    Задача с ключом, который уже ожидает в очереди или выполняется,
+    повторно не ставится. При JOBS_EAGER = True задачи выполняются сразу
+    (удобно для тестов и management-команд).
+
+    Очередь живет в памяти процесса, потоки - демоны: при перезапуске
+    ожидающие задачи теряются, а дедупликация работает только внутри
+    одного процесса. Поэтому задачи должны быть идемпотентны и сами
+    защищаться от параллельного запуска в других процессах (см.
+    ensure_group_schedule); потерянная загрузка расписания догоняется
+    следующей регистрацией, ручным обновлением или прогревом
+    (manage.py warmup --fetch-missing).
+    """
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, key, func, *args, **kwargs):
+        """Поставить задачу в очередь. Возвращает False, если такая задача уже есть"""
+        if getattr(settings, 'JOBS_EAGER', False):
+            self._run(key, func, args, kwargs)
+            return True
+
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            self._start_workers()
+
+        self._queue.put((key, func, args, kwargs))
+        return True
+
+    def join(self):
+        """Дождаться выполнения всех поставленных задач"""
+        self._queue.join()
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f'jobs-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            key, func, args, kwargs = self._queue.get()
+            try:
+                self._run(key, func, args, kwargs)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
+
+    @staticmethod
+    def _run(key, func, args, kwargs):
+        close_old_connections()
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception("Ошибка фоновой задачи %s", key)
+        finally:
+            close_old_connections()
+
+
+job_queue = JobQueue(workers=getattr(settings, 'JOBS_WORKERS', 2))
+
+
+def create_sample_data(user_id):
+    """Создание тестовых данных для нового пользователя"""
+    # Создаем курсы на основе реального расписания
+    courses_data = [
+        {'name': 'Алгебра и геометрия', 'teacher': 'Белова Анна Сергеевна'},
+        {'name': 'Основы информационных технологий', 'teacher': 'Сметанина Ольга Николаевна'},
+        {'name': 'Программно-аппаратные комплексы', 'teacher': 'Костюкова Анастасия Петровна'},
+        {'name': 'Математический анализ', 'teacher': 'Кужаев Арсен Фанилевич'},
+        {'name': 'Иностранный язык', 'teacher': ''},
+        {'name': 'Физическая культура и спорт', 'teacher': ''},
+    ]
+
+    courses = {}
+    for course_data in courses_data:
+        course, created = Course.objects.get_or_create(
+            normalized_name=normalize_subject(course_data['name']),
+            defaults={
+                'name': course_data['name'],
+                'code': f"АВТО-{course_data['name'][:8]}",
+                'teacher': course_data['teacher'],
+                'hours': 36,
+                'description': 'Автоматически созданный курс'
+            }
+        )
+        courses[course_data['name']] = course
+
+    # Создаем тестовые оценки
+    course1 = courses['Алгебра и геометрия']
+    course2 = courses['Основы информационных технологий']
+    course3 = courses['Программно-аппаратные комплексы']
+
+    Grade.objects.get_or_create(
+        student_id=user_id, course=course1,
+        work_type='Лабораторная работа #1', grade=5, date='2024-10-15'
+    )
+    Grade.objects.get_or_create(
+        student_id=user_id, course=course1,
+        work_type='Лабораторная работа #2', grade=5, date='2024-10-22'
+    )
+    Grade.objects.get_or_create(
+        student_id=user_id, course=course2,
+        work_type='SQL запросы', grade=5, date='2024-10-10'
+    )
+    Grade.objects.get_or_create(
+        student_id=user_id, course=course3,
+        work_type='Практическая работа', grade=4, date='2024-10-05'
+    )
+
+
+# Загрузка расписания группы в работе; ключ в кэше Django - общий для процессов при общем кэше (REDIS_URL),
+# тайм-аут - страховка от упавшего процесса
+GROUP_SCHEDULE_LOCK_TIMEOUT = 2 * 60
+
+
+def group_schedule_lock_key(institution, group):
+    return f'group_schedule:lock:{institution}:{group}'
+
+
+def ensure_group_schedule(group, institution=None):
+    """Загрузить расписание группы, если его ещё нет в базе.
+    Одновременный вызов для той же группы в другом процессе пропускается.
+    """
+    from .parsers import ISUScheduleParser
+
+    schedule = RealSchedule.objects.for_institution(institution).filter(group=group)
+    if schedule.exists():
+        return
+
+    key = group_schedule_lock_key(institution, group)
+    if not cache.add(key, True, GROUP_SCHEDULE_LOCK_TIMEOUT):
+        logger.info("Расписание для %s уже загружается", group)
+        return
+    try:
+        # Другой процесс мог закончить загрузку, пока мы проверяли
+        if schedule.exists():
+            return
+        success, message = ISUScheduleParser.update_schedule_for_group(group, institution)
+    finally:
+        cache.delete(key)
+    if success:
+        logger.info("Расписание для %s загружено в фоне", group)
+    else:
+        logger.warning("Не удалось загрузить расписание для %s: %s", group, message)
+
+
+def schedule_post_registration(user_id, group, institution=None):
+    """Поставить в очередь обработку нового пользователя: тестовые данные и расписание группы"""
+    job_queue.submit(('sample_data', user_id), create_sample_data, user_id)
+    if group:
+        # Один запрос к ИСУ на группу, сколько бы студентов ни регистрировалось одновременно
+        job_queue.submit(('group_schedule', institution, group), ensure_group_schedule, group, institution)
+
+
+def schedule_avatar_processing(profile_id):
+    """Поставить в очередь генерацию миниатюр аватара"""
+    from .avatars import process_avatar
+
+    job_queue.submit(('avatar', profile_id), process_avatar, profile_id)
@@ -0,0 +1,94 @@
+# logutils.py - ЛОГИРОВАНИЕ: ПОЛЯ КЛЮЧ=ЗНАЧЕНИЕ, ВЫБОРОЧНЫЕ INFO-СООБЩЕНИЯ, СБОИ ПО ГРУППАМ
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Атрибуты, которые есть у любой записи лога; все прочие пришли через extra={...}
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_sampled = ContextVar('log_sampled', default=None)
+
+
+@contextmanager
+def sampled_call(rate):
+    """Решить один раз на операцию (запрос к ИСУ, синхронизацию группы), пишем ли ее INFO/DEBUG.
+    Так в лог попадают все сообщения выбранной операции, а не случайные строки разных.
+    """
+    if _sampled.get() is not None:
+        # Вложенная операция наследует решение внешней
+        yield
+        return
+    token = _sampled.set(random.random() < rate)
+    try:
+        yield
+    finally:
+        _sampled.reset(token)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает WARNING и выше всегда, INFO/DEBUG - только у операций, попавших в выборку"""
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or _sampled.get() is not False
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Стандартная строка лога + поля из extra в виде ключ=значение (удобно искать и агрегировать)"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = ' '.join(
+            f'{key}={value}' for key, value in vars(record).items()
+            if key not in _STANDARD_ATTRS and not key.startswith('_')
+        )
+        return f'{line} {fields}' if fields else line
+
+
+class GroupFailureLog:
+    """Сбои загрузки расписания по группам: одно сообщение на группу за interval секунд,
+    повторные сбои за это время только считаются и попадают в следующее сообщение.
+
+    Группы хранятся в порядке последнего сообщения: группы с истекшим окном вытесняются
+    (их несообщенные повторы теряются), а всего помнится не больше max_groups групп.
+    """
+
+    def __init__(self, logger, interval=300, max_groups=10000):
+        self.logger = logger
+        self.interval = interval
+        self.max_groups = max_groups
+        self._groups = OrderedDict()
+        self._lock = threading.Lock()
+
+    def failed(self, group, attempts):
+        """attempts - [(форма эндпоинта, код ответа или тип ошибки), ...]"""
+        now = time.monotonic()
+        with self._lock:
+            logged_at, suppressed = self._groups.get(group, (None, 0))
+            if logged_at is not None and now - logged_at < self.interval:
+                self._groups[group] = (logged_at, suppressed + 1)
+                return False
+            self._groups[group] = (now, 0)
+            self._groups.move_to_end(group)
+            self._evict(now)
+
+        self.logger.warning(
+            "Расписание группы %s не получено: %s; повторных сбоев с прошлого сообщения: %d",
+            group, ', '.join(f'{endpoint} -> {outcome}' for endpoint, outcome in attempts), suppressed,
+            extra={'group': group, 'attempts': len(attempts)},
+        )
+        return True
+
+    def succeeded(self, group):
+        with self._lock:
+            self._groups.pop(group, None)
+
+    def _evict(self, now):
+        while self._groups:
+            logged_at, _ = next(iter(self._groups.values()))
+            if now - logged_at < self.interval and len(self._groups) <= self.max_groups:
+                break
+            self._groups.popitem(last=False)
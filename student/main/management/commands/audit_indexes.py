@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from main.perf import seed_dataset, temporary_database
+from main.queryplan import audit_pages
+
+AUDITED_PAGES = ['dashboard', 'courses', 'grades', 'schedule', 'schedule_json', 'tasks', 'record_book']
+
+
+class Command(BaseCommand):
+    help = ('Аудит индексов: SQL страниц кабинета на заполненной временной БД, EXPLAIN каждого запроса, '
+            'полные просмотры таблиц и сортировки без индекса с предложением составного индекса')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--grades', type=int, default=200, help='Оценок на студента')
+        parser.add_argument('--fail', action='store_true', help='Код возврата 1, если найдены проблемы (для CI)')
+
+    def handle(self, *args, **options):
+        from django.urls import reverse
+
+        with temporary_database():
+            user = seed_dataset(students=options['students'], courses=200, groups=20,
+                                grades_per_student=options['grades'], lessons_per_group=30,
+                                tasks_per_student=50)[0]
+            client = Client(SERVER_NAME='localhost')
+            client.force_login(user)
+            cache.clear()
+            report = audit_pages(client, [reverse(name) for name in AUDITED_PAGES])
+
+        total = 0
+        for url, issues in report.items():
+            if not issues:
+                self.stdout.write(f'{url}: ' + self.style.SUCCESS('OK'))
+                continue
+            # Сортировки, которым существующий индекс не поможет, в итог не входят
+            total += sum(1 for issue in issues if not issue.covered_by())
+            self.stdout.write(self.style.WARNING(f'{url}: проблем - {len(issues)}'))
+            for issue in issues:
+                what = 'полный просмотр' if issue.kind == 'scan' else 'сортировка без индекса'
+                self.stdout.write(f'  {what} {issue.table}: {issue.detail}')
+                self.stdout.write(f'    {issue.sql[:200]}')
+                covered_by = issue.covered_by()
+                if covered_by:
+                    self.stdout.write(f'    индекс уже есть ({covered_by}): сортировка из-за IN по нескольким значениям')
+                elif issue.suggestion:
+                    self.stdout.write(f'    индекс: {issue.index_hint()}')
+
+        if total and options['fail']:
+            raise CommandError(f'Найдено проблем в планах запросов: {total}')
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Полных просмотров и сортировок без индекса нет'))
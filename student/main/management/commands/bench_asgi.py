@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from main.isu_stub import ISUStubServer
+from main.models import RealSchedule
+from main.parsers import ISUScheduleParser
+from main.perf import percentile, seed_dataset, temporary_database
+
+
+class Command(BaseCommand):
+    help = ('Сравнить пропускную способность WSGI (пул потоков) и ASGI (один цикл событий) '
+            'при медленном API ИСУ. Оба обработчика Django вызываются в этом же процессе, '
+            'без внешних серверов; данные - во временной БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100, help='Одновременных студентов')
+        parser.add_argument('--delay', type=float, default=0.5, help='Задержка ответа ИСУ, с')
+        parser.add_argument('--wsgi-workers', type=int, default=8,
+                            help='Потоков WSGI-сервера (например, gunicorn --threads)')
+        # schedule - у групп нет расписания, каждый запрос ждет ИСУ; dashboard - без ИСУ.
+        # update_schedule не подходит: он только ставит обновление в очередь
+        parser.add_argument('--view', choices=['schedule', 'dashboard'], default='schedule')
+
+    def handle(self, *args, **options):
+        # Все запросы здесь медленные по определению - не засоряем вывод
+        logging.getLogger('main.metrics.slow').setLevel(logging.ERROR)
+        # Файловая БД: к ней обращаются и потоки WSGI, и поток sync_to_async
+        with tempfile.TemporaryDirectory() as tmp:
+            database = settings.DATABASES['default']
+            database.setdefault('TEST', {})['NAME'] = os.path.join(tmp, 'bench.sqlite3')
+            # Временная база: fsync не нужен, замеряем ожидание ИСУ, а не диск
+            database.setdefault('OPTIONS', {})['init_command'] = 'PRAGMA synchronous=OFF; PRAGMA journal_mode=WAL;'
+            # Синхронизации групп пишут одновременно: как в рабочем режиме (settings.SQLITE_PRODUCTION_OPTIONS)
+            # транзакция сразу берет блокировку записи и ждет очереди, а не падает с "database is locked"
+            database['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=20)
+            with override_settings(ALLOWED_HOSTS=['testserver']), temporary_database(), \
+                    ISUStubServer(delay=options['delay']) as stub:
+                ISUScheduleParser.BASE_URL = stub.base_url
+                self.run(options)
+
+    def run(self, options):
+        students = seed_dataset(students=options['students'], courses=30, groups=options['students'],
+                                grades_per_student=20, lessons_per_group=0)
+        url = reverse(options['view'])
+        self.stdout.write(f'{options["view"]}: {len(students)} студентов, задержка ИСУ {options["delay"]} с')
+
+        latencies, elapsed = self.bench_wsgi(students, url, options['wsgi_workers'])
+        self.report(f'WSGI, {options["wsgi_workers"]} потоков', latencies, elapsed)
+
+        # Загруженные расписания удаляем: ASGI тоже должен ждать ИСУ
+        RealSchedule.objects.all().delete()
+        latencies, elapsed = asyncio.run(self.bench_asgi(students, url))
+        self.report('ASGI, 1 цикл событий', latencies, elapsed)
+
+    @staticmethod
+    def bench_wsgi(students, url, workers):
+        clients = []
+        for student in students:
+            client = Client()
+            client.force_login(student)
+            clients.append(client)
+
+        def timed_get(client):
+            started = time.perf_counter()
+            client.get(url)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = list(pool.map(timed_get, clients))
+        return latencies, time.perf_counter() - started
+
+    @staticmethod
+    async def bench_asgi(students, url):
+        clients = []
+        for student in students:
+            client = AsyncClient()
+            await client.aforce_login(student)
+            clients.append(client)
+
+        async def timed_get(client):
+            started = time.perf_counter()
+            await client.get(url)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed_get(client) for client in clients))
+        return latencies, time.perf_counter() - started
+
+    def report(self, title, latencies, elapsed):
+        values = [seconds * 1000 for seconds in latencies]
+        self.stdout.write(
+            f'{title:<24} {len(values) / elapsed:>7.1f} запр/с   '
+            f'p50 {percentile(values, 50):>7.0f} мс   p95 {percentile(values, 95):>7.0f} мс'
+        )
@@ -0,0 +1,39 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from main.perf import seed_dataset, temporary_database
+
+CABINET_PAGES = ['dashboard', 'courses', 'grades', 'schedule', 'tasks', 'record_book']
+
+
+class Command(BaseCommand):
+    help = 'Замер времени ответа страниц кабинета (медиана) на заполненной временной БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        from django.urls import reverse
+
+        iterations = options['iterations']
+        with temporary_database():
+            user = seed_dataset(students=1, courses=30, grades_per_student=40)[0]
+            client = Client(SERVER_NAME='localhost')
+            client.force_login(user)
+
+            self.stdout.write(f'{"страница":<14}{"медиана, мс":>16}')
+            for name in CABINET_PAGES:
+                self.stdout.write(f'{name:<14}{self.measure(client, reverse(name), iterations):>16.2f}')
+
+    @staticmethod
+    def measure(client, url, iterations):
+        client.get(url)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            client.get(url)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
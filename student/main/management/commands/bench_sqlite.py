@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+from django.db.models import Avg, Count
+
+from main.isu_stub import fake_group_schedule
+from main.models import Grade, RealSchedule
+from main.parsers import ISUScheduleParser
+from main.perf import percentile, seed_dataset, temporary_database
+
+PROFILES = {
+    # Настройки Django по умолчанию: журнал отката, новое соединение на каждый запрос
+    'default': ({}, 0),
+    'production': (settings.SQLITE_PRODUCTION_OPTIONS, 600),
+}
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность чтения SQLite во время синхронизации расписания: '
+            'настройки по умолчанию против рабочего режима (WAL, pragma, постоянные соединения)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Потоков-читателей')
+        parser.add_argument('--duration', type=float, default=10.0, help='Длительность каждого прогона, с')
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--profile', choices=[*PROFILES, 'both'], default='both')
+
+    def handle(self, *args, **options):
+        profiles = list(PROFILES) if options['profile'] == 'both' else [options['profile']]
+        database = settings.DATABASES['default']
+        saved = {key: database.get(key) for key in ('OPTIONS', 'CONN_MAX_AGE', 'TEST')}
+
+        self.stdout.write(f'{"режим":<12}{"чтений/с":>10}{"p50, мс":>9}{"p95, мс":>9}{"p99, мс":>9}'
+                          f'{"ошибок":>8}{"синхр/с":>9}{"синхр p95":>11}{"ошибок":>8}')
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for name in profiles:
+                    db_options, max_age = PROFILES[name]
+                    database.update(OPTIONS=dict(db_options), CONN_MAX_AGE=max_age)
+                    database['TEST'] = {**saved['TEST'], 'NAME': os.path.join(tmp, f'{name}.sqlite3')}
+                    connections['default'].close()
+                    with temporary_database():
+                        self.report(name, self.run(options))
+        finally:
+            database.update(saved)
+
+    def run(self, options):
+        students = seed_dataset(students=200, courses=50, groups=options['groups'],
+                                grades_per_student=50, lessons_per_group=30)
+        groups = [f'ГР-{i:03d}' for i in range(options['groups'])]
+        stop = threading.Event()
+        reads, read_errors, writes, write_errors = [], [], [], []
+
+        def reader(number):
+            student = students[number % len(students)]
+            group = groups[number % len(groups)]
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    list(RealSchedule.objects.filter(group=group).order_by('day', 'time_start'))
+                    Grade.objects.filter(student=student).aggregate(total=Count('id'), avg=Avg('grade'))
+                    reads.append(time.perf_counter() - started)
+                except OperationalError:
+                    read_errors.append(1)
+                # Конец "запроса": при CONN_MAX_AGE = 0 соединение закрывается, как в Django
+                close_old_connections()
+
+        def writer():
+            n = 0
+            while not stop.is_set():
+                group = groups[n % len(groups)]
+                started = time.perf_counter()
+                # Чередуем число пар: неизменившееся расписание не перезаписывается
+                lessons = fake_group_schedule(group, 4 + (n // len(groups)) % 2)
+                success, _ = ISUScheduleParser.save_group_schedule(group, lessons)
+                (writes if success else write_errors).append(time.perf_counter() - started)
+                close_old_connections()
+                n += 1
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(options['readers'])]
+        threads.append(threading.Thread(target=writer))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for connection in connections.all():
+            connection.close()
+        return time.perf_counter() - started, reads, read_errors, writes, write_errors
+
+    def report(self, name, result):
+        elapsed, reads, read_errors, writes, write_errors = result
+        reads_ms = [seconds * 1000 for seconds in reads]
+        writes_ms = [seconds * 1000 for seconds in writes]
+        self.stdout.write(
+            f'{name:<12}{len(reads) / elapsed:>10.1f}{percentile(reads_ms, 50):>9.1f}'
+            f'{percentile(reads_ms, 95):>9.1f}{percentile(reads_ms, 99):>9.1f}{len(read_errors):>8}'
+            f'{len(writes) / elapsed:>9.1f}{percentile(writes_ms, 95):>11.1f}{len(write_errors):>8}'
+        )
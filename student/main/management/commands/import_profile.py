@@ -0,0 +1,68 @@
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Что делает рабочий процесс до первого запроса: настройка Django и загрузка URLconf
+STARTUP_CODE = '''
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().reverse_dict
+{extra}
+'''
+# Модули, которые не должны загружаться при старте (подгружаются при первом обращении)
+LAZY_MODULES = ['main.parsers', 'requests', 'httpx', 'PIL']
+
+
+class Command(BaseCommand):
+    help = ('Профиль импорта при старте рабочего процесса (python -X importtime): '
+            'самые тяжелые пакеты и модули проекта, проверка отложенных импортов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--warmup', action='store_true', help='Включить в профиль прогрев (main.warmup.warm_up)')
+
+    def handle(self, *args, **options):
+        extra = 'from main.warmup import warm_up\nwarm_up()' if options['warmup'] else ''
+        code = STARTUP_CODE.format(settings_module=settings.SETTINGS_MODULE, extra=extra)
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode:
+            self.stderr.write(result.stderr[-2000:])
+            return
+
+        modules = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+
+        packages = defaultdict(int)
+        for name, (self_us, _) in modules.items():
+            packages[name.split('.')[0]] += self_us
+        total = sum(packages.values())
+
+        self.stdout.write(f'Импортировано модулей: {len(modules)}, всего {total / 1000:.0f} мс')
+        self.stdout.write('\nПакеты (собственное время модулей):')
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {package:<40}{self_us / 1000:>8.1f} мс')
+
+        self.stdout.write('\nМодули проекта (с учетом вложенных импортов):')
+        project = [(name, cumulative) for name, (_, cumulative) in modules.items()
+                   if name.split('.')[0] in ('main', 'student')]
+        for name, cumulative_us in sorted(project, key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {name:<40}{cumulative_us / 1000:>8.1f} мс')
+
+        if options['warmup']:
+            return
+        loaded = [name for name in LAZY_MODULES if name in modules]
+        if loaded:
+            self.stdout.write(self.style.WARNING(f'\nПри старте загружаются отложенные модули: {", ".join(loaded)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nОтложенные модули при старте не загружаются'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.isu_stub import ISUStubServer
+
+
+class Command(BaseCommand):
+    help = 'Запустить заглушку API ИСУ (для нагрузочных тестов и бенчмарков)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--delay', type=float, default=0.0, help='Задержка ответа в секундах')
+
+    def handle(self, *args, **options):
+        with ISUStubServer(options['host'], options['port'], options['delay']) as stub:
+            self.stdout.write(f'Заглушка ИСУ: {stub.base_url}')
+            self.stdout.write(f'Запустите сервер с ISU_API_BASE_URL={stub.base_url}')
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
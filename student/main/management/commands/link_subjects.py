@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main.models import SubjectCourseLink
+from main.subjects import link_schedule
+
+
+class Command(BaseCommand):
+    help = 'Связать предметы расписания с курсами (после миграции или изменения справочника курсов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='Только для указанной группы')
+        parser.add_argument('--reset', action='store_true', help='Забыть все сопоставления и построить их заново')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            SubjectCourseLink.objects.all().delete()
+
+        updated = link_schedule(options['group'])
+        linked = SubjectCourseLink.objects.filter(course__isnull=False).count()
+        unmatched = SubjectCourseLink.objects.filter(course__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено занятий: {updated}. Предметов с курсом: {linked}, без курса: {unmatched}'
+        ))
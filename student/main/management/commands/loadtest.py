@@ -0,0 +1,196 @@
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from main.perf import SEED_PASSWORD, percentile, seed_dataset
+
+LOAD_USER_PREFIX = 'load'
+
+# Сценарии: (имя URL, вес). registration - отдельный сценарий с созданием аккаунтов
+SCENARIOS = {
+    # Утро: все смотрят расписание перед парами
+    'morning': [('schedule', 70), ('dashboard', 20), ('tasks', 10)],
+    # Конец сессии: оценки и зачётка
+    'session': [('grades', 45), ('record_book', 35), ('dashboard', 20)],
+    'mixed': [('dashboard', 25), ('schedule', 25), ('grades', 20), ('record_book', 10),
+              ('courses', 10), ('tasks', 5), ('settings', 5)],
+}
+
+
+def response_ok(response, method):
+    """Успех запроса. POST формы - только редирект после успеха (форма с ошибками приходит
+    с 200). GET - 200, но не страница входа после редиректа: сессия потеряна, и login_required
+    отправил клиента на вход вместо измеряемой страницы.
+    """
+    login_path = reverse('login')
+    if method == 'POST':
+        return response.status_code == 302 and urlsplit(response.headers.get('Location', '')).path != login_path
+    return response.status_code == 200 and not (response.history and urlsplit(response.url).path == login_path)
+
+
+class Results:
+    """Задержки и ошибки по каждому эндпоинту, общие для всех потоков"""
+
+    def __init__(self, with_traffic=True):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+        # Вход в систему учитывается отдельно от измеряемого трафика
+        self.traffic = Results(with_traffic=False) if with_traffic else None
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+
+class VirtualStudent:
+    """Один синтетический студент со своей сессией"""
+
+    def __init__(self, base_url, results):
+        self.base_url = base_url.rstrip('/')
+        self.results = results
+        self.session = requests.Session()
+
+    def request(self, name, path, method='GET', data=None):
+        url = self.base_url + path
+        started = time.perf_counter()
+        try:
+            if method == 'POST':
+                data = {**data, 'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', '')}
+                response = self.session.post(url, data=data, headers={'Referer': url}, allow_redirects=False)
+            else:
+                response = self.session.get(url)
+            ok = response_ok(response, method)
+        except requests.RequestException:
+            ok = False
+        self.results.record(name, time.perf_counter() - started, ok)
+        return ok
+
+    def login(self, username, password):
+        self.request('login_page', reverse('login'))
+        return self.request('login', reverse('login'), 'POST', {'username': username, 'password': password})
+
+    def register(self, group):
+        username = f'reg{uuid.uuid4().hex[:12]}'
+        self.request('register_page', reverse('register'))
+        return self.request('register', reverse('register'), 'POST', {
+            'username': username, 'email': f'{username}@example.com',
+            'first_name': 'Нагрузка', 'last_name': 'Тестовый', 'group': group, 'student_id': '000000',
+            'password1': SEED_PASSWORD + '-Reg1', 'password2': SEED_PASSWORD + '-Reg1',
+        })
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест кабинета: синтетические студенты входят и воспроизводят сценарий '
+            'трафика, в конце - пропускная способность и p50/p95/p99 по эндпоинтам. '
+            'Сервер запускайте с заглушкой ИСУ (manage.py isu_stub).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--scenario', choices=[*SCENARIOS, 'registration'], default='mixed')
+        parser.add_argument('--users', type=int, default=50, help='Число синтетических студентов')
+        parser.add_argument('--concurrency', type=int, default=10, help='Число одновременных клиентов')
+        parser.add_argument('--duration', type=float, default=30.0, help='Длительность в секундах')
+        parser.add_argument('--think', type=float, default=0.0, help='Макс. пауза между запросами, с')
+        parser.add_argument('--prepare', action='store_true',
+                            help='Создать синтетических студентов и данные в текущей БД')
+
+    def handle(self, *args, **options):
+        if options['prepare']:
+            self.prepare(options['users'])
+
+        results = Results()
+        clock = {}
+        failures = []
+        # Сначала все клиенты входят в систему, замер трафика начинается после входа последнего
+        start_barrier = threading.Barrier(
+            options['concurrency'], action=lambda: clock.update(started=time.perf_counter()))
+        workers = [
+            threading.Thread(target=self.run_client, args=(n, options, results, start_barrier, clock, failures),
+                             daemon=True)
+            for n in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # Причина - ошибка клиента, а не сломанный барьер, на котором ждали остальные
+        failures = [e for e in failures if not isinstance(e, threading.BrokenBarrierError)] or failures
+        if failures:
+            if isinstance(failures[0], CommandError):
+                raise failures[0]
+            raise CommandError(f'Ошибка клиента нагрузки: {failures[0]!r}') from failures[0]
+        self.report(results, time.perf_counter() - clock['started'])
+
+    def prepare(self, users):
+        if User.objects.filter(username__startswith=LOAD_USER_PREFIX).exists():
+            self.stdout.write('Синтетические студенты уже созданы')
+            return
+        seed_dataset(students=users, username_prefix=LOAD_USER_PREFIX)
+        self.stdout.write(f'Создано синтетических студентов: {users}')
+
+    def run_client(self, number, options, results, start_barrier, clock, failures):
+        """Поток клиента: ошибка передается в основной поток, остальные клиенты не ждут старта"""
+        try:
+            self.replay(number, options, results, start_barrier, clock)
+        except Exception as e:
+            failures.append(e)
+            start_barrier.abort()
+
+    def replay(self, number, options, results, start_barrier, clock):
+        rng = random.Random(number)
+        scenario = options['scenario']
+        student = VirtualStudent(options['base_url'], results)
+
+        if scenario != 'registration':
+            names, weights = zip(*SCENARIOS[scenario])
+            paths = {name: reverse(name) for name in names}
+            username = f'{LOAD_USER_PREFIX}{number % options["users"]}'
+            if not student.login(username, SEED_PASSWORD):
+                raise CommandError(f'Не удалось войти как {username}; запустите с --prepare')
+            student.results = results.traffic
+
+        start_barrier.wait()
+        deadline = clock['started'] + options['duration']
+
+        while time.perf_counter() < deadline:
+            if scenario == 'registration':
+                VirtualStudent(options['base_url'], results.traffic).register(f'ГР-{rng.randrange(5):03d}')
+            else:
+                name = rng.choices(names, weights)[0]
+                student.request(name, paths[name])
+            self.think(rng, options['think'])
+
+    @staticmethod
+    def think(rng, max_pause):
+        if max_pause:
+            time.sleep(rng.uniform(0, max_pause))
+
+    def report(self, results, elapsed):
+        if results.latencies:
+            logins = [seconds * 1000 for seconds in results.latencies['login']]
+            self.stdout.write(f'Вход: {len(logins)} студентов, p50 {percentile(logins, 50):.0f} мс, '
+                              f'ошибок {sum(results.errors.values())}')
+
+        traffic = results.traffic
+        total = sum(len(values) for values in traffic.latencies.values())
+        self.stdout.write(f'\nЗапросов: {total} за {elapsed:.1f} с, {total / elapsed:.1f} запр/с')
+        self.stdout.write(f'{"эндпоинт":<16}{"запросов":>9}{"ошибок":>8}{"запр/с":>9}'
+                          f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}')
+        for name in sorted(traffic.latencies):
+            values = [seconds * 1000 for seconds in traffic.latencies[name]]
+            self.stdout.write(
+                f'{name:<16}{len(values):>9}{traffic.errors[name]:>8}{len(values) / elapsed:>9.1f}'
+                f'{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}{percentile(values, 99):>10.1f}'
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from main.avatars import process_avatar
+from main.models import StudentProfile
+
+
+class Command(BaseCommand):
+    help = 'Сгенерировать миниатюры для аватаров, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Пересоздать миниатюры для всех аватаров')
+
+    def handle(self, *args, **options):
+        profiles = StudentProfile.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            profiles = profiles.filter(avatar_thumb__isnull=True)
+
+        processed = 0
+        for profile_id in profiles.values_list('pk', flat=True).iterator():
+            process_avatar(profile_id)
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано аватаров: {processed}'))
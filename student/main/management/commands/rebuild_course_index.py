@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from main.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать полнотекстовый индекс курсов (например, после массовых изменений через QuerySet.update или SQL)'
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING('FTS5 недоступен, поиск работает без индекса'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано курсов: {rebuild_index()}'))
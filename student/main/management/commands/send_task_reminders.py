@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from main.tasks import ReminderScheduler, process_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Отправить напоминания о приближающихся дедлайнах заданий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, просыпаясь к ближайшему напоминанию')
+        parser.add_argument('--poll', type=float, default=60.0,
+                            help='Как часто (в секундах) проверять новые задания в режиме --loop')
+        parser.add_argument('--batch-size', type=int, help='Напоминаний в одной пачке')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            sent = process_due_reminders(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Отправлено напоминаний: {sent}'))
+            return
+
+        scheduler = ReminderScheduler(batch_size=options['batch_size'])
+        poll = timedelta(seconds=options['poll'])
+        try:
+            while True:
+                now = timezone.now()
+                # Подгружаем все, что наступит до следующей проверки, и спим до ближайшего срока
+                scheduler.refill(now + poll)
+                sent = scheduler.run_due(now)
+                if sent:
+                    self.stdout.write(f'{now:%H:%M:%S} отправлено напоминаний: {sent}')
+                close_old_connections()
+
+                wake_at = min(filter(None, [scheduler.next_due(), now + poll]))
+                time.sleep(max(0.0, (wake_at - timezone.now()).total_seconds()))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main.routers import PRIMARY_DB, replica_aliases
+
+
+class Command(BaseCommand):
+    help = ('Обновить реплики SQLite копией основной базы (локальная замена репликации). '
+            'Копия делается через backup API и согласована даже при идущей записи.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Повторять каждые N секунд (имитация асинхронной репликации с отставанием)')
+
+    def handle(self, *args, **options):
+        replicas = replica_aliases()
+        if not replicas:
+            raise CommandError('Реплики не настроены: укажите DATABASE_REPLICAS=путь1,путь2')
+        if connections[PRIMARY_DB].vendor != 'sqlite':
+            raise CommandError('Команда только для SQLite; для других СУБД используйте их репликацию')
+
+        while True:
+            for alias in replicas:
+                started = time.perf_counter()
+                self.copy(connections[PRIMARY_DB].settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+                self.stdout.write(f'{alias}: обновлена за {(time.perf_counter() - started) * 1000:.0f} мс')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def copy(source_path, target_path):
+        source = sqlite3.connect(str(source_path))
+        target = sqlite3.connect(str(target_path))
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main.warmup import HOT_GROUPS, warm_up
+
+
+class Command(BaseCommand):
+    help = ('Прогреть кэши: шаблоны, парсер ИСУ, каталог групп и расписания самых многочисленных групп. '
+            'Рабочие процессы прогреваются сами при старте (WARMUP_ON_START); команда показывает время шагов '
+            'и с --fetch-missing заранее загружает из ИСУ недостающие расписания в общую БД')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=HOT_GROUPS, help='Сколько самых многочисленных групп')
+        parser.add_argument('--fetch-missing', action='store_true',
+                            help='Загрузить из ИСУ расписания горячих групп, которых еще нет в БД')
+
+    def handle(self, *args, **options):
+        report = warm_up(options['groups'], options['fetch_missing'])
+        for name, result, seconds in report:
+            self.stdout.write(f'{name:<20}{result:>8}{seconds * 1000:>10.0f} мс')
+        total = sum(seconds for *_, seconds in report)
+        self.stdout.write(self.style.SUCCESS(f'Прогрев завершен за {total:.2f} с'))
@@ -0,0 +1,259 @@
+# metrics.py - МЕТРИКИ ПРОИЗВОДИТЕЛЬНОСТИ
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('main.metrics.slow')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Гистограмма в духе Prometheus: накопительные бакеты, сумма и количество по набору меток"""
+
+    def __init__(self, name, documentation, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    def collect(self):
+        """Снимок: список (метки, накопительные счетчики по бакетам, сумма, количество)"""
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+
+        result = []
+        for key, counts, total in sorted(series):
+            cumulative, running = [], 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            result.append((dict(zip(self.label_names, key)), cumulative, total, running))
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, cumulative, total, count in self.collect():
+            for bound, value in zip(list(self.buckets) + ['+Inf'], cumulative):
+                lines.append(f'{self.name}_bucket{_format_labels(labels, le=bound)} {value}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines)
+
+
+def _format_labels(labels, **extra):
+    pairs = {**labels, **{key: str(value) for key, value in extra.items()}}
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+REQUEST_SECONDS = Histogram(
+    'cabinet_request_duration_seconds', 'Полное время обработки запроса', ['view'])
+REQUEST_QUERIES = Histogram(
+    'cabinet_request_db_queries', 'Количество SQL-запросов за запрос', ['view'], buckets=COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram(
+    'cabinet_request_db_seconds', 'Время в БД за запрос', ['view'])
+REQUEST_TEMPLATE_SECONDS = Histogram(
+    'cabinet_request_template_seconds', 'Время отрисовки шаблонов за запрос', ['view'])
+REQUEST_UPSTREAM_SECONDS = Histogram(
+    'cabinet_request_upstream_seconds', 'Время запросов к ИСУ за запрос', ['view'])
+UPSTREAM_CALL_SECONDS = Histogram(
+    'isu_upstream_call_seconds', 'Длительность отдельных запросов к API ИСУ', ['endpoint', 'status'])
+
+REGISTRY = [
+    REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS,
+    REQUEST_TEMPLATE_SECONDS, REQUEST_UPSTREAM_SECONDS, UPSTREAM_CALL_SECONDS,
+]
+
+
+class RequestStats:
+    """Счетчики одного запроса"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.upstream_seconds = 0.0
+        self.sql = []
+
+
+_current_stats = ContextVar('request_stats', default=None)
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+class UpstreamCall:
+    """Один запрос к ИСУ: форма эндпоинта (без имени группы, чтобы не плодить серии) и исход"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        # Код ответа; если он не проставлен, запрос завершился исключением
+        self.status = None
+        self.error = None
+
+    @property
+    def outcome(self):
+        if self.status is not None:
+            return str(self.status)
+        return self.error or 'error'
+
+
+@contextmanager
+def upstream_call(endpoint=''):
+    """Засечь время запроса к внешнему API (ИСУ). Вызывающий проставляет call.status"""
+    call = UpstreamCall(endpoint)
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_CALL_SECONDS.observe(elapsed, endpoint=call.endpoint, status=call.outcome)
+        stats = current_stats()
+        if stats is not None:
+            stats.upstream_seconds += elapsed
+
+
+def render_metrics():
+    """Все метрики в текстовом формате Prometheus"""
+    return '\n'.join(histogram.render() for histogram in REGISTRY) + '\n'
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats = current_stats()
+            if stats is not None:
+                stats.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Стандартный движок шаблонов Django, который учитывает время отрисовки в метриках запроса"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper соединений: SQL-запрос засчитывается запросу, в контексте которого выполнен"""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            elapsed = time.perf_counter() - started
+            stats.queries += 1
+            stats.db_seconds += elapsed
+            stats.sql.append((sql, elapsed))
+
+
+def instrument_connection(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: соединения создаются в каждом потоке (sync_to_async,
+    рабочие потоки), и все они пишут в RequestStats текущего запроса - ContextVar
+    переходит в поток вместе с вызовом. При переподключении обертка уже стоит.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """Собирает по каждому имени URL время ответа, число и время SQL-запросов,
+    время шаблонов и запросов к ИСУ. Медленные запросы пишутся в лог вместе с SQL.
+    Должен стоять первым в MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', 1.0)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        self._observe(request, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        self._observe(request, stats, time.perf_counter() - started)
+        return response
+
+    def _observe(self, request, stats, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+
+        REQUEST_SECONDS.observe(elapsed, view=view)
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, view=view)
+        REQUEST_TEMPLATE_SECONDS.observe(stats.template_seconds, view=view)
+        REQUEST_UPSTREAM_SECONDS.observe(stats.upstream_seconds, view=view)
+
+        if elapsed >= self.slow_request_seconds:
+            slow_logger.warning(
+                "Медленный запрос %s %s (%s): %.3f с, SQL: %d за %.3f с, шаблоны %.3f с, ИСУ %.3f с\n%s",
+                request.method, request.path, view, elapsed, stats.queries, stats.db_seconds,
+                stats.template_seconds, stats.upstream_seconds,
+                '\n'.join(f'[{seconds * 1000:.1f} мс] {sql}' for sql, seconds in stats.sql),
+            )
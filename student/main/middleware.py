@@ -0,0 +1,94 @@
+# middleware.py - ЗАГРУЗКА ПРОФИЛЯ СТУДЕНТА
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+
+from .models import StudentProfile
+
+
+def load_student_profile(user):
+    """Профиль студента (создается, если его нет).
+
+    StudentProfileBackend загружает его вместе с пользователем сессии - отдельного запроса
+    нет; пользователь из другого бэкенда дочитывает профиль одним запросом по user_id.
+    Между запросами профиль не кэшируется: кэш по умолчанию свой у каждого процесса,
+    и сброс после сохранения не дошел бы до остальных - они показывали бы старую группу,
+    аватар и отметки свежести (ETag).
+    """
+    profile = getattr(user, 'studentprofile', None)
+    if profile is None:
+        profile = StudentProfile.objects.create(user=user)
+
+    # user.studentprofile в шаблонах и представлениях больше не делает запрос
+    user.studentprofile = profile
+    return profile
+
+
+async def aload_student_profile(user):
+    """Асинхронный вариант load_student_profile"""
+    if User.studentprofile.is_cached(user):
+        profile = getattr(user, 'studentprofile', None)
+    else:
+        profile = await StudentProfile.objects.filter(user_id=user.pk).afirst()
+    if profile is None:
+        profile = await StudentProfile.objects.acreate(user=user)
+
+    user.studentprofile = profile
+    return profile
+
+
+def _get_user_with_profile(request):
+    user = get_user(request)
+    if user.is_authenticated and not hasattr(request, '_cached_profile'):
+        request._cached_profile = load_student_profile(user)
+    return user
+
+
+def _get_profile(request):
+    user = _get_user_with_profile(request)
+    return getattr(request, '_cached_profile', None) if user.is_authenticated else None
+
+
+async def _aget_profile(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    if not hasattr(request, '_cached_profile'):
+        request._cached_profile = await aload_student_profile(user)
+    # Дальше (в том числе в шаблонах) request.user уже не обращается к БД
+    request.user = user
+    return request._cached_profile
+
+
+class StudentProfileMiddleware:
+    """Загружает профиль студента один раз за запрос.
+
+    Профиль доступен как request.profile и как request.user.studentprofile.
+    Асинхронные представления получают его через await request.aprofile().
+    Должен стоять после AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self._attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._attach(request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def _attach(request):
+        request.user = SimpleLazyObject(lambda: _get_user_with_profile(request))
+        request.profile = SimpleLazyObject(lambda: _get_profile(request))
+        request.aprofile = lambda: _aget_profile(request)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_recordbook_recordbookentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='avatar_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='avatars/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='avatar_thumb_2x',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='avatars/thumbs/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:56
+
+import main.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_studentprofile_avatar_thumbs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=main.storage.ContentHashStorage(), upload_to='avatars/'),
+        ),
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='avatar_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=main.storage.ContentHashStorage(), upload_to='avatars/thumbs/'),
+        ),
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='avatar_thumb_2x',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=main.storage.ContentHashStorage(), upload_to='avatars/thumbs/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_avatar_content_hash_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Обновлено'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def create_course_index(apps, schema_editor):
+    from main.search import create_index
+    create_index(schema_editor)
+
+
+def drop_course_index(apps, schema_editor):
+    from main.search import drop_index
+    drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_studentprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['name'], name='main_course_name_idx'),
+        ),
+        # Полнотекстовый индекс курсов (FTS5). На других СУБД миграция ничего не делает,
+        # поиск работает через icontains.
+        migrations.RunPython(create_course_index, drop_course_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from main.models import normalize_subject
+
+
+def fill_normalized_names(apps, schema_editor):
+    Course = apps.get_model('main', 'Course')
+    courses = list(Course.objects.only('pk', 'name'))
+    for course in courses:
+        course.normalized_name = normalize_subject(course.name)
+    Course.objects.bulk_update(courses, ['normalized_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_course_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='realschedule',
+            name='course',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedule_lessons', to='main.course', verbose_name='Курс'),
+        ),
+        migrations.CreateModel(
+            name='SubjectCourseLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_key', models.CharField(max_length=200, unique=True, verbose_name='Нормализованный предмет')),
+                ('subject', models.CharField(max_length=200, verbose_name='Предмет')),
+                ('similarity', models.FloatField(default=1.0, verbose_name='Сходство')),
+                ('matched_at', models.DateTimeField(auto_now=True, verbose_name='Сопоставлено')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subject_links', to='main.course', verbose_name='Курс')),
+            ],
+        ),
+        # Существующее расписание связывается с курсами командой link_subjects
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_subject_course_links'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Название')),
+                ('task_type', models.CharField(blank=True, max_length=50, verbose_name='Тип задания')),
+                ('description', models.TextField(blank=True, verbose_name='Описание')),
+                ('deadline', models.DateTimeField(verbose_name='Срок сдачи')),
+                ('status', models.CharField(choices=[('new', 'Не начато'), ('in_progress', 'В процессе'), ('done', 'Выполнено')], default='new', max_length=20, verbose_name='Статус')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Прогресс, %')),
+                ('grade', models.IntegerField(blank=True, null=True, verbose_name='Оценка')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Выполнено')),
+                ('remind_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('reminder_sent', models.BooleanField(default=False, editable=False)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='main.course', verbose_name='Курс')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL, verbose_name='Студент')),
+            ],
+            options={
+                'ordering': ['deadline'],
+                'indexes': [models.Index(fields=['student', 'status', 'deadline'], name='main_task_student_deadline'), models.Index(fields=['student', 'status', 'completed_at'], name='main_task_student_completed'), models.Index(condition=models.Q(('remind_at__isnull', False)), fields=['remind_at'], name='main_task_remind_at')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:25
+
+import django.db.models.deletion
+import main.institutions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_task'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='realschedule',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='realschedule',
+            name='institution',
+            field=models.CharField(default=main.institutions.default_institution, max_length=20, verbose_name='Учебное заведение'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='institution',
+            field=models.CharField(default=main.institutions.default_institution, max_length=20, verbose_name='Учебное заведение'),
+        ),
+        migrations.AlterField(
+            model_name='realschedule',
+            name='course',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schedule_lessons', to='main.course', verbose_name='Курс'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='realschedule',
+            unique_together={('institution', 'group', 'day', 'time_start', 'subject')},
+        ),
+    ]
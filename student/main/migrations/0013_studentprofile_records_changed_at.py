@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_institution_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='records_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
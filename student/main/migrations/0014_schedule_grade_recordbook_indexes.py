@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_studentprofile_records_changed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['student', '-date', 'grade'], name='main_grade_student_date'),
+        ),
+        migrations.AddIndex(
+            model_name='realschedule',
+            index=models.Index(fields=['institution', 'group', 'updated_at'], name='main_rs_group_version'),
+        ),
+        migrations.AddIndex(
+            model_name='recordbookentry',
+            index=models.Index(fields=['record_book', 'date'], name='main_rbentry_book_date'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:51
+
+import main.institutions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_schedule_grade_recordbook_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('institution', models.CharField(default=main.institutions.default_institution, max_length=20, verbose_name='Учебное заведение')),
+                ('group', models.CharField(max_length=20, verbose_name='Группа')),
+                ('version', models.PositiveIntegerField(verbose_name='Версия')),
+                ('operation', models.CharField(choices=[('added', 'Добавлено'), ('changed', 'Изменено'), ('removed', 'Удалено')], max_length=10, verbose_name='Изменение')),
+                ('day', models.CharField(max_length=20, verbose_name='День недели')),
+                ('time_start', models.TimeField(verbose_name='Время начала')),
+                ('time_end', models.TimeField(verbose_name='Время окончания')),
+                ('subject', models.CharField(max_length=200, verbose_name='Предмет')),
+                ('lesson_type', models.CharField(blank=True, max_length=50, verbose_name='Тип занятия')),
+                ('teacher', models.CharField(blank=True, max_length=100, verbose_name='Преподаватель')),
+                ('room', models.CharField(blank=True, max_length=50, verbose_name='Аудитория')),
+                ('week_type', models.CharField(blank=True, max_length=20, verbose_name='Тип недели')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Записано')),
+            ],
+            options={
+                'ordering': ['version', 'id'],
+                'indexes': [models.Index(fields=['institution', 'group', 'version'], name='main_schedchange_version')],
+            },
+        ),
+    ]
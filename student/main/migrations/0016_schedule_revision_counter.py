@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:46
+
+import main.institutions
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_revisions(apps, schema_editor):
+    """Счетчики версий по уже записанному журналу изменений"""
+    database = schema_editor.connection.alias
+    ScheduleChange = apps.get_model('main', 'ScheduleChange')
+    ScheduleRevision = apps.get_model('main', 'ScheduleRevision')
+    rows = (ScheduleChange.objects.using(database).values('institution', 'group')
+            .annotate(version=Max('version')).order_by())
+    ScheduleRevision.objects.using(database).bulk_create([ScheduleRevision(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_schedule_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('institution', models.CharField(default=main.institutions.default_institution, max_length=20, verbose_name='Учебное заведение')),
+                ('group', models.CharField(max_length=20, verbose_name='Группа')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Версия')),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='schedulechange',
+            name='main_schedchange_version',
+        ),
+        migrations.AlterUniqueTogether(
+            name='schedulechange',
+            unique_together={('institution', 'group', 'version', 'day', 'time_start', 'subject')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='schedulerevision',
+            unique_together={('institution', 'group')},
+        ),
+        migrations.RunPython(fill_revisions, migrations.RunPython.noop, hints={'model_name': 'schedulerevision'}),
+    ]
@@ -1,29 +1,102 @@
 # models.py - ОБНОВЛЕННАЯ МОДЕЛЬ
-from django.db import models
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, router
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .institutions import PRIMARY_DB, default_institution, institution_database, shard_databases
+from .storage import avatar_storage
+
+
+def normalize_subject(name):
+    """Приводим название дисциплины к виду для сравнения:
+    "Основы ИТ (лек.)" -> "основы ит"
+    """
+    name = re.sub(r'\(.*?\)', ' ', name.lower().replace('ё', 'е'))
+    return ' '.join(re.findall(r'\w+', name))
+
 
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # Учебное заведение (settings.INSTITUTIONS): откуда брать расписание и в какой базе оно лежит
+    institution = models.CharField(max_length=20, default=default_institution, verbose_name='Учебное заведение')
     group = models.CharField(max_length=20, verbose_name='Группа', blank=True)
     student_id = models.CharField(max_length=20, verbose_name='Студенческий билет', blank=True)
     phone = models.CharField(max_length=20, verbose_name='Телефон', blank=True)
-    avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=avatar_storage, null=True, blank=True)
+    # Миниатюры аватара генерируются в фоне (main/avatars.py)
+    avatar_thumb = models.ImageField(upload_to='avatars/thumbs/', storage=avatar_storage, null=True, blank=True, editable=False)
+    avatar_thumb_2x = models.ImageField(upload_to='avatars/thumbs/', storage=avatar_storage, null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+    # Последнее изменение оценок и зачетной книжки студента (сигналы ниже) - для ETag страниц кабинета
+    records_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.group}"
 
+class CourseManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create не отправляет post_save: курсы добавляются в полнотекстовый индекс
+        и сбрасывают сопоставления предметов здесь
+        """
+        from .search import index_courses, rebuild_index
+
+        from .subjects import relink_courses
+
+        # save() не вызывается - нормализованное название заполняется здесь
+        objs = list(objs)
+        for course in objs:
+            course.normalized_name = normalize_subject(course.name)
+        courses = super().bulk_create(objs, *args, **kwargs)
+        relink_courses(courses)
+        using = self._db or router.db_for_write(self.model)
+        if all(course.pk is not None for course in courses):
+            index_courses(courses, using)
+        else:
+            # Без первичных ключей (ignore_conflicts) не узнать, какие строки добавлены
+            rebuild_index(using)
+        return courses
+
+
 class Course(models.Model):
     name = models.CharField(max_length=100, verbose_name='Название курса')
     code = models.CharField(max_length=20, verbose_name='Код курса')
     teacher = models.CharField(max_length=100, verbose_name='Преподаватель')
     hours = models.IntegerField(verbose_name='Часы')
     description = models.TextField(blank=True, verbose_name='Описание')
+    # Нормализованное название - по нему предметы расписания связываются с курсами
+    normalized_name = models.CharField(max_length=100, db_index=True, editable=False, default='')
+
+    objects = CourseManager()
+
+    class Meta:
+        # Каталог курсов без поискового запроса выводится постранично по названию
+        indexes = [models.Index(fields=['name'], name='main_course_name_idx')]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        course = super().from_db(db, field_names, values)
+        course._saved_normalized_name = course.__dict__.get('normalized_name')
+        return course
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_subject(self.name)
+        # Сопоставления с предметами расписания зависят только от названия (см. reset_subject_links)
+        self.name_changed = self.normalized_name != getattr(self, '_saved_normalized_name', None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+        self._saved_normalized_name = self.normalized_name
+
 class Grade(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -32,6 +105,13 @@ class Grade(models.Model):
     date = models.DateField(verbose_name='Дата')
     comments = models.TextField(blank=True, verbose_name='Комментарии')
 
+    class Meta:
+        indexes = [
+            # Оценки студента по дате (главная, успеваемость); grade в индексе - статистика
+            # по оценкам студента считается без чтения таблицы
+            models.Index(fields=['student', '-date', 'grade'], name='main_grade_student_date'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.course.name} - {self.grade}"
 
@@ -45,8 +125,76 @@ class Grade(models.Model):
         else:
             return 'Неудовлетворительно'
 
+class Task(models.Model):
+    """Задание студента по курсу с дедлайном"""
+    STATUS_NEW = 'new'
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = [
+        (STATUS_NEW, 'Не начато'),
+        (STATUS_IN_PROGRESS, 'В процессе'),
+        (STATUS_DONE, 'Выполнено'),
+    ]
+    # Статусы невыполненных заданий: перечисляем явно, чтобы запрос шел по индексу
+    OPEN_STATUSES = [STATUS_NEW, STATUS_IN_PROGRESS]
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks', verbose_name='Студент')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='tasks', verbose_name='Курс')
+    title = models.CharField(max_length=200, verbose_name='Название')
+    task_type = models.CharField(max_length=50, verbose_name='Тип задания', blank=True)
+    description = models.TextField(blank=True, verbose_name='Описание')
+    deadline = models.DateTimeField(verbose_name='Срок сдачи')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_NEW, verbose_name='Статус')
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name='Прогресс, %')
+    grade = models.IntegerField(null=True, blank=True, verbose_name='Оценка')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='Выполнено')
+    # Когда напомнить о дедлайне; NULL - напоминание не нужно или уже отправлено
+    remind_at = models.DateTimeField(null=True, blank=True, editable=False)
+    reminder_sent = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        ordering = ['deadline']
+        indexes = [
+            # Срочные/активные/просроченные: student = ? AND status IN (...) AND deadline в диапазоне
+            models.Index(fields=['student', 'status', 'deadline'], name='main_task_student_deadline'),
+            models.Index(fields=['student', 'status', 'completed_at'], name='main_task_student_completed'),
+            # Очередь напоминаний: в индекс попадают только задания, ожидающие напоминания
+            models.Index(fields=['remind_at'], name='main_task_remind_at',
+                         condition=models.Q(remind_at__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.course_id})"
+
+    @property
+    def is_done(self):
+        return self.status == self.STATUS_DONE
+
+    def save(self, *args, **kwargs):
+        if self.is_done or self.reminder_sent:
+            self.remind_at = None
+        else:
+            self.remind_at = self.deadline - timedelta(hours=getattr(settings, 'TASK_REMINDER_HOURS', 24))
+        super().save(*args, **kwargs)
+
+
+class InstitutionManager(models.Manager):
+    def for_institution(self, slug=None):
+        """Строки одного заведения - из его базы и только его"""
+        slug = slug or default_institution()
+        database = institution_database(slug)
+        # Основную базу выбирает роутер (возможно чтение с реплик), шард указываем явно
+        manager = self if database == PRIMARY_DB else self.db_manager(database)
+        return manager.filter(institution=slug)
+
+
 class RealSchedule(models.Model):
-    """Модель для хранения реального расписания из ИСУ"""
+    """Модель для хранения реального расписания из ИСУ.
+
+    Хранится в базе своего заведения (main.routers.ShardRouter), выборки -
+    через RealSchedule.objects.for_institution(slug).
+    """
+    institution = models.CharField(max_length=20, default=default_institution, verbose_name='Учебное заведение')
     group = models.CharField(max_length=20, verbose_name='Группа')
     day = models.CharField(max_length=20, verbose_name='День недели')
     time_start = models.TimeField(verbose_name='Время начала')
@@ -56,20 +204,138 @@ class RealSchedule(models.Model):
     teacher = models.CharField(max_length=100, verbose_name='Преподаватель', blank=True)
     room = models.CharField(max_length=50, verbose_name='Аудитория', blank=True)
     week_type = models.CharField(max_length=20, verbose_name='Тип недели', blank=True)
+    # Курс, с которым связан предмет (заполняется при синхронизации, см. main/subjects.py).
+    # Курсы - в основной базе, занятия могут быть в шарде: ограничения внешнего ключа в БД нет
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+                               related_name='schedule_lessons', verbose_name='Курс')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
 
+    objects = InstitutionManager()
+
     class Meta:
-        unique_together = ['group', 'day', 'time_start', 'subject']
+        unique_together = ['institution', 'group', 'day', 'time_start', 'subject']
         ordering = ['group', 'day', 'time_start']
+        # Неделя группы (institution, group ORDER BY day, time_start) читается по индексу unique_together.
+        # Версия расписания (main/timetable.py, ETag и 304) - только по этому индексу, без чтения таблицы
+        indexes = [
+            models.Index(fields=['institution', 'group', 'updated_at'], name='main_rs_group_version'),
+        ]
 
     def __str__(self):
         return f"{self.group} - {self.day} - {self.subject}"
 
+
+class ScheduleChange(models.Model):
+    """Журнал изменений расписания группы (только добавление строк).
+
+    Каждая синхронизация, изменившая занятия, получает следующий номер версии группы
+    и пишет по строке на добавленное, измененное или удаленное занятие. Занятие
+    определяется ключом (day, time_start, subject). Лежит в базе заведения, как RealSchedule.
+    """
+    ADDED = 'added'
+    CHANGED = 'changed'
+    REMOVED = 'removed'
+    OPERATIONS = [(ADDED, 'Добавлено'), (CHANGED, 'Изменено'), (REMOVED, 'Удалено')]
+
+    institution = models.CharField(max_length=20, default=default_institution, verbose_name='Учебное заведение')
+    group = models.CharField(max_length=20, verbose_name='Группа')
+    version = models.PositiveIntegerField(verbose_name='Версия')
+    operation = models.CharField(max_length=10, choices=OPERATIONS, verbose_name='Изменение')
+    day = models.CharField(max_length=20, verbose_name='День недели')
+    time_start = models.TimeField(verbose_name='Время начала')
+    time_end = models.TimeField(verbose_name='Время окончания')
+    subject = models.CharField(max_length=200, verbose_name='Предмет')
+    lesson_type = models.CharField(max_length=50, verbose_name='Тип занятия', blank=True)
+    teacher = models.CharField(max_length=100, verbose_name='Преподаватель', blank=True)
+    room = models.CharField(max_length=50, verbose_name='Аудитория', blank=True)
+    week_type = models.CharField(max_length=20, verbose_name='Тип недели', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Записано')
+
+    objects = InstitutionManager()
+
+    class Meta:
+        ordering = ['version', 'id']
+        # В версии не больше одной строки на занятие: две синхронизации с одним номером версии
+        # падают с IntegrityError, а не смешивают изменения. Изменения группы после версии N -
+        # по этому же индексу
+        unique_together = ['institution', 'group', 'version', 'day', 'time_start', 'subject']
+
+    def __str__(self):
+        return f"{self.group} v{self.version}: {self.operation} {self.day} {self.subject}"
+
+
+class ScheduleRevision(models.Model):
+    """Счетчик версий журнала изменений группы (main/timetable.py, record_schedule_changes).
+
+    Синхронизация блокирует строку группы (select_for_update) и увеличивает номер в своей
+    транзакции - одновременные синхронизации одной группы получают разные версии.
+    Лежит в базе заведения, как ScheduleChange.
+    """
+    institution = models.CharField(max_length=20, default=default_institution, verbose_name='Учебное заведение')
+    group = models.CharField(max_length=20, verbose_name='Группа')
+    version = models.PositiveIntegerField(default=0, verbose_name='Версия')
+
+    objects = InstitutionManager()
+
+    class Meta:
+        unique_together = ['institution', 'group']
+
+    def __str__(self):
+        return f"{self.group} v{self.version}"
+
+
+class SubjectCourseLink(models.Model):
+    """Сопоставление названия предмета из расписания ИСУ с курсом.
+
+    Строится один раз на название и переиспользуется при каждой синхронизации.
+    course = NULL - подходящего курса не нашлось (чтобы не искать заново).
+    """
+    subject_key = models.CharField(max_length=200, unique=True, verbose_name='Нормализованный предмет')
+    subject = models.CharField(max_length=200, verbose_name='Предмет')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='subject_links', verbose_name='Курс')
+    similarity = models.FloatField(default=1.0, verbose_name='Сходство')
+    matched_at = models.DateTimeField(auto_now=True, verbose_name='Сопоставлено')
+
+    def __str__(self):
+        return f"{self.subject} -> {self.course_id}"
+
 @receiver(post_save, sender=User)
 def create_student_profile(sender, instance, created, **kwargs):
     """Автоматически создаем профиль при создании пользователя"""
-    if created:
-        StudentProfile.objects.get_or_create(user=instance)
+    if created and not kwargs.get('raw'):
+        # Форма регистрации передает данные профиля заранее, чтобы записать его одним INSERT
+        StudentProfile.objects.create(user=instance, **getattr(instance, 'profile_defaults', {}))
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    """Поддерживаем полнотекстовый индекс курсов в актуальном состоянии"""
+    from .search import index_course
+    index_course(instance, kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    from .search import unindex_course
+    unindex_course(instance.pk, kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Course)
+def unlink_sharded_lessons(sender, instance, **kwargs):
+    """SET_NULL для занятий в шардах: удаление в основной базе до них не доходит"""
+    for database in shard_databases():
+        RealSchedule.objects.using(database).filter(course_id=instance.pk).update(course=None)
+
+
+@receiver(post_save, sender=Course)
+def reset_subject_links(sender, instance, created, **kwargs):
+    """Новый или переименованный курс может подойти предметам, которые раньше не сопоставились.
+    Сохранение без изменения названия сопоставлений не трогает.
+    """
+    if instance.name_changed:
+        from .subjects import relink_courses
+        relink_courses([instance], renamed=not created)
 
 
 # models.py - ДОБАВЬТЕ ЭТИ МОДЕЛИ
@@ -104,6 +370,8 @@ class RecordBookEntry(models.Model):
 
     class Meta:
         ordering = ['date']
+        # Записи семестров студента (prefetch по record_book_id) уже в порядке даты
+        indexes = [models.Index(fields=['record_book', 'date'], name='main_rbentry_book_date')]
 
     def __str__(self):
         return f"{self.course.name} - {self.exam_type}"
@@ -117,4 +385,29 @@ class RecordBookEntry(models.Model):
                 2: 'Неудовлетворительно'
             }
             return grade_display.get(self.grade, str(self.grade))
-        return 'Зачёт' if self.passed else 'Не сдано'
\ No newline at end of file
+        return 'Зачёт' if self.passed else 'Не сдано'
+
+
+def touch_student_records(user_id):
+    """Отметить изменение оценок/зачетки студента (UPDATE без auto_now: профиль не "изменился")"""
+    StudentProfile.objects.filter(user_id=user_id).update(records_changed_at=timezone.now())
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+@receiver(post_save, sender=RecordBook)
+@receiver(post_delete, sender=RecordBook)
+def grades_changed(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        touch_student_records(instance.student_id)
+
+
+@receiver(post_save, sender=RecordBookEntry)
+@receiver(post_delete, sender=RecordBookEntry)
+def record_book_entry_changed(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    # При каскадном удалении семестра его строки уже нет - отметку поставит сигнал RecordBook
+    student_id = RecordBook.objects.filter(pk=instance.record_book_id).values_list('student_id', flat=True).first()
+    if student_id is not None:
+        touch_student_records(student_id)
@@ -1,55 +1,91 @@
 # parsers.py - ИСПРАВЛЕННЫЙ ПАРСЕР
+import asyncio
 import requests
 import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time
+from functools import partial
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
+from .events import publish_schedule_change
+from .institutions import default_institution, get_institution, institution_database
+from .logutils import GroupFailureLog, sampled_call
+from .metrics import upstream_call
 from .models import RealSchedule
+from .schedule_index import group_schedule_changed
+from .subjects import resolve_subjects
+from .timetable import record_schedule_changes
+from .warmup import group_catalogue_key
+
+try:
+    import httpx
+except ImportError:  # httpx - необязательная зависимость, без нее запросы идут через requests в потоках
+    httpx = None
 
 logger = logging.getLogger(__name__)
 
+# Размер пула соединений с API ИСУ для асинхронного клиента
+ISU_POOL_SIZE = getattr(settings, 'ISU_POOL_SIZE', 20)
+ISU_TIMEOUT = 10
+# Формы эндпоинтов расписания: по ним считаются метрики и сводятся сбои
+SCHEDULE_ENDPOINTS = ['/schedule/group/{group}', '/schedule/{group}', '/group/{group}/schedule']
+# Доля обновлений расписания, чьи INFO-сообщения пишутся в лог (предупреждения и ошибки - всегда)
+LOG_SAMPLE_RATE = getattr(settings, 'ISU_LOG_SAMPLE_RATE', 1.0)
+
+# Поля занятия, изменение которых - изменение расписания для студента
+LESSON_FIELDS = ('day', 'time_start', 'time_end', 'subject', 'lesson_type', 'teacher', 'room', 'week_type')
+
+# Одно предупреждение на группу за интервал вместо строки на каждую попытку
+group_failures = GroupFailureLog(logger)
+
 
 class ISUScheduleParser:
-    BASE_URL = "https://api.schedule-uust.arpakit.com/api"
+    BASE_URL = getattr(settings, 'ISU_API_BASE_URL', "https://api.schedule-uust.arpakit.com/api")
 
     @staticmethod
-    def get_group_schedule(group_name):
-        """Получить расписание для группы из API"""
-        try:
-            logger.info(f"Запрос расписания для группы: {group_name}")
+    def base_url(institution=None):
+        """API расписания заведения (settings.INSTITUTIONS), по умолчанию BASE_URL"""
+        return get_institution(institution).get('isu_base_url') or ISUScheduleParser.BASE_URL
 
-            # Пробуем разные варианты эндпоинтов
-            endpoints = [
-                f"{ISUScheduleParser.BASE_URL}/schedule/group/{group_name}",
-                f"{ISUScheduleParser.BASE_URL}/schedule/{group_name}",
-                f"{ISUScheduleParser.BASE_URL}/group/{group_name}/schedule"
-            ]
+    @staticmethod
+    def schedule_endpoints(group_name, institution=None):
+        """Пробуем разные варианты эндпоинтов"""
+        base_url = ISUScheduleParser.base_url(institution)
+        return [base_url + shape.format(group=group_name) for shape in SCHEDULE_ENDPOINTS]
 
-            response_data = None
-            for endpoint in endpoints:
+    @staticmethod
+    def get_group_schedule(group_name, institution=None):
+        """Получить расписание для группы из API"""
+        try:
+            attempts = []
+            endpoints = ISUScheduleParser.schedule_endpoints(group_name, institution)
+            for shape, endpoint in zip(SCHEDULE_ENDPOINTS, endpoints):
                 try:
-                    logger.info(f"Пробуем эндпоинт: {endpoint}")
-                    response = requests.get(endpoint, timeout=10)
-
-                    if response.status_code == 200:
-                        response_data = response.json()
-                        logger.info(f"Успешно получены данные с {endpoint}")
-                        break
-                    else:
-                        logger.warning(f"Эндпоинт {endpoint} вернул статус {response.status_code}")
-
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"Ошибка для эндпоинта {endpoint}: {e}")
+                    with upstream_call(shape) as call:
+                        response = requests.get(endpoint, timeout=ISU_TIMEOUT)
+                        call.status = response.status_code
+                except requests.exceptions.RequestException:
+                    attempts.append((shape, call.outcome))
                     continue
 
-            if response_data is not None:
-                logger.info(f"Успешно получено расписание для {group_name}")
-                return response_data, True
-            else:
-                logger.error(f"Все эндпоинты не сработали для группы {group_name}")
-                return "Не удалось получить расписание ни с одного эндпоинта", False
+                if response.status_code == 200:
+                    response_data = response.json()
+                    group_failures.succeeded(group_name)
+                    logger.info("Расписание группы %s получено", group_name,
+                                extra={'group': group_name, 'endpoint': shape, 'attempts': len(attempts) + 1})
+                    return response_data, True
+                attempts.append((shape, call.outcome))
+
+            group_failures.failed(group_name, attempts)
+            return "Не удалось получить расписание ни с одного эндпоинта", False
 
         except Exception as e:
-            logger.error(f"Неожиданная ошибка для {group_name}: {e}")
+            logger.error("Неожиданная ошибка для %s: %s", group_name, e, extra={'group': group_name})
             return f"Ошибка обработки данных: {e}", False
 
     @staticmethod
@@ -64,32 +100,41 @@ class ISUScheduleParser:
             return datetime.strptime(time_str, '%H:%M').time()
 
         except ValueError:
-            logger.warning(f"Неверный формат времени: {time_str}")
+            logger.warning("Неверный формат времени: %s", time_str)
             return time(8, 0)
 
     @staticmethod
-    def update_schedule_for_group(group_name):
+    def update_schedule_for_group(group_name, institution=None):
         """Обновить расписание для конкретной группы"""
-        try:
-            logger.info(f"Начало обновления расписания для группы: {group_name}")
-
-            # Получаем данные из API
-            data, success = ISUScheduleParser.get_group_schedule(group_name)
+        # Решение о записи INFO-сообщений принимается один раз на обновление
+        with sampled_call(LOG_SAMPLE_RATE):
+            data, success = ISUScheduleParser.get_group_schedule(group_name, institution)
+            return ISUScheduleParser.save_group_schedule(group_name, data, success, institution)
 
+    @staticmethod
+    def save_group_schedule(group_name, data, success=True, institution=None):
+        """Сохранить полученное из API расписание группы (общая часть с AsyncISUScheduleParser)"""
+        try:
             if not success:
-                logger.error(f"Не удалось получить расписание для {group_name}: {data}")
+                # Сбой уже учтен в group_failures
                 return False, data
 
             # Если данных нет или пустой список
             if not data:
-                logger.warning(f"Пустой ответ от API для группы {group_name}")
+                logger.warning("Пустой ответ от API для группы %s", group_name, extra={'group': group_name})
                 return False, "Расписание для этой группы не найдено"
 
-            # Очищаем старое расписание для этой группы
-            deleted_count, _ = RealSchedule.objects.filter(group=group_name).delete()
-            logger.info(f"Удалено {deleted_count} старых записей для {group_name}")
+            # Сопоставляем предметы с курсами заранее - один раз на название, а не на занятие
+            subjects = {
+                lesson.get('subject', 'Без названия')
+                for day_data in data if isinstance(day_data, dict)
+                for lesson in day_data.get('lessons') or []
+            }
+            subject_courses = resolve_subjects(subjects)
+            institution = institution or default_institution()
 
-            created_count = 0
+            # Сначала разбираем все занятия, в БД пишем одной короткой транзакцией
+            schedule_items = {}
 
             # Обрабатываем полученные данные
             # Предполагаем, что данные приходят в формате списка дней с уроками
@@ -116,8 +161,9 @@ class ISUScheduleParser:
                         room = lesson.get('room', '')
                         week_type = lesson.get('week_type', '')
 
-                        # Создаем запись расписания
-                        schedule_item = RealSchedule(
+                        # Создаем запись расписания; повтор (group, day, time_start, subject) нарушил бы уникальность
+                        schedule_items.setdefault((day_name, time_start, subject), RealSchedule(
+                            institution=institution,
                             group=group_name,
                             day=day_name,
                             time_start=time_start,
@@ -126,16 +172,50 @@ class ISUScheduleParser:
                             lesson_type=lesson_type,
                             teacher=teacher,
                             room=room,
-                            week_type=week_type
-                        )
-                        schedule_item.save()
-                        created_count += 1
+                            week_type=week_type,
+                            course_id=subject_courses.get(subject)
+                        ))
 
                 except Exception as e:
-                    logger.error(f"Ошибка обработки дня {day_name} для {group_name}: {e}")
+                    logger.error("Ошибка обработки дня %s для %s: %s", day_name, group_name, e,
+                                 extra={'group': group_name})
                     continue
 
-            logger.info(f"Успешно обновлено расписание для {group_name}: {created_count} занятий")
+            created_count = len(schedule_items)
+            if created_count:
+                # Читатели видят либо старое, либо новое расписание целиком
+                group_lessons = RealSchedule.objects.for_institution(institution)
+                database = institution_database(institution)
+                current = {
+                    (*(getattr(item, field) for field in LESSON_FIELDS), item.course_id)
+                    for item in schedule_items.values()
+                }
+                revision = None
+                with transaction.atomic(using=database):
+                    previous = set(group_lessons.filter(group=group_name).values_list(*LESSON_FIELDS, 'course_id'))
+                    # Без изменений строки не трогаем: версия расписания (main/timetable.py) остается прежней
+                    if current != previous:
+                        group_lessons.filter(group=group_name).delete()
+                        group_lessons.bulk_create(schedule_items.values())
+                        # Журнал изменений: следующая версия группы с дельтой занятий
+                        revision = record_schedule_changes(
+                            institution, group_name,
+                            [dict(zip(LESSON_FIELDS, row)) for row in previous],
+                            [dict(zip(LESSON_FIELDS, row)) for row in current],
+                        )
+                        # Индексы преподавателей и аудиторий (main/schedule_index.py) - только по этой группе
+                        transaction.on_commit(partial(group_schedule_changed, institution, group_name,
+                                                      list(schedule_items.values())), using=database)
+                if {row[:-1] for row in current} != {row[:-1] for row in previous}:
+                    # Подключенные студенты группы получат событие (main/events.py)
+                    transaction.on_commit(partial(publish_schedule_change, institution, group_name,
+                                                  lessons=created_count, revision=revision), using=database)
+                if not previous:
+                    # Новая группа - каталог групп заведения устарел
+                    cache.delete(group_catalogue_key(institution))
+                logger.info("Расписание группы %s обновлено", group_name,
+                            extra={'group': group_name, 'lessons_before': len(previous), 'lessons_created': created_count,
+                                   'changed': current != previous})
 
             if created_count == 0:
                 return False, "Не удалось распарсить ни одного занятия из полученных данных"
@@ -143,24 +223,28 @@ class ISUScheduleParser:
             return True, f"Расписание обновлено. Добавлено {created_count} занятий"
 
         except Exception as e:
-            logger.error(f"Критическая ошибка обновления расписания для {group_name}: {e}")
+            logger.error("Критическая ошибка обновления расписания для %s: %s", group_name, e,
+                         extra={'group': group_name})
             return False, f"Ошибка обновления расписания: {str(e)}"
 
     @staticmethod
-    def get_available_groups():
+    def get_available_groups(institution=None):
         """Получить список доступных групп"""
         try:
+            base_url = ISUScheduleParser.base_url(institution)
             endpoints = [
-                f"{ISUScheduleParser.BASE_URL}/groups",
-                f"{ISUScheduleParser.BASE_URL}/schedule/groups"
+                f"{base_url}/groups",
+                f"{base_url}/schedule/groups"
             ]
 
             for endpoint in endpoints:
                 try:
-                    response = requests.get(endpoint, timeout=10)
+                    with upstream_call(endpoint[len(base_url):]) as call:
+                        response = requests.get(endpoint, timeout=10)
+                        call.status = response.status_code
                     if response.status_code == 200:
                         groups = response.json()
-                        logger.info(f"Получено {len(groups)} доступных групп с {endpoint}")
+                        logger.info("Получено %d доступных групп с %s", len(groups), endpoint)
                         return groups, True
                 except:
                     continue
@@ -168,7 +252,7 @@ class ISUScheduleParser:
             return [], False
 
         except Exception as e:
-            logger.error(f"Ошибка получения списка групп: {e}")
+            logger.error("Ошибка получения списка групп: %s", e)
             return [], False
 
     @staticmethod
@@ -184,7 +268,9 @@ class ISUScheduleParser:
             results = {}
             for endpoint in test_endpoints:
                 try:
-                    response = requests.get(f"{ISUScheduleParser.BASE_URL}{endpoint}", timeout=10)
+                    with upstream_call(endpoint) as call:
+                        response = requests.get(f"{ISUScheduleParser.BASE_URL}{endpoint}", timeout=10)
+                        call.status = response.status_code
                     results[endpoint] = {
                         'status_code': response.status_code,
                         'success': response.status_code == 200
@@ -200,3 +286,93 @@ class ISUScheduleParser:
 
         except Exception as e:
             return {'error': str(e)}
+
+
+class AsyncISUClient:
+    """Пул соединений с API ИСУ для асинхронных представлений.
+
+    С httpx - один httpx.AsyncClient на цикл событий: ожидание ответа ИСУ
+    не занимает ни поток, ни воркер. Без httpx - общая requests.Session
+    с пулом соединений в отдельном пуле из ISU_POOL_SIZE потоков;
+    цикл событий при этом не блокируется.
+    """
+
+    def __init__(self, pool_size=ISU_POOL_SIZE, timeout=ISU_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # Клиент httpx привязан к циклу событий, в котором создан
+        self._per_loop = weakref.WeakKeyDictionary()
+        self._session = None
+        self._executor = None
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._per_loop.get(loop)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            client = self._per_loop[loop] = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return client
+
+    def _threaded_session(self):
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+            # Свой пул потоков: стандартный исполнитель asyncio слишком мал (cpu + 4)
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='isu')
+        return self._session
+
+    async def get_json(self, url, endpoint=''):
+        """GET-запрос. Возвращает (код ответа, JSON или None).
+        endpoint - форма адреса для метрик (без имени группы)
+        """
+        if httpx is not None:
+            with upstream_call(endpoint) as call:
+                response = await self._async_client().get(url)
+                call.status = response.status_code
+            return response.status_code, response.json() if response.status_code == 200 else None
+
+        session = self._threaded_session()
+        with upstream_call(endpoint) as call:
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._executor, partial(session.get, url, timeout=self.timeout))
+            call.status = response.status_code
+        return response.status_code, response.json() if response.status_code == 200 else None
+
+
+isu_client = AsyncISUClient()
+
+
+class AsyncISUScheduleParser:
+    """Асинхронный вариант ISUScheduleParser для ASGI-представлений"""
+
+    @staticmethod
+    async def get_group_schedule(group_name, institution=None):
+        """Получить расписание для группы из API"""
+        errors = (httpx.HTTPError, ValueError) if httpx is not None else (requests.exceptions.RequestException, ValueError)
+        attempts = []
+        endpoints = ISUScheduleParser.schedule_endpoints(group_name, institution)
+        for shape, endpoint in zip(SCHEDULE_ENDPOINTS, endpoints):
+            try:
+                status_code, data = await isu_client.get_json(endpoint, shape)
+            except errors as e:
+                attempts.append((shape, type(e).__name__))
+                continue
+
+            if status_code == 200:
+                group_failures.succeeded(group_name)
+                logger.info("Расписание группы %s получено", group_name,
+                            extra={'group': group_name, 'endpoint': shape, 'attempts': len(attempts) + 1})
+                return data, True
+            attempts.append((shape, str(status_code)))
+
+        group_failures.failed(group_name, attempts)
+        return "Не удалось получить расписание ни с одного эндпоинта", False
+
+    @staticmethod
+    async def update_schedule_for_group(group_name, institution=None):
+        """Обновить расписание группы: запрос к ИСУ без блокировки, запись в БД - в потоке"""
+        with sampled_call(LOG_SAMPLE_RATE):
+            data, success = await AsyncISUScheduleParser.get_group_schedule(group_name, institution)
+            return await sync_to_async(ISUScheduleParser.save_group_schedule)(group_name, data, success, institution)
@@ -0,0 +1,106 @@
+# perf.py - ДАННЫЕ И ОКРУЖЕНИЕ ДЛЯ ЗАМЕРОВ ПРОИЗВОДИТЕЛЬНОСТИ
+import random
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from .models import (Course, Grade, RealSchedule, RecordBook, RecordBookEntry, StudentProfile, Task,
+                     normalize_subject)
+
+SEED_PASSWORD = 'perf-password'
+DAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+LESSON_TIMES = [(time(8, 0), time(9, 30)), (time(9, 45), time(11, 15)), (time(11, 30), time(13, 0)),
+                (time(13, 45), time(15, 15)), (time(15, 30), time(17, 0))]
+
+
+@contextmanager
+def temporary_database(verbosity=0):
+    """Временная тестовая БД на время замера - рабочая база не затрагивается"""
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+
+
+def seed_dataset(students=50, courses=30, groups=5, grades_per_student=40, lessons_per_group=20, seed=0,
+                 username_prefix='student', tasks_per_student=0, now=None):
+    """Заполнить БД большим набором данных. Возвращает список созданных студентов"""
+    rng = random.Random(seed)
+
+    course_objs = Course.objects.bulk_create([
+        Course(name=f'Дисциплина {i}', normalized_name=normalize_subject(f'Дисциплина {i}'), code=f'ДС-{i:03d}',
+               teacher=f'Преподаватель {i % 12}', hours=36 + i % 4 * 36, description=f'Описание дисциплины {i}')
+        for i in range(courses)
+    ])
+    group_names = [f'ГР-{i:03d}' for i in range(groups)]
+
+    password = make_password(SEED_PASSWORD)
+    users = User.objects.bulk_create([
+        User(username=f'{username_prefix}{i}', first_name=f'Имя{i}', last_name=f'Фамилия{i}',
+             email=f'{username_prefix}{i}@example.com', password=password)
+        for i in range(students)
+    ])
+    StudentProfile.objects.bulk_create([
+        StudentProfile(user=user, group=group_names[i % groups], student_id=str(100000 + i))
+        for i, user in enumerate(users)
+    ])
+
+    start = date(2024, 9, 1)
+    Grade.objects.bulk_create([
+        Grade(student=user, course=rng.choice(course_objs), work_type=f'Работа #{n}',
+              grade=rng.choice([2, 3, 4, 4, 5, 5]), date=start + timedelta(days=rng.randrange(120)))
+        for user in users for n in range(grades_per_student)
+    ], batch_size=1000)
+
+    lessons = []
+    for group in group_names:
+        for n in range(lessons_per_group):
+            time_start, time_end = LESSON_TIMES[n % len(LESSON_TIMES)]
+            course = rng.choice(course_objs)
+            lessons.append(RealSchedule(
+                group=group, day=DAYS[n // len(LESSON_TIMES) % len(DAYS)], time_start=time_start,
+                time_end=time_end, subject=course.name, course=course, lesson_type='Лекция',
+                teacher=f'Преподаватель {n % 12}', room=f'{100 + n % 15}', week_type=''))
+    RealSchedule.objects.bulk_create(lessons, batch_size=1000)
+
+    record_books = RecordBook.objects.bulk_create([
+        RecordBook(student=user, semester=semester, academic_year='2024-2025')
+        for user in users for semester in (1, 2)
+    ])
+    RecordBookEntry.objects.bulk_create([
+        RecordBookEntry(record_book=record_book, course=rng.choice(course_objs), exam_type='экзамен',
+                        grade=rng.choice([3, 4, 5]), passed=True, date=start + timedelta(days=100 + n),
+                        teacher=f'Преподаватель {n}')
+        for record_book in record_books for n in range(6)
+    ], batch_size=1000)
+
+    # Дедлайны разбросаны на месяц вокруг now: часть просрочена, часть срочная, часть выполнена
+    now = now or timezone.now()
+    tasks = []
+    for user in users:
+        for n in range(tasks_per_student):
+            deadline = now + timedelta(hours=rng.randrange(-14 * 24, 21 * 24))
+            status = rng.choice([Task.STATUS_NEW, Task.STATUS_IN_PROGRESS, Task.STATUS_DONE])
+            done = status == Task.STATUS_DONE
+            tasks.append(Task(
+                student=user, course=rng.choice(course_objs), title=f'Задание #{n}', task_type='Лабораторная',
+                deadline=deadline, status=status, progress=100 if done else rng.randrange(0, 100, 10),
+                completed_at=deadline - timedelta(days=1) if done else None,
+                remind_at=None if done else deadline - timedelta(hours=24)))
+    Task.objects.bulk_create(tasks, batch_size=1000)
+
+    return users
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга (values не обязаны быть отсортированы)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
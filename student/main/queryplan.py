@@ -0,0 +1,135 @@
+# queryplan.py - АУДИТ ИНДЕКСОВ: ПЛАНЫ ЗАПРОСОВ СТРАНИЦ, ПОЛНЫЕ ПРОСМОТРЫ ТАБЛИЦ И СОРТИРОВКИ
+import re
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Таблицы, которые читаются по первичному ключу или малы - их планы не разбираем
+IGNORED_TABLES = {'django_session', 'django_content_type', 'django_migrations'}
+
+_COLUMN = r'"(?P<table>\w+)"\."(?P<column>\w+)"'
+_EQUALITY = re.compile(_COLUMN + r'\s*(?P<operator>=|IN\b|IS NULL\b)', re.IGNORECASE)
+_ORDER_BY = re.compile(r'\bORDER BY\b(?P<columns>.*?)(?:\bLIMIT\b|\bOFFSET\b|$)', re.IGNORECASE | re.DOTALL)
+_ORDER_COLUMN = re.compile(_COLUMN + r'(?:\s+(?P<direction>ASC|DESC))?', re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r'^SCAN (?P<table>\w+)(?P<rest>.*)$')
+_SQLITE_TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (?P<what>.+)$')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (?P<table>\w+)')
+
+
+@dataclass
+class PlanIssue:
+    """Проблема в плане одного запроса"""
+    kind: str  # 'scan' - полный просмотр таблицы, 'sort' - сортировка во временной структуре
+    table: str
+    detail: str
+    sql: str
+    suggestion: list = field(default_factory=list)
+
+    @property
+    def model(self):
+        return next((model for model in apps.get_models() if model._meta.db_table == self.table), None)
+
+    def suggested_fields(self):
+        """Предложенный индекс в именах полей модели ('-' - по убыванию)"""
+        columns = {f.column: f.name for f in self.model._meta.concrete_fields} if self.model else {}
+        return [
+            ('-' if column.startswith('-') else '') + columns.get(column.lstrip('-'), column.lstrip('-'))
+            for column in self.suggestion
+        ]
+
+    def covered_by(self):
+        """Имя существующего индекса, который начинается с предложенных полей, или None.
+        Тогда сортировка остается из-за IN по нескольким значениям - индекс ей не поможет.
+        """
+        if not self.model or not self.suggestion:
+            return None
+        wanted = [name.lstrip('-') for name in self.suggested_fields()]
+        meta = self.model._meta
+        candidates = [(index.name, [name.lstrip('-') for name in index.fields]) for index in meta.indexes]
+        candidates += [('unique_together', list(fields)) for fields in meta.unique_together]
+        return next((name for name, fields in candidates if fields[:len(wanted)] == wanted), None)
+
+    def index_hint(self):
+        """Строка для Meta.indexes модели"""
+        if not self.suggestion:
+            return ''
+        fields = ', '.join(f"'{name}'" for name in self.suggested_fields())
+        return f'{self.model.__name__ if self.model else self.table}: models.Index(fields=[{fields}])'
+
+
+def explain(sql, using=connection):
+    """Строки плана запроса: EXPLAIN QUERY PLAN для SQLite, EXPLAIN для остальных СУБД"""
+    prefix = 'EXPLAIN QUERY PLAN ' if using.vendor == 'sqlite' else 'EXPLAIN '
+    with using.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        rows = cursor.fetchall()
+    # SQLite: (id, parent, notused, detail); PostgreSQL/MySQL: текст в первой колонке
+    return [row[-1] if using.vendor == 'sqlite' else str(row[0]) for row in rows]
+
+
+def suggest_index(sql, table):
+    """Составной индекс под запрос: сначала столбцы условий на равенство, затем столбцы ORDER BY"""
+    where = re.split(r'\bWHERE\b', sql, maxsplit=1, flags=re.IGNORECASE)
+    equality = []
+    if len(where) == 2:
+        condition = _ORDER_BY.split(where[1])[0]
+        # Точное равенство раньше IN: после IN индекс уже не отдает строки в порядке ORDER BY
+        matches = sorted((m for m in _EQUALITY.finditer(condition) if m['table'] == table),
+                         key=lambda m: m['operator'] != '=')
+        equality = [m['column'] for m in matches]
+    order = _ORDER_BY.search(sql)
+    ordering = []
+    if order:
+        ordering = [
+            ('-' if (m['direction'] or '').upper() == 'DESC' else '') + m['column']
+            for m in _ORDER_COLUMN.finditer(order['columns']) if m['table'] == table
+        ]
+    columns = list(dict.fromkeys(equality))
+    columns += [column for column in ordering if column.lstrip('-') not in columns]
+    return columns
+
+
+def _touched_table(sql):
+    match = re.search(r'\bFROM\s+"(\w+)"', sql, re.IGNORECASE)
+    return match[1] if match else ''
+
+
+def plan_issues(sql, using=connection):
+    """Полные просмотры таблиц и сортировки без индекса в плане запроса"""
+    issues = []
+    for line in explain(sql, using):
+        detail = line.strip()
+        scan = _SQLITE_SCAN.match(detail) or _POSTGRES_SCAN.search(detail)
+        if scan and 'USING' not in detail and scan['table'] not in IGNORED_TABLES:
+            issues.append(PlanIssue('scan', scan['table'], detail, sql, suggest_index(sql, scan['table'])))
+            continue
+        sort = _SQLITE_TEMP_SORT.search(detail)
+        if sort or detail.lstrip('-> ').startswith('Sort '):
+            table = _touched_table(sql)
+            if table and table not in IGNORED_TABLES:
+                issues.append(PlanIssue('sort', table, detail, sql, suggest_index(sql, table)))
+    return issues
+
+
+def capture_queries(client, url, using=connection):
+    """SQL, который выполняет страница (запросы на запись и EXPLAIN-неподходящие отбрасываются)"""
+    with CaptureQueriesContext(using) as captured:
+        client.get(url)
+    return [query['sql'] for query in captured if query['sql'].lstrip().upper().startswith('SELECT')]
+
+
+def audit_pages(client, urls, using=connection):
+    """{url: [PlanIssue, ...]} для каждой страницы; одинаковые запросы разбираются один раз"""
+    report = {}
+    seen = set()
+    for url in urls:
+        issues = []
+        for sql in capture_queries(client, url, using):
+            if sql in seen:
+                continue
+            seen.add(sql)
+            issues.extend(plan_issues(sql, using))
+        report[url] = issues
+    return report
@@ -0,0 +1,136 @@
+# refresh.py - РУЧНОЕ ОБНОВЛЕНИЕ РАСПИСАНИЯ: ПАУЗА ДЛЯ ГРУППЫ, ОДНО ОБНОВЛЕНИЕ В ОЧЕРЕДИ, ЛИМИТ НА СТУДЕНТА
+# Состояние хранится в кэше Django: между рабочими процессами оно общее только с общим кэшем
+# (REDIS_URL, см. CACHES в settings.py); с кэшем в памяти каждый процесс считает сам.
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .institutions import default_institution
+from .jobs import job_queue
+
+logger = logging.getLogger(__name__)
+
+# После обновления группа не обновляется повторно столько секунд - отдается последний результат
+REFRESH_COOLDOWN = getattr(settings, 'SCHEDULE_REFRESH_COOLDOWN', 5 * 60)
+# Обновление в очереди/в работе; ключ снимается по завершении, тайм-аут - страховка от упавшего процесса
+REFRESH_LOCK_TIMEOUT = 2 * 60
+# Нажатий "Обновить" на студента за окно, дальше - 429. Окна фиксированные: 0-10 мин, 10-20 мин...
+USER_REFRESH_LIMIT = getattr(settings, 'SCHEDULE_REFRESH_USER_LIMIT', 5)
+USER_REFRESH_WINDOW = getattr(settings, 'SCHEDULE_REFRESH_USER_WINDOW', 10 * 60)
+
+
+@dataclass
+class RefreshResult:
+    # 'queued', 'done' - выполнено сразу, 'running' - уже в очереди, 'cooldown' - недавний результат, 'throttled'
+    status: str
+    message: str = ''
+    success: bool = True
+    retry_after: int = 0
+
+
+def _group_key(institution, group):
+    return f'{institution}:{group}'
+
+
+def result_key(institution, group):
+    return f'schedule_refresh:result:{_group_key(institution, group)}'
+
+
+def lock_key(institution, group):
+    return f'schedule_refresh:lock:{_group_key(institution, group)}'
+
+
+# Сессия студента: обновление, которое он запустил и результат которого еще не видел
+PENDING_SESSION_KEY = 'schedule_refresh_pending'
+
+
+def user_key(user_id, window):
+    return f'schedule_refresh:user:{user_id}:{window}'
+
+
+def throttle_user(user_id):
+    """Учесть нажатие; секунды до конца окна, если лимит исчерпан, иначе 0.
+    Счетчик окна - add + incr, атомарные и в общем кэше; номер окна в ключе,
+    поэтому истечение ключа не сдвигает границы окна.
+    """
+    now = time.time()
+    window = int(now // USER_REFRESH_WINDOW)
+    key = user_key(user_id, window)
+    cache.add(key, 0, USER_REFRESH_WINDOW)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Ключ вытеснен между add и incr - считаем нажатие первым
+        cache.add(key, 1, USER_REFRESH_WINDOW)
+        count = 1
+    if count > USER_REFRESH_LIMIT:
+        return max(1, int((window + 1) * USER_REFRESH_WINDOW - now))
+    return 0
+
+
+def track_refresh(session, institution, group, pending):
+    """Запомнить в сессии обновление в очереди (pending) - его результат покажет страница расписания"""
+    if pending:
+        session[PENDING_SESSION_KEY] = [institution, group]
+    else:
+        session.pop(PENDING_SESSION_KEY, None)
+
+
+def refresh_pending(session):
+    return PENDING_SESSION_KEY in session
+
+
+def pop_refresh_result(session):
+    """(успех, сообщение) завершенного обновления из сессии; None - обновление еще идет или его нет.
+    Результат, которого уже нет в кэше (истекла пауза группы), не ждем.
+    """
+    pending = session.get(PENDING_SESSION_KEY)
+    if pending is None:
+        return None
+    institution, group = pending
+    last = cache.get(result_key(institution, group))
+    if last is None and cache.get(lock_key(institution, group)) is not None:
+        return None
+    del session[PENDING_SESSION_KEY]
+    return last[:2] if last is not None else None
+
+
+def refresh_group(institution, group):
+    """Фоновая задача: обновить расписание и запомнить результат на время паузы"""
+    from .parsers import ISUScheduleParser
+
+    try:
+        success, message = ISUScheduleParser.update_schedule_for_group(group, institution)
+        cache.set(result_key(institution, group), (success, message, time.time()), REFRESH_COOLDOWN)
+        logger.info("Ручное обновление расписания группы %s: %s", group, message,
+                    extra={'group': group, 'success': success})
+    finally:
+        cache.delete(lock_key(institution, group))
+
+
+def request_refresh(user_id, group, institution=None):
+    """Нажатие "Обновить": лимит студента, пауза группы, одно обновление группы в очереди"""
+    institution = institution or default_institution()
+    retry_after = throttle_user(user_id)
+    if retry_after:
+        return RefreshResult('throttled', 'Слишком много обновлений, попробуйте позже', False, retry_after)
+
+    last = cache.get(result_key(institution, group))
+    if last is not None:
+        success, message, finished_at = last
+        retry_after = max(1, int(finished_at + REFRESH_COOLDOWN - time.time()))
+        return RefreshResult('cooldown', message, success, retry_after)
+
+    # Одновременные нажатия студентов группы сливаются в одно обновление
+    if not cache.add(lock_key(institution, group), True, REFRESH_LOCK_TIMEOUT):
+        return RefreshResult('running', 'Расписание группы уже обновляется')
+    if not job_queue.submit(('refresh_schedule', institution, group), refresh_group, institution, group):
+        return RefreshResult('running', 'Расписание группы уже обновляется')
+    # При JOBS_EAGER задача уже выполнена
+    last = cache.get(result_key(institution, group))
+    if last is not None:
+        return RefreshResult('done', last[1], last[0])
+    return RefreshResult('queued', 'Обновление расписания запущено')
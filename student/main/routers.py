@@ -0,0 +1,169 @@
+# routers.py - МАРШРУТИЗАЦИЯ ЗАПРОСОВ К БД: ШАРДЫ ЗАВЕДЕНИЙ, ЗАПИСЬ В ОСНОВНУЮ БАЗУ, ЧТЕНИЕ С РЕПЛИК
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .institutions import PRIMARY_DB, institution_database, shard_databases
+
+# Сессии всегда читаются с основной базы: сразу после входа реплика может не знать о новой сессии
+PRIMARY_ONLY_APPS = {'sessions'}
+STICKY_COOKIE = 'db_primary'
+# Модели, строки которых хранятся в базе своего заведения (по полю institution)
+SHARDED_MODELS = {'realschedule', 'schedulechange', 'schedulerevision'}
+
+
+class RoutingState:
+    """Состояние маршрутизации одного запроса"""
+
+    def __init__(self, pinned=False):
+        # Читать только с основной базы (пользователь недавно что-то записал)
+        self.pinned = pinned
+        # Представление разрешило читать с реплик (декоратор read_from_replica)
+        self.replica_reads = False
+        # За время запроса была запись - последующие чтения идут в основную базу
+        self.wrote = False
+
+
+_routing_state = ContextVar('db_routing_state', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+class ReplicaRouter:
+    """Пишем всегда в основную базу, читаем с реплик только внутри представлений
+    с @read_from_replica и только если пользователь недавно ничего не записывал.
+    """
+
+    def __init__(self, replicas=None):
+        self._replicas = replicas
+
+    @property
+    def replicas(self):
+        return replica_aliases() if self._replicas is None else self._replicas
+
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if (state is None or not state.replica_reads or state.pinned or state.wrote
+                or not self.replicas or model._meta.app_label in PRIMARY_ONLY_APPS):
+            return PRIMARY_DB
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = True
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY_DB, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики - копии основной базы, схему на них не меняем
+        if db in self.replicas:
+            return False
+        return None
+
+
+class ShardRouter:
+    """Данные заведения - в его собственной базе (settings.INSTITUTIONS[...]['database']).
+
+    Выборки делаются через Model.objects.for_institution(slug): менеджер сам выбирает базу
+    и фильтрует по заведению. Роутер направляет сохранение отдельных объектов по их полю
+    institution и создает на шардах только таблицы шардированных моделей.
+    Ставится перед ReplicaRouter; для основной базы решение оставляет ему.
+    """
+
+    def _shard_for(self, model, hints):
+        instance = hints.get('instance')
+        if model._meta.model_name not in SHARDED_MODELS or not isinstance(instance, model):
+            return None
+        database = institution_database(instance.institution)
+        return None if database == PRIMARY_DB else database
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Занятия в шарде ссылаются на курсы основной базы по id, без внешнего ключа в БД
+        if obj1._meta.model_name in SHARDED_MODELS or obj2._meta.model_name in SHARDED_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in shard_databases():
+            return app_label == 'main' and model_name in SHARDED_MODELS
+        return None
+
+
+def read_from_replica(view):
+    """Разрешить представлению читать с реплик (запись по-прежнему идет в основную базу)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            state = _routing_state.get()
+            if state is not None:
+                state.replica_reads = True
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state = _routing_state.get()
+            if state is not None:
+                state.replica_reads = True
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryStickinessMiddleware:
+    """Read-your-writes: после записи пользователя его чтения на REPLICA_STICKY_SECONDS
+    закрепляются за основной базой (реплики могут отставать).
+    Должен стоять в начале MIDDLEWARE, до всех, кто обращается к БД.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self._finish(state, response)
+
+    @staticmethod
+    def _start(request):
+        state = RoutingState(pinned=STICKY_COOKIE in request.COOKIES)
+        return state, _routing_state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
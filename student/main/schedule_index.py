@@ -0,0 +1,232 @@
+# schedule_index.py - ОБРАТНЫЕ ИНДЕКСЫ РАСПИСАНИЯ: ПРЕПОДАВАТЕЛЬ -> ЗАНЯТИЯ, АУДИТОРИЯ -> ЗАНЯТЫЕ ИНТЕРВАЛЫ
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.db.models import Count, Max
+
+from .institutions import default_institution
+from .models import RealSchedule
+from .timetable import DAYS_ORDER
+
+# Как часто процесс сверяет индекс с БД: расписание могла обновить синхронизация в другом процессе
+INDEX_CHECK_INTERVAL = 30
+# Полная перестройка не реже этого - страховка от пропущенных изменений
+INDEX_MAX_AGE = 10 * 60
+
+Lesson = namedtuple('Lesson', ['group', 'day', 'time_start', 'time_end', 'subject', 'lesson_type',
+                               'teacher', 'room', 'week_type'])
+
+
+def name_key(name):
+    """Ключ поиска преподавателя/аудитории: без различий в регистре, пробелах и ё"""
+    return ' '.join(name.replace('ё', 'е').replace('Ё', 'Е').split()).casefold()
+
+
+def week_key(week_type):
+    """Тип недели ('четная', 'нечетная'); '' - занятие каждую неделю"""
+    return (week_type or '').strip().casefold()
+
+
+def lesson_order(lesson):
+    day = DAYS_ORDER.index(lesson.day) if lesson.day in DAYS_ORDER else len(DAYS_ORDER)
+    return day, lesson.time_start, lesson.group
+
+
+class TimetableIndex:
+    """Индексы расписания одного заведения, обновляемые по группам.
+
+    teachers и rooms - ключ -> {группа: [занятия]}: замена расписания группы трогает
+    только ее записи. busy - аудитория -> {день: {тип недели: (начала, концы)}} слитых
+    непересекающихся интервалов, занятость в момент времени - bisect по каждому типу недели.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.teachers = {}
+        self.rooms = {}
+        self.names = {}
+        self.busy = {}
+        self.stamp = None
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+        self._lock = threading.RLock()
+
+    def replace_group(self, group, lessons, merge=True):
+        """Заменить занятия группы (lessons пустой - группа удалена)"""
+        lessons = [lesson if isinstance(lesson, Lesson) else Lesson(*(getattr(lesson, f) for f in Lesson._fields))
+                   for lesson in lessons]
+        with self._lock:
+            touched_rooms = set()
+            for lesson in self.groups.pop(group, []):
+                for postings, name in ((self.teachers, lesson.teacher), (self.rooms, lesson.room)):
+                    key = name_key(name)
+                    by_group = postings.get(key)
+                    if by_group is not None:
+                        by_group.pop(group, None)
+                        if not by_group:
+                            del postings[key]
+                touched_rooms.add(name_key(lesson.room))
+
+            if lessons:
+                self.groups[group] = lessons
+            for lesson in lessons:
+                for postings, name in ((self.teachers, lesson.teacher), (self.rooms, lesson.room)):
+                    key = name_key(name)
+                    if key:
+                        postings.setdefault(key, {}).setdefault(group, []).append(lesson)
+                        self.names.setdefault(key, ' '.join(name.split()))
+                touched_rooms.add(name_key(lesson.room))
+
+            if merge:
+                for room in touched_rooms:
+                    self._merge_room(room)
+
+    def _merge_room(self, room):
+        by_group = self.rooms.get(room)
+        if not by_group:
+            self.busy.pop(room, None)
+            return
+        days = {}
+        for lesson in sorted((lesson for lessons in by_group.values() for lesson in lessons),
+                             key=lambda lesson: lesson.time_start):
+            starts, ends = days.setdefault(lesson.day, {}).setdefault(week_key(lesson.week_type), ([], []))
+            if ends and lesson.time_start <= ends[-1]:
+                # Пересекается с предыдущим интервалом (поток из нескольких групп) - сливаем
+                ends[-1] = max(ends[-1], lesson.time_end)
+            else:
+                starts.append(lesson.time_start)
+                ends.append(lesson.time_end)
+        self.busy[room] = days
+
+    def merge_all(self):
+        with self._lock:
+            for room in list(self.rooms):
+                self._merge_room(room)
+
+    def _lessons(self, postings, name):
+        key = name_key(name)
+        with self._lock:
+            by_group = postings.get(key)
+            if not by_group:
+                return None, []
+            lessons = [lesson for lessons in by_group.values() for lesson in lessons]
+            return self.names.get(key, name), sorted(lessons, key=lesson_order)
+
+    def teacher_lessons(self, name):
+        """(имя преподавателя, занятия по порядку недели); (None, []) - преподаватель не найден"""
+        return self._lessons(self.teachers, name)
+
+    def room_lessons(self, room):
+        return self._lessons(self.rooms, room)
+
+    def free_rooms(self, day, at, week=None):
+        """[(аудитория, свободна до | None - до конца дня), ...] для дня недели и времени.
+        week - тип недели: занятия по неделям другого типа аудиторию не занимают;
+        None - неделя неизвестна, аудитория занята, если занята хотя бы по одной из недель.
+        """
+        free = []
+        with self._lock:
+            for room, days in self.busy.items():
+                weeks = days.get(day, {})
+                if week is None:
+                    intervals = weeks.values()
+                else:
+                    intervals = [weeks[key] for key in dict.fromkeys(('', week_key(week))) if key in weeks]
+                until = None
+                for starts, ends in intervals:
+                    i = bisect_right(starts, at) - 1
+                    if i >= 0 and at < ends[i]:
+                        break
+                    if i + 1 < len(starts) and (until is None or starts[i + 1] < until):
+                        until = starts[i + 1]
+                else:
+                    free.append((self.names.get(room, room), until))
+        return sorted(free)
+
+
+_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def _stamp(institution):
+    """Состояние расписания заведения в БД - агрегат только по индексу (institution, group, updated_at)"""
+    stats = RealSchedule.objects.for_institution(institution).aggregate(lessons=Count('pk'), updated=Max('updated_at'))
+    return stats['lessons'], stats['updated']
+
+
+def _load_groups(index, lessons, groups=None):
+    """Загрузить в индекс занятия групп (groups=None - всех)"""
+    if groups is not None:
+        lessons = lessons.filter(group__in=groups)
+    # Группа без занятий в выборке удалена из расписания
+    lessons_by_group = {group: [] for group in groups or []}
+    for row in lessons.order_by('group').values_list(*Lesson._fields):
+        lessons_by_group.setdefault(row[0], []).append(Lesson(*row))
+    for group, group_lessons in lessons_by_group.items():
+        index.replace_group(group, group_lessons, merge=groups is not None)
+
+
+def build_index(institution):
+    index = TimetableIndex()
+    # Отметка до чтения строк: изменение во время построения вызовет перестройку при следующей проверке
+    index.stamp = _stamp(institution)
+    _load_groups(index, RealSchedule.objects.for_institution(institution))
+    index.merge_all()
+    return index
+
+
+def refresh_index(institution, index, stamp):
+    """Догнать изменения других процессов: перечитать только группы, переписанные после отметки
+    индекса (синхронизация переписывает группу целиком, updated_at новый у всех ее занятий).
+    False - догнать не удалось (удалены занятия без замены), нужна полная перестройка.
+    """
+    lessons, updated = stamp
+    group_lessons = RealSchedule.objects.for_institution(institution)
+    if updated is not None and index.stamp[1] is not None:
+        changed = list(group_lessons.filter(updated_at__gte=index.stamp[1]).values_list('group', flat=True).distinct())
+        _load_groups(index, group_lessons, changed)
+    index.stamp = stamp
+    return sum(len(group) for group in index.groups.values()) == lessons
+
+
+def timetable_index(institution=None):
+    """Индекс заведения: строится при первом обращении и перестраивается, если расписание
+    изменил другой процесс (проверка не чаще INDEX_CHECK_INTERVAL)
+    """
+    institution = institution or default_institution()
+    index = _indexes.get(institution)
+    now = time.monotonic()
+    if index is not None and now - index.checked_at < INDEX_CHECK_INTERVAL:
+        return index
+    with _registry_lock:
+        index = _indexes.get(institution)
+        if index is not None and now - index.checked_at < INDEX_CHECK_INTERVAL:
+            return index
+        if index is None or now - index.built_at > INDEX_MAX_AGE:
+            index = _indexes[institution] = build_index(institution)
+        else:
+            stamp = _stamp(institution)
+            if stamp != index.stamp and not refresh_index(institution, index, stamp):
+                index = _indexes[institution] = build_index(institution)
+        index.checked_at = now
+        return index
+
+
+def group_schedule_changed(institution, group, lessons):
+    """Синхронизация сохранила новое расписание группы (вызывается после коммита).
+    Индекс этого процесса обновляется по одной группе, без перестройки. Отметка остается
+    прежней: группы, которые до этого синхронизировали другие процессы, в индекс еще
+    не попали - их догонит refresh_index при следующем обращении.
+    """
+    index = _indexes.get(institution or default_institution())
+    if index is None:
+        return
+    index.replace_group(group, lessons)
+    index.checked_at = 0
+
+
+def clear_indexes():
+    with _registry_lock:
+        _indexes.clear()
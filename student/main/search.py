@@ -0,0 +1,164 @@
+# search.py - ПОЛНОТЕКСТОВЫЙ ПОИСК ПО КУРСАМ
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Course
+
+FTS_TABLE = 'main_course_fts'
+# Вес полей в bm25: совпадение в названии важнее, чем в описании
+FTS_WEIGHTS = {'name': 10.0, 'code': 5.0, 'teacher': 3.0, 'description': 1.0}
+FTS_COLUMNS = list(FTS_WEIGHTS)
+_POPULATE_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+    f"SELECT id, {', '.join(FTS_COLUMNS)} FROM {Course._meta.db_table}"
+)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+@lru_cache(maxsize=None)
+def _sqlite_has_fts5():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE t USING fts5(x)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def fts_enabled(using=None):
+    """Поиск через FTS5 доступен только на SQLite, собранном с этим расширением.
+    using - соединение; по умолчанию - база, из которой роутер читает курсы
+    """
+    using = using or connections[router.db_for_read(Course)]
+    return using.vendor == 'sqlite' and _sqlite_has_fts5()
+
+
+def _write_connection(using=None):
+    """Индекс лежит рядом с таблицей курсов - в базе, куда роутер пишет курсы"""
+    return connections[using or router.db_for_write(Course)]
+
+
+def create_index(schema_editor):
+    """Создать и заполнить таблицу FTS5 (вызывается из миграции)"""
+    if not fts_enabled(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{', '.join(FTS_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(_POPULATE_SQL)
+
+
+def drop_index(schema_editor):
+    if fts_enabled(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def index_course(course, using=None):
+    """Добавить или обновить курс в индексе (rowid = id курса)"""
+    index_courses([course], using)
+
+
+def index_courses(courses, using=None):
+    """Добавить или обновить курсы в индексе одним проходом (после bulk_create)"""
+    connection = _write_connection(using)
+    if not courses or not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        ids = [course.pk for course in courses]
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(ids))})', ids)
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [[course.pk, course.name, course.code, course.teacher, course.description] for course in courses],
+        )
+
+
+def unindex_course(course_id, using=None):
+    connection = _write_connection(using)
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [course_id])
+
+
+def rebuild_index(using=None):
+    """Полностью пересобрать индекс (после массовых изменений в обход моделей). Возвращает число курсов"""
+    connection = _write_connection(using)
+    if not fts_enabled(connection):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(_POPULATE_SQL)
+        return cursor.rowcount
+
+
+def build_match_query(text):
+    """Запрос пользователя -> выражение MATCH: все слова обязательны, каждое как префикс"""
+    words = WORD_RE.findall(text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class CourseSearchResults:
+    """Результаты поиска, упорядоченные по релевантности.
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator:
+    в БД уходит один запрос на количество и один на страницу. Все запросы -
+    в одну базу using (роутер может выбрать реплику, а выбирает ее при каждом вызове).
+    """
+
+    def __init__(self, text, using):
+        self.match = build_match_query(text)
+        self.using = using
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            else:
+                with connections[self.using].cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.match])
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        if not self.match or stop <= start:
+            return []
+
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS.values())
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+                [self.match, stop - start, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        courses = Course.objects.using(self.using).in_bulk(ids)
+        return [courses[course_id] for course_id in ids if course_id in courses]
+
+
+def search_courses(text):
+    """Поиск курсов по названию, коду, преподавателю и описанию"""
+    using = router.db_for_read(Course)
+    if fts_enabled(connections[using]):
+        return CourseSearchResults(text, using)
+
+    # Без FTS5 - простой фильтр по подстроке (все слова должны встретиться)
+    queryset = Course.objects.all()
+    for word in WORD_RE.findall(text):
+        queryset = queryset.filter(
+            Q(name__icontains=word) | Q(code__icontains=word) |
+            Q(teacher__icontains=word) | Q(description__icontains=word)
+        )
+    return queryset.order_by('name')
@@ -0,0 +1,35 @@
+// Функция для переключения темы
+function toggleTheme() {
+    const currentTheme = document.documentElement.getAttribute('data-theme');
+    const newTheme = currentTheme === 'dark' ? 'light' : 'dark';
+    const themeIcon = document.getElementById('theme-icon');
+
+    // Применяем новую тему
+    document.documentElement.setAttribute('data-theme', newTheme);
+
+    // Меняем иконку
+    if (newTheme === 'dark') {
+        themeIcon.className = 'fas fa-sun';
+    } else {
+        themeIcon.className = 'fas fa-moon';
+    }
+
+    // Сохраняем в localStorage
+    localStorage.setItem('theme', newTheme);
+}
+
+// Загрузка темы при старте
+document.addEventListener('DOMContentLoaded', function() {
+    const savedTheme = localStorage.getItem('theme') || 'light';
+    const themeIcon = document.getElementById('theme-icon');
+
+    // Применяем сохраненную тему
+    document.documentElement.setAttribute('data-theme', savedTheme);
+
+    // Устанавливаем правильную иконку
+    if (savedTheme === 'dark') {
+        themeIcon.className = 'fas fa-sun';
+    } else {
+        themeIcon.className = 'fas fa-moon';
+    }
+});
@@ -0,0 +1,26 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const courseCards = document.querySelectorAll('.course-card');
+    courseCards.forEach(card => {
+        card.addEventListener('mouseenter', function() {
+            this.style.transform = 'translateY(-8px)';
+        });
+
+        card.addEventListener('mouseleave', function() {
+            this.style.transform = 'translateY(-5px)';
+        });
+    });
+
+    document.querySelectorAll('.btn-course.primary').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const courseName = this.closest('.course-card').querySelector('h3').textContent;
+            alert(`Переход к курсу: ${courseName}`);
+        });
+    });
+
+    document.querySelectorAll('.btn-course.secondary').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const courseName = this.closest('.course-card').querySelector('h3').textContent;
+            alert(`Скачивание материалов курса: ${courseName}`);
+        });
+    });
+});
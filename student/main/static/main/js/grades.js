@@ -0,0 +1,24 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const gradeItems = document.querySelectorAll('.grade-item');
+    gradeItems.forEach((item, index) => {
+        item.style.opacity = '0';
+        item.style.transform = 'translateX(-20px)';
+
+        setTimeout(() => {
+            item.style.transition = 'all 0.5s ease';
+            item.style.opacity = '1';
+            item.style.transform = 'translateX(0)';
+        }, index * 100);
+    });
+
+    const chartBars = document.querySelectorAll('.chart-bar');
+    chartBars.forEach(bar => {
+        const originalHeight = bar.style.height;
+        bar.style.height = '0%';
+
+        setTimeout(() => {
+            bar.style.transition = 'height 1s ease';
+            bar.style.height = originalHeight;
+        }, 500);
+    });
+});
@@ -0,0 +1,28 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Анимация появления карточек
+    const cards = document.querySelectorAll('.semester-card, .stat-card');
+    cards.forEach((card, index) => {
+        card.style.opacity = '0';
+        card.style.transform = 'translateY(20px)';
+
+        setTimeout(() => {
+            card.style.transition = 'all 0.5s ease';
+            card.style.opacity = '1';
+            card.style.transform = 'translateY(0)';
+        }, index * 100);
+    });
+
+    // Подсветка текущего семестра
+    const currentDate = new Date();
+    const currentMonth = currentDate.getMonth() + 1;
+
+    // Определяем текущий семестр (1: сентябрь-январь, 2: февраль-июнь)
+    const currentSemester = currentMonth >= 2 && currentMonth <= 7 ? 2 : 1;
+
+    document.querySelectorAll('.semester-card').forEach(card => {
+        const header = card.querySelector('.semester-header h4');
+        if (header && header.textContent.includes(`${currentSemester} семестр`)) {
+            card.style.borderLeft = '4px solid #4361ee';
+        }
+    });
+});
@@ -0,0 +1,183 @@
+document.addEventListener('DOMContentLoaded', function() {
+    function updateCurrentLessonInfo() {
+        const now = new Date();
+        const currentDay = now.toLocaleDateString('ru-RU', { weekday: 'long' });
+        const currentTime = now.getHours() * 60 + now.getMinutes();
+
+        let currentLesson = null;
+        let nextLesson = null;
+        let foundCurrent = false;
+
+        document.querySelectorAll('.lesson-card').forEach(card => {
+            const day = card.dataset.day;
+            const startTime = card.dataset.start;
+            const endTime = card.dataset.end;
+
+            if (day.toLowerCase() === currentDay.toLowerCase()) {
+                const [startHour, startMinute] = startTime.split(':').map(Number);
+                const [endHour, endMinute] = endTime.split(':').map(Number);
+
+                const startTotal = startHour * 60 + startMinute;
+                const endTotal = endHour * 60 + endMinute;
+
+                if (currentTime >= startTotal && currentTime <= endTotal) {
+                    currentLesson = card;
+                    foundCurrent = true;
+
+                    const subject = card.querySelector('.lesson-subject').textContent;
+                    const room = card.querySelector('.lesson-room').textContent;
+                    const remaining = endTotal - currentTime;
+
+                    document.getElementById('current-subject').textContent = subject;
+                    document.getElementById('current-time').textContent = `${startTime} - ${endTime}`;
+                    document.getElementById('current-room').textContent = room;
+                    document.getElementById('current-status').textContent = `Идет • Осталось ${remaining} мин`;
+                    document.getElementById('current-status').style.color = '#28a745';
+
+                } else if (!foundCurrent && currentTime < startTotal && !nextLesson) {
+                    nextLesson = card;
+                }
+            }
+        });
+
+        if (!currentLesson) {
+            document.getElementById('current-subject').textContent = 'Пар нет';
+            document.getElementById('current-time').textContent = 'Сейчас учебных занятий нет';
+            document.getElementById('current-room').textContent = '';
+            document.getElementById('current-status').textContent = 'Перерыв';
+            document.getElementById('current-status').style.color = '#6c757d';
+        }
+
+        if (nextLesson) {
+            const subject = nextLesson.querySelector('.lesson-subject').textContent;
+            const time = nextLesson.querySelector('.lesson-time').textContent.split(' - ')[0];
+            document.getElementById('next-lesson-info').textContent = `${subject} • ${time}`;
+        } else {
+            document.getElementById('next-lesson-info').textContent = 'Пар больше нет сегодня';
+        }
+
+        updateLessonCardsHighlighting(currentTime, currentDay);
+    }
+
+    function updateLessonCardsHighlighting(currentTime, currentDay) {
+        document.querySelectorAll('.lesson-card').forEach(card => {
+            card.classList.remove('current', 'upcoming');
+
+            const day = card.dataset.day;
+            if (day.toLowerCase() === currentDay.toLowerCase()) {
+                const startTime = card.dataset.start;
+                const [startHour, startMinute] = startTime.split(':').map(Number);
+                const startTotal = startHour * 60 + startMinute;
+                const endTime = card.dataset.end;
+                const [endHour, endMinute] = endTime.split(':').map(Number);
+                const endTotal = endHour * 60 + endMinute;
+
+                if (currentTime >= startTotal && currentTime <= endTotal) {
+                    card.classList.add('current');
+                } else if (currentTime < startTotal) {
+                    card.classList.add('upcoming');
+                }
+            }
+        });
+    }
+
+    updateCurrentLessonInfo();
+    setInterval(updateCurrentLessonInfo, 60000);
+
+    const lessonCards = document.querySelectorAll('.lesson-card');
+    lessonCards.forEach((card, index) => {
+        card.style.opacity = '0';
+        card.style.transform = 'translateY(20px)';
+
+        setTimeout(() => {
+            card.style.transition = 'all 0.5s ease';
+            card.style.opacity = '1';
+            card.style.transform = 'translateY(0)';
+        }, index * 100);
+    });
+
+    // Офлайн-режим: service worker хранит страницу и schedule.json, неделя перерисовывается из JSON
+    const week = document.querySelector('.schedule-week');
+
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value || '';
+        return div.innerHTML;
+    }
+
+    function renderLesson(day, lesson) {
+        const weekType = lesson.week_type
+            ? `<span class="lesson-week-type ${escapeHtml(lesson.week_type.toLowerCase())}">${escapeHtml(lesson.week_type)}</span>`
+            : '';
+        const teacher = lesson.teacher
+            ? `<div class="lesson-teacher"><i class="fas fa-user-tie"></i> ${escapeHtml(lesson.teacher)}</div>`
+            : '';
+        return `
+            <div class="lesson-card" data-day="${escapeHtml(day)}" data-start="${lesson.time_start}" data-end="${lesson.time_end}">
+                <div class="lesson-time">${lesson.time_start} - ${lesson.time_end}</div>
+                <div class="lesson-subject">${escapeHtml(lesson.subject)}</div>
+                <div class="lesson-details">
+                    <span class="lesson-type ${escapeHtml((lesson.lesson_type || '').toLowerCase())}">${escapeHtml(lesson.lesson_type)}</span>
+                    <span class="lesson-room">${escapeHtml(lesson.room)}</span>
+                    ${weekType}
+                </div>
+                ${teacher}
+            </div>`;
+    }
+
+    function renderWeek(data) {
+        if (!week || !data || data.version === week.dataset.version) {
+            return false;
+        }
+        week.innerHTML = data.days.filter(day => day.lessons.length).map(day => `
+            <div class="day-column ${day.day === week.dataset.currentDay ? 'today' : ''}">
+                <div class="day-header">
+                    <h4>${escapeHtml(day.day)}</h4>
+                    <span class="day-date">${day.lessons.length} занятий</span>
+                </div>
+                <div class="lessons-list">${day.lessons.map(lesson => renderLesson(day.day, lesson)).join('')}</div>
+            </div>`).join('');
+        week.dataset.version = data.version;
+        updateCurrentLessonInfo();
+        return true;
+    }
+
+    function loadWeek(fresh) {
+        // Service worker отвечает сохраненной копией и сам проверяет версию на сервере (If-None-Match);
+        // fresh - сразу ждать ответа сервера
+        return fetch(week.dataset.url, { credentials: 'same-origin', cache: fresh ? 'no-cache' : 'default' })
+            .then(response => response.ok ? response.json() : null)
+            .then(renderWeek);
+    }
+
+    if (week && 'serviceWorker' in navigator) {
+        navigator.serviceWorker.register(week.dataset.swUrl)
+            .then(() => loadWeek())
+            .catch(() => {});
+        navigator.serviceWorker.addEventListener('message', event => {
+            if (event.data && event.data.type === 'schedule') {
+                renderWeek(event.data.schedule);
+            }
+        });
+    }
+
+    // Сервер сообщает об изменении расписания группы (Server-Sent Events) - без опроса
+    const changedAlert = document.getElementById('schedule-changed');
+    if (changedAlert && window.EventSource) {
+        const events = new EventSource(changedAlert.dataset.eventsUrl);
+        events.addEventListener('schedule', () => {
+            // Новая неделя подтягивается без перезагрузки; если не вышло - предлагаем обновить страницу
+            (week ? loadWeek(true) : Promise.resolve(false))
+                .then(rendered => { changedAlert.hidden = rendered; })
+                .catch(() => { changedAlert.hidden = false; });
+        });
+    }
+
+    // Обработчики для кнопок управления
+    document.querySelectorAll('.btn-control').forEach(btn => {
+        btn.addEventListener('click', function() {
+            document.querySelectorAll('.btn-control').forEach(b => b.classList.remove('active'));
+            this.classList.add('active');
+        });
+    });
+});
@@ -0,0 +1,118 @@
+function saveAppearanceSettings() {
+    const theme = document.querySelector('input[name="theme"]:checked').value;
+    const fontSize = document.getElementById('fontSize').value;
+    const compactMode = document.getElementById('compactMode').checked;
+
+    // Сохраняем настройки в localStorage
+    localStorage.setItem('appTheme', theme);
+    localStorage.setItem('appFontSize', fontSize);
+    localStorage.setItem('appCompactMode', compactMode);
+
+    showToast('Настройки внешнего вида сохранены!', 'success');
+    applyAppearanceSettings();
+}
+
+function applyAppearanceSettings() {
+    const theme = localStorage.getItem('appTheme') || 'light';
+    const fontSize = localStorage.getItem('appFontSize') || 'medium';
+    const compactMode = localStorage.getItem('appCompactMode') === 'true';
+
+    // Применяем настройки темы
+    document.documentElement.setAttribute('data-theme', theme);
+
+    // Применяем размер шрифта
+    document.documentElement.style.fontSize = 
+        fontSize === 'small' ? '14px' : 
+        fontSize === 'large' ? '18px' : '16px';
+
+    // Применяем компактный режим
+    if (compactMode) {
+        document.body.classList.add('compact-mode');
+    } else {
+        document.body.classList.remove('compact-mode');
+    }
+}
+
+function saveNotificationSettings() {
+    const settings = {
+        grades: document.getElementById('notifyGrades').checked,
+        schedule: document.getElementById('notifySchedule').checked,
+        deadlines: document.getElementById('notifyDeadlines').checked,
+        news: document.getElementById('notifyNews').checked,
+        email: document.getElementById('notifyEmail').checked,
+        browser: document.getElementById('notifyBrowser').checked
+    };
+
+    localStorage.setItem('notificationSettings', JSON.stringify(settings));
+    showToast('Настройки уведомлений сохранены!', 'success');
+}
+
+function changePassword() {
+    showToast('Функция смены пароля в разработке', 'info');
+}
+
+function setup2FA() {
+    showToast('Двухфакторная аутентификация в разработке', 'info');
+}
+
+function updateSchedule() {
+    showToast('Расписание обновляется...', 'info');
+    // Здесь будет вызов API для обновления расписания
+    setTimeout(() => showToast('Расписание успешно обновлено!', 'success'), 2000);
+}
+
+function clearCache() {
+    localStorage.removeItem('appTheme');
+    localStorage.removeItem('appFontSize');
+    localStorage.removeItem('appCompactMode');
+    localStorage.removeItem('notificationSettings');
+    showToast('Кэш очищен!', 'success');
+    location.reload();
+}
+
+function exportGrades() {
+    showToast('Экспорт оценок в разработке', 'info');
+}
+
+function exportSchedule() {
+    showToast('Экспорт расписания в разработке', 'info');
+}
+
+function showToast(message, type = 'info') {
+    // Создаем простой toast
+    const toast = document.createElement('div');
+    toast.className = `alert alert-${type} alert-dismissible fade show position-fixed`;
+    toast.style.cssText = 'top: 20px; right: 20px; z-index: 1060; min-width: 300px;';
+    toast.innerHTML = `
+        ${message}
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    `;
+    document.body.appendChild(toast);
+
+    setTimeout(() => {
+        toast.remove();
+    }, 3000);
+}
+
+// Применяем настройки при загрузке страницы
+document.addEventListener('DOMContentLoaded', function() {
+    applyAppearanceSettings();
+
+    // Загружаем сохраненные настройки уведомлений
+    const savedNotifications = localStorage.getItem('notificationSettings');
+    if (savedNotifications) {
+        const settings = JSON.parse(savedNotifications);
+        document.getElementById('notifyGrades').checked = settings.grades;
+        document.getElementById('notifySchedule').checked = settings.schedule;
+        document.getElementById('notifyDeadlines').checked = settings.deadlines;
+        document.getElementById('notifyNews').checked = settings.news;
+        document.getElementById('notifyEmail').checked = settings.email;
+        document.getElementById('notifyBrowser').checked = settings.browser;
+    }
+
+    // Загружаем сохраненную тему
+    const savedTheme = localStorage.getItem('appTheme');
+    if (savedTheme) {
+        document.getElementById(`theme${savedTheme.charAt(0).toUpperCase() + savedTheme.slice(1)}`).checked = true;
+    }
+});
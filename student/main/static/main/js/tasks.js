@@ -0,0 +1,19 @@
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.btn-task.primary').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const taskName = this.closest('.task-card').querySelector('h4').textContent;
+            alert(`Начало работы над заданием: ${taskName}`);
+        });
+    });
+
+    document.querySelectorAll('.btn-task.secondary').forEach(btn => {
+        btn.addEventListener('click', function() {
+            const taskName = this.closest('.task-card').querySelector('h4').textContent;
+            if (this.querySelector('.fa-upload')) {
+                alert(`Сдача задания: ${taskName}`);
+            } else {
+                alert(`Скачивание материалов для: ${taskName}`);
+            }
+        });
+    });
+});
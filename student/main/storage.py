@@ -0,0 +1,108 @@
+# storage.py - ХРАНИЛИЩА ФАЙЛОВ
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость, без нее собираются только .gz
+    brotli = None
+
+HASH_LENGTH = 32
+CONTENT_HASH_RE = re.compile(rf'(^|/)[0-9a-f]{{2}}/[0-9a-f]{{{HASH_LENGTH}}}\.\w+$')
+# Имена вида schedule.1a2b3c4d5e6f.css, которые строит ManifestStaticFilesStorage
+STATIC_HASH_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+
+def is_content_addressed(name):
+    """Имя файла построено по хешу содержимого и не может указывать на другие данные"""
+    return bool(CONTENT_HASH_RE.search(name) or STATIC_HASH_RE.search(name))
+
+
+class ContentHashStorage(FileSystemStorage):
+    """Файловое хранилище, которое называет файлы по sha256 содержимого.
+
+    Одинаковые загрузки сохраняются один раз, а URL меняется только вместе
+    с содержимым, поэтому такие файлы можно кэшировать навсегда.
+    """
+
+    def hashed_name(self, name, content):
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+
+        digest = sha256.hexdigest()[:HASH_LENGTH]
+        dir_name, file_name = posixpath.split(name)
+        ext = os.path.splitext(file_name)[1].lower()
+        return posixpath.join(dir_name, digest[:2], f'{digest}{ext}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Такой файл уже загружен - переиспользуем его
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+avatar_storage = ContentHashStorage()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и заранее сжатыми копиями.
+
+    При collectstatic рядом с каждым хешированным CSS/JS файлом кладутся
+    .gz и (если установлен brotli) .br версии, которые отдает nginx
+    (gzip_static, deploy/nginx.conf), а без веб-сервера - main.views.static_file.
+    """
+
+    manifest_strict = False
+    compress_extensions = ('.css', '.js', '.svg', '.json', '.txt')
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файла нет среди статики - отдаем ссылку без хеша, а не 500 на всю страницу
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.endswith(self.compress_extensions):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+
+        for suffix, compressed in variants:
+            # Сжатая копия, которая не меньше оригинала, только тратит место
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,129 @@
+# subjects.py - СОПОСТАВЛЕНИЕ ПРЕДМЕТОВ РАСПИСАНИЯ С КУРСАМИ
+import difflib
+import logging
+
+from django.db.models import Q
+
+from .institutions import institution_choices
+from .models import Course, RealSchedule, SubjectCourseLink, normalize_subject
+
+logger = logging.getLogger(__name__)
+
+# Минимальное сходство (difflib.SequenceMatcher.ratio) для нечеткого совпадения
+FUZZY_CUTOFF = 0.85
+
+
+def _match_course(key, courses_by_name):
+    """Курс для нормализованного названия: точное совпадение или ближайшее похожее"""
+    if key in courses_by_name:
+        return courses_by_name[key], 1.0
+
+    matches = difflib.get_close_matches(key, courses_by_name, n=1, cutoff=FUZZY_CUTOFF)
+    if not matches:
+        return None, 0.0
+    return courses_by_name[matches[0]], difflib.SequenceMatcher(None, key, matches[0]).ratio()
+
+
+def resolve_subjects(subjects):
+    """Названия предметов -> {название: id курса или None}.
+
+    Уже известные сопоставления берутся из SubjectCourseLink одним запросом,
+    для новых названий ищется курс и результат сохраняется.
+    """
+    keys = {subject: normalize_subject(subject) for subject in subjects}
+    links = dict(
+        SubjectCourseLink.objects.filter(subject_key__in=set(keys.values()))
+        .values_list('subject_key', 'course_id')
+    )
+
+    missing = {key: subject for subject, key in keys.items() if key not in links}
+    if missing:
+        # Точные совпадения - через индекс по normalized_name
+        courses_by_name = dict(
+            Course.objects.filter(normalized_name__in=list(missing)).values_list('normalized_name', 'pk')
+        )
+        if len(courses_by_name) < len(missing):
+            # Для нечеткого поиска нужен весь справочник названий
+            courses_by_name = dict(Course.objects.values_list('normalized_name', 'pk'))
+
+        new_links = []
+        for key, subject in missing.items():
+            course_id, similarity = _match_course(key, courses_by_name)
+            if course_id is None:
+                logger.info("Для предмета '%s' не найден курс", subject)
+            elif similarity < 1.0:
+                logger.info("Предмет '%s' сопоставлен с курсом %s (сходство %.2f)", subject, course_id, similarity)
+            links[key] = course_id
+            new_links.append(SubjectCourseLink(subject_key=key, subject=subject[:200], course_id=course_id,
+                                               similarity=similarity))
+        SubjectCourseLink.objects.bulk_create(new_links, ignore_conflicts=True)
+
+    return {subject: links[key] for subject, key in keys.items()}
+
+
+def _length_bounds(length):
+    """Длины названий, у которых сходство с названием длины length может достичь FUZZY_CUTOFF:
+    ratio = 2 * совпадения / (сумма длин) <= 2 * min / (сумма длин)
+    """
+    return length * FUZZY_CUTOFF / (2 - FUZZY_CUTOFF), length * (2 - FUZZY_CUTOFF) / FUZZY_CUTOFF
+
+
+def relink_courses(courses, renamed=False):
+    """Курсы созданы или переименованы: пересопоставить предметы, которые от этого могут измениться -
+    несопоставленные и нечеткие, если новое название подходит им лучше, а у переименованных
+    курсов и их собственные. Занятия с этими предметами (RealSchedule.course) обновляются сразу,
+    не дожидаясь синхронизации групп. Возвращает число пересопоставленных предметов.
+    """
+    stale = {}
+    if renamed:
+        stale.update(SubjectCourseLink.objects.filter(course__in=courses).values_list('subject_key', 'course_id'))
+
+    # Кандидаты читаются одним запросом; сравниваются только названия подходящей длины,
+    # дорогой ratio() - после быстрых верхних оценок, как в difflib.get_close_matches
+    candidates = {}
+    for key, course_id, similarity in (SubjectCourseLink.objects.filter(Q(course__isnull=True) | Q(similarity__lt=1.0))
+                                       .values_list('subject_key', 'course_id', 'similarity')):
+        candidates.setdefault(len(key), []).append((key, course_id, similarity))
+    matcher = difflib.SequenceMatcher()
+    for name in {course.normalized_name for course in courses}:
+        low, high = _length_bounds(len(name))
+        matcher.set_seq2(name)
+        for length in [length for length in candidates if low <= length <= high]:
+            for key, course_id, similarity in candidates[length]:
+                if key in stale:
+                    continue
+                matcher.set_seq1(key)
+                threshold = max(FUZZY_CUTOFF, similarity)
+                if key == name or (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+                                   and matcher.ratio() >= threshold and matcher.ratio() > similarity):
+                    stale[key] = course_id
+    if not stale:
+        return 0
+
+    SubjectCourseLink.objects.filter(subject_key__in=list(stale)).delete()
+    course_ids = {course_id for course_id in stale.values() if course_id is not None}
+    for slug, _ in institution_choices():
+        lessons = RealSchedule.objects.for_institution(slug).filter(Q(course__isnull=True) | Q(course_id__in=course_ids))
+        subjects = [subject for subject in lessons.values_list('subject', flat=True).distinct()
+                    if normalize_subject(subject) in stale]
+        for subject, course_id in resolve_subjects(subjects).items():
+            lessons.filter(subject=subject).exclude(course_id=course_id).update(course_id=course_id)
+    return len(stale)
+
+
+def link_schedule(group=None, institution=None):
+    """Проставить RealSchedule.course по таблице сопоставлений. Возвращает число обновленных занятий.
+    Без institution - по очереди для всех заведений (у каждого своя база).
+    """
+    if institution is None:
+        return sum(link_schedule(group, slug) for slug, _ in institution_choices())
+
+    lessons = RealSchedule.objects.for_institution(institution)
+    if group is not None:
+        lessons = lessons.filter(group=group)
+
+    subjects = set(lessons.values_list('subject', flat=True).distinct())
+    updated = 0
+    for subject, course_id in resolve_subjects(subjects).items():
+        updated += lessons.filter(subject=subject).exclude(course_id=course_id).update(course_id=course_id)
+    return updated
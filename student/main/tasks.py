@@ -0,0 +1,138 @@
+# tasks.py - ЗАДАНИЯ: ВЫБОРКИ ПО СРОКАМ И НАПОМИНАНИЯ О ДЕДЛАЙНАХ
+import heapq
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Сколько заданий показывать в каждом разделе страницы
+TASK_LIST_LIMIT = 20
+RECENT_COMPLETED_LIMIT = 5
+
+
+def task_buckets(user, now=None, limit=TASK_LIST_LIMIT):
+    """Задания студента по разделам: просроченные, срочные, активные, недавно выполненные.
+
+    Каждый раздел - отдельный диапазонный запрос по индексу (student, status, deadline),
+    поэтому время не зависит от общего числа заданий в базе.
+    """
+    now = now or timezone.now()
+    urgent_until = now + timedelta(days=getattr(settings, 'TASK_URGENT_DAYS', 3))
+
+    open_filter = Q(status__in=Task.OPEN_STATUSES)
+    counts = Task.objects.filter(student=user).aggregate(
+        overdue=Count('pk', filter=open_filter & Q(deadline__lt=now)),
+        urgent=Count('pk', filter=open_filter & Q(deadline__gte=now, deadline__lt=urgent_until)),
+        active=Count('pk', filter=open_filter & Q(deadline__gte=urgent_until)),
+        completed=Count('pk', filter=Q(status=Task.STATUS_DONE)),
+    )
+
+    open_tasks = Task.objects.filter(student=user, status__in=Task.OPEN_STATUSES).select_related('course')
+    return {
+        'counts': counts,
+        'overdue': list(open_tasks.filter(deadline__lt=now).order_by('-deadline')[:limit]),
+        'urgent': list(open_tasks.filter(deadline__gte=now, deadline__lt=urgent_until)[:limit]),
+        'active': list(open_tasks.filter(deadline__gte=urgent_until)[:limit]),
+        'completed': list(
+            Task.objects.filter(student=user, status=Task.STATUS_DONE)
+            .select_related('course').order_by('-completed_at')[:RECENT_COMPLETED_LIMIT]
+        ),
+    }
+
+
+def send_reminders(task_ids, now):
+    """Отправить напоминания по пачке заданий одним соединением с почтовым сервером.
+
+    Задания перечитываются из БД: за время ожидания их могли сдать или перенести срок.
+    Возвращает число отправленных напоминаний.
+    """
+    tasks = list(
+        Task.objects.filter(pk__in=task_ids, remind_at__lte=now)
+        .select_related('student', 'course')
+    )
+    if not tasks:
+        return 0
+
+    local_tz = timezone.get_current_timezone()
+    messages = [
+        (
+            f'Скоро дедлайн: {task.title}',
+            f'{task.student.first_name or task.student.username}, задание "{task.title}" по курсу '
+            f'"{task.course.name}" нужно сдать до {task.deadline.astimezone(local_tz):%d.%m.%Y %H:%M}.',
+            None,
+            [task.student.email],
+        )
+        for task in tasks if task.student.email
+    ]
+    send_mass_mail(messages)
+    Task.objects.filter(pk__in=[task.pk for task in tasks]).update(remind_at=None, reminder_sent=True)
+    return len(tasks)
+
+
+class ReminderScheduler:
+    """Очередь напоминаний в порядке срока (куча heapq).
+
+    Ближайшие напоминания подгружаются из БД по частичному индексу remind_at
+    и отправляются пачками, когда наступает их время. Между подгрузками
+    планировщику не нужно обращаться к БД, чтобы узнать, когда просыпаться.
+    """
+
+    def __init__(self, batch_size=None, capacity=None, send=send_reminders):
+        self.batch_size = batch_size or getattr(settings, 'TASK_REMINDER_BATCH', 500)
+        self.capacity = capacity or self.batch_size * 10
+        self.send = send
+        self._heap = []
+        self._queued = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def refill(self, horizon):
+        """Добавить в очередь напоминания со сроком до horizon. Возвращает число новых"""
+        rows = (
+            Task.objects.filter(remind_at__lte=horizon)
+            .order_by('remind_at')
+            .values_list('remind_at', 'pk')[:self.capacity]
+        )
+        added = 0
+        for remind_at, task_id in rows:
+            if task_id not in self._queued:
+                heapq.heappush(self._heap, (remind_at, task_id))
+                self._queued.add(task_id)
+                added += 1
+        return added
+
+    def next_due(self):
+        """Время ближайшего напоминания в очереди или None"""
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now):
+        """Отправить все наступившие напоминания пачками по batch_size. Возвращает число отправленных"""
+        sent = 0
+        while self._heap and self._heap[0][0] <= now:
+            batch = []
+            while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                _, task_id = heapq.heappop(self._heap)
+                self._queued.discard(task_id)
+                batch.append(task_id)
+            sent += self.send(batch, now)
+        return sent
+
+
+def process_due_reminders(now=None, batch_size=None):
+    """Разовый проход (например, по cron): отправить все напоминания, срок которых наступил"""
+    now = now or timezone.now()
+    scheduler = ReminderScheduler(batch_size=batch_size)
+    sent = 0
+    while scheduler.refill(now):
+        sent += scheduler.run_due(now)
+    if sent:
+        logger.info("Отправлено напоминаний о дедлайнах: %s", sent)
+    return sent
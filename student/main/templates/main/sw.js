@@ -0,0 +1,90 @@
+// sw.js - SERVICE WORKER РАСПИСАНИЯ: НЕДЕЛЯ ГРУППЫ ДОСТУПНА БЕЗ СЕТИ
+const CACHE = 'schedule-v1';
+const PAGE_URL = '{% url "schedule" %}';
+const DATA_URL = '{% url "schedule_json" %}';
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+function cacheable(response) {
+    // Редирект на вход (сессия истекла) и ошибки не сохраняем
+    return response.ok && !response.redirected && response.type === 'basic';
+}
+
+async function refreshPage(cache) {
+    // Копия страницы без уведомлений и без загрузки из ИСУ (см. X-Schedule-Shell в views.schedule)
+    const response = await fetch(PAGE_URL, { credentials: 'same-origin', headers: { 'X-Schedule-Shell': '1' } });
+    if (cacheable(response)) {
+        await cache.put(PAGE_URL, response);
+    }
+}
+
+async function page(event) {
+    // Сначала сеть; без сети - сохраненная копия, неделю в ней обновит schedule.js из schedule.json
+    const cache = await caches.open(CACHE);
+    try {
+        const response = await fetch(event.request);
+        if (cacheable(response) && !(await cache.match(PAGE_URL))) {
+            event.waitUntil(refreshPage(cache).catch(() => {}));
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(PAGE_URL);
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+async function revalidate(cache, cached) {
+    // Проверка версии: сервер отвечает 304 без тела, пока расписание не изменилось
+    const etag = cached && cached.headers.get('ETag');
+    const response = await fetch(DATA_URL, {
+        credentials: 'same-origin',
+        cache: 'no-store',
+        headers: etag ? { 'If-None-Match': etag } : {},
+    });
+    if (response.status === 304 || !cacheable(response)) {
+        return cached || response;
+    }
+    await cache.put(DATA_URL, response.clone());
+    if (cached && cached.headers.get('ETag') !== response.headers.get('ETag')) {
+        const schedule = await response.clone().json();
+        const clients = await self.clients.matchAll({ type: 'window' });
+        clients.forEach(client => client.postMessage({ type: 'schedule', schedule }));
+        await refreshPage(cache).catch(() => {});
+    }
+    return response;
+}
+
+async function data(event) {
+    // Stale-while-revalidate: сохраненная неделя сразу, проверка версии в фоне
+    const cache = await caches.open(CACHE);
+    const cached = await cache.match(DATA_URL);
+    const network = revalidate(cache, cached);
+    if (!cached || event.request.cache === 'no-cache') {
+        return network.catch(error => cached || Promise.reject(error));
+    }
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+}
+
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+    if (event.request.mode === 'navigate' && url.pathname === PAGE_URL && !url.search) {
+        event.respondWith(page(event));
+    } else if (url.pathname === DATA_URL) {
+        event.respondWith(data(event));
+    }
+});
@@ -1,3 +1,1336 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, time as dtime, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .checks import check_shared_cache
+from .avatars import AVATAR_VARIANTS, process_avatar, render_avatar_variant
+from .events import broker, publish_schedule_change, schedule_event_stream
+from .jobs import JobQueue, ensure_group_schedule, group_schedule_lock_key, schedule_post_registration
+from .management.commands.loadtest import response_ok
+from .logutils import GroupFailureLog, SamplingFilter, sampled_call
+from .middleware import StudentProfileMiddleware
+from .metrics import (REGISTRY, REQUEST_DB_SECONDS, REQUEST_QUERIES, REQUEST_TEMPLATE_SECONDS,
+                      REQUEST_UPSTREAM_SECONDS, UPSTREAM_CALL_SECONDS)
+from .models import (Course, Grade, RealSchedule, ScheduleChange, ScheduleRevision, StudentProfile,
+                     SubjectCourseLink, Task)
+from .parsers import ISUScheduleParser, group_failures
+from .perf import seed_dataset
+from .refresh import refresh_group, request_refresh, throttle_user
+from .queryplan import audit_pages, explain, suggest_index
+from .schedule_index import clear_indexes, timetable_index
+from .routers import STICKY_COOKIE, ReplicaRouter, RoutingState, ShardRouter, _routing_state
+from .search import search_courses
+from .storage import CompressedManifestStaticFilesStorage, avatar_storage, is_content_addressed
+from .subjects import resolve_subjects
+from .tasks import ReminderScheduler, process_due_reminders, task_buckets
+from .timetable import record_schedule_changes, schedule_version
+from .warmup import group_catalogue, warm_up
+
+BASELINE_PATH = Path(__file__).with_name('perf_baseline.json')
+# Во сколько раз страница может стать медленнее базового замера, прежде чем тест упадет
+LATENCY_TOLERANCE = float(os.environ.get('PERF_TOLERANCE', '3'))
+# Абсолютный запас в мс, чтобы быстрые страницы не падали от шума
+LATENCY_SLACK_MS = 25
+TIMING_RUNS = 5
+
+# Верхние границы числа SQL-запросов (сессия, пользователь и профиль уже учтены).
+# Не зависят от объема данных: рост означает N+1.
+MAX_QUERIES = {
+    'dashboard': 5,
+    'grades': 4,
+    'schedule': 5,
+    'record_book': 6,
+    'courses': 5,
+    'profile_update': 3,
+    'tasks': 8,
+}
+
+
+def isu_unavailable(*args, **kwargs):
+    raise AssertionError('Тесты не должны обращаться к API ИСУ')
+
+
+def use_temporary_media(test):
+    """MEDIA_ROOT во временном каталоге на время теста"""
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    media = override_settings(MEDIA_ROOT=media_root)
+    media.enable()
+    test.addCleanup(media.disable)
+    return Path(media_root)
+
+
+@mock.patch('main.parsers.ISUScheduleParser.get_group_schedule', isu_unavailable)
+@mock.patch('main.parsers.AsyncISUScheduleParser.get_group_schedule', isu_unavailable)
+class ViewPerformanceTests(TestCase):
+    """Число запросов и время ответа страниц кабинета на большом наборе данных.
+
+    Базовые замеры хранятся в perf_baseline.json; обновить их:
+    PERF_UPDATE_BASELINE=1 python manage.py test main
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        cls.measured = {}
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = seed_dataset(students=30, courses=200, groups=5,
+                                   grades_per_student=300, lessons_per_group=30,
+                                   tasks_per_student=300)[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        if os.environ.get('PERF_UPDATE_BASELINE') == '1' and cls.measured:
+            BASELINE_PATH.write_text(json.dumps(dict(sorted(cls.measured.items())), indent=2) + '\n')
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def assert_view_performance(self, view_name):
+        url = reverse(view_name)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), MAX_QUERIES[view_name],
+            f'{view_name}: {len(queries)} SQL-запросов\n' + '\n'.join(q['sql'] for q in queries),
+        )
+
+        timings = []
+        for _ in range(TIMING_RUNS):
+            cache.clear()
+            started = time.perf_counter()
+            self.client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        median_ms = statistics.median(timings)
+        self.measured[view_name] = round(median_ms, 2)
+
+        baseline_ms = self.baseline.get(view_name)
+        if baseline_ms is not None and os.environ.get('PERF_UPDATE_BASELINE') != '1':
+            self.assertLessEqual(
+                median_ms, baseline_ms * LATENCY_TOLERANCE + LATENCY_SLACK_MS,
+                f'{view_name}: {median_ms:.1f} мс, базовый замер {baseline_ms} мс',
+            )
+
+    def test_dashboard(self):
+        self.assert_view_performance('dashboard')
+
+    def test_grades(self):
+        self.assert_view_performance('grades')
+
+    def test_schedule(self):
+        self.assert_view_performance('schedule')
+
+    def test_record_book(self):
+        self.assert_view_performance('record_book')
+
+    def test_courses(self):
+        self.assert_view_performance('courses')
+
+    def test_profile_update(self):
+        self.assert_view_performance('profile_update')
+
+    def test_tasks(self):
+        self.assert_view_performance('tasks')
+
+
+class JobQueueTests(TestCase):
+    """Фоновые задачи: дедупликация по ключу, постановка после коммита регистрации"""
+
+    def test_pending_key_is_not_queued_twice(self):
+        jobs = JobQueue(workers=1)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def job(name):
+            calls.append(name)
+            started.set()
+            release.wait(5)
+
+        self.assertTrue(jobs.submit('a', job, 'first'))
+        self.assertTrue(started.wait(5))
+        self.assertFalse(jobs.submit('a', job, 'running'))
+        self.assertTrue(jobs.submit('b', job, 'queued'))
+        self.assertFalse(jobs.submit('b', job, 'queued again'))
+        release.set()
+        jobs.join()
+        self.assertEqual(calls, ['first', 'queued'])
+
+        # Выполненная задача ключ не держит
+        self.assertTrue(jobs.submit('a', job, 'later'))
+        jobs.join()
+        self.assertEqual(calls[-1], 'later')
+
+    @mock.patch('main.views.schedule_post_registration')
+    def test_registration_queues_work_after_commit(self, post_registration):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('register'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com', 'first_name': 'Иван',
+                'last_name': 'Иванов', 'group': 'ИС-101', 'student_id': '1',
+                'password1': 'Sl0zhnyi-parol', 'password2': 'Sl0zhnyi-parol',
+            })
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        # До коммита фоновой задаче нечего читать
+        post_registration.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        user = User.objects.get(username='newcomer')
+        post_registration.assert_called_once_with(user.pk, 'ИС-101', 'uust')
+        self.assertEqual(user.studentprofile.group, 'ИС-101')
+
+    @mock.patch('main.jobs.job_queue.submit')
+    def test_one_schedule_job_per_group(self, submit):
+        schedule_post_registration(1, 'ИС-101', 'uust')
+        schedule_post_registration(2, 'ИС-101', 'uust')
+        keys = [call.args[0] for call in submit.call_args_list]
+        self.assertEqual(keys, [('sample_data', 1), ('group_schedule', 'uust', 'ИС-101'),
+                                ('sample_data', 2), ('group_schedule', 'uust', 'ИС-101')])
+
+    @mock.patch('main.parsers.ISUScheduleParser.update_schedule_for_group', return_value=(True, ''))
+    def test_group_schedule_locked_across_processes(self, update):
+        cache.clear()
+        # Очередь другого процесса уже загружает расписание группы
+        cache.add(group_schedule_lock_key('uust', 'ИС-101'), True)
+        ensure_group_schedule('ИС-101', 'uust')
+        update.assert_not_called()
+
+        cache.delete(group_schedule_lock_key('uust', 'ИС-101'))
+        ensure_group_schedule('ИС-101', 'uust')
+        update.assert_called_once_with('ИС-101', 'uust')
+        # Ключ снимается после загрузки
+        self.assertIsNone(cache.get(group_schedule_lock_key('uust', 'ИС-101')))
+
+
+class StudentProfileMiddlewareTests(TestCase):
+    """Профиль загружается один раз за запрос и не переживает запрос"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('profiled', password='x')
+        cls.student.studentprofile.group = 'ИС-101'
+        cls.student.studentprofile.save()
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def test_profile_loaded_once_per_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('grades'))
+        self.assertEqual(response.wsgi_request.profile.group, 'ИС-101')
+        self.assertEqual(len([q for q in queries if 'main_studentprofile' in q['sql']]), 1)
+
+    def attach(self):
+        request = RequestFactory().get(reverse('grades'))
+        request.session = self.client.session
+        AuthenticationMiddleware(lambda request: None)(request)
+        StudentProfileMiddleware(lambda request: None)(request)
+        return request
+
+    def test_user_and_profile_in_one_query(self):
+        request = self.attach()
+        # Сессия и пользователь с профилем (JOIN)
+        with self.assertNumQueries(2):
+            self.assertEqual(request.profile.group, 'ИС-101')
+            self.assertEqual(request.user.studentprofile.group, 'ИС-101')
+
+        request = self.attach()
+        with self.assertNumQueries(2):
+            self.assertEqual(async_to_sync(request.aprofile)().group, 'ИС-101')
+
+    def test_change_saved_by_another_process_is_seen(self):
+        self.client.get(reverse('grades'))
+        # Запись из другого процесса: сигналы этого процесса о ней не узнают
+        StudentProfile.objects.filter(user=self.student).update(group='ИС-202')
+        response = self.client.get(reverse('grades'))
+        self.assertEqual(response.wsgi_request.profile.group, 'ИС-202')
+        self.assertIs(response.wsgi_request.user.studentprofile, response.wsgi_request.profile._wrapped)
+
+    def test_sidebar_follows_profile_changes(self):
+        self.assertContains(self.client.get(reverse('grades')), 'Группа ИС-101')
+        # Без сохранения через модель: updated_at прежний, сайдбар все равно свежий
+        StudentProfile.objects.filter(user=self.student).update(group='ИС-202')
+        response = self.client.get(reverse('grades'))
+        self.assertContains(response, 'Группа ИС-202')
+        self.assertContains(response, f'href="{reverse("grades")}" class="active"')
+
+
+class AvatarTests(TestCase):
+    """Миниатюры аватара: WebP нужных размеров, повтор при замене, удаление старых файлов"""
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.user = User.objects.create_user('avatar', password='x')
+        self.profile = self.user.studentprofile
+
+    @staticmethod
+    def image(color):
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200), color).save(buffer, 'JPEG')
+        return SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def webp_files(self):
+        return sorted(path.name for path in Path(settings.MEDIA_ROOT).rglob('*.webp'))
+
+    def test_variants_and_replacement(self):
+        self.profile.avatar = self.image('red')
+        self.profile.save()
+        process_avatar(self.profile.pk)
+
+        self.profile.refresh_from_db()
+        for field_name, size in AVATAR_VARIANTS.items():
+            with Image.open(getattr(self.profile, field_name).path) as variant:
+                self.assertEqual((variant.format, variant.size), ('WEBP', (size, size)))
+        old_files = [self.profile.avatar.path, self.profile.avatar_thumb.path, self.profile.avatar_thumb_2x.path]
+
+        self.client.force_login(self.user)
+        with mock.patch('main.views.schedule_avatar_processing') as schedule:
+            self.client.post(reverse('profile_update'), {'group': '', 'student_id': '', 'phone': '',
+                                                         'avatar': self.image('blue')})
+        schedule.assert_called_once_with(self.profile.pk)
+        self.assertEqual([os.path.exists(path) for path in old_files], [False] * 3)
+
+        process_avatar(self.profile.pk)
+        self.assertEqual(len(self.webp_files()), 2)
+
+    def test_avatar_replaced_during_processing_is_retried_boundedly(self):
+        names = [avatar_storage.save('avatars/a.jpg', self.image('red')),
+                 avatar_storage.save('avatars/b.jpg', self.image('blue'))]
+        profiles = StudentProfile.objects.filter(pk=self.profile.pk)
+        profiles.update(avatar=names[0])
+        render = render_avatar_variant
+
+        def render_and_reupload(image, size):
+            # Каждая попытка застает новую загрузку аватара
+            if size == AVATAR_VARIANTS['avatar_thumb']:
+                current = profiles.values_list('avatar', flat=True).get()
+                profiles.update(avatar=names[1 - names.index(current)])
+            return render(image, size)
+
+        with mock.patch('main.avatars.render_avatar_variant', render_and_reupload), \
+                self.assertLogs('main.avatars', 'WARNING'):
+            process_avatar(self.profile.pk)
+
+        self.assertEqual(list(profiles.values_list('avatar_thumb', 'avatar_thumb_2x')), [('', '')])
+        self.assertEqual(self.webp_files(), [])
+
+
+class ContentHashStorageTests(TestCase):
+    """Аватары с именем по хешу содержимого кэшируются браузером навсегда"""
+
+    def setUp(self):
+        self.media_root = use_temporary_media(self)
+
+    def test_name_follows_content(self):
+        name = avatar_storage.save('avatars/me.JPG', ContentFile(b'one'))
+        digest = hashlib.sha256(b'one').hexdigest()[:32]
+        self.assertEqual(name, f'avatars/{digest[:2]}/{digest}.jpg')
+        self.assertTrue(is_content_addressed(name))
+        # Та же картинка под другим именем - тот же файл, другая - другой
+        self.assertEqual(avatar_storage.save('avatars/copy.jpg', ContentFile(b'one')), name)
+        self.assertNotEqual(avatar_storage.save('avatars/me.jpg', ContentFile(b'two')), name)
+
+    def test_only_content_addressed_files_are_immutable(self):
+        response = self.client.get(avatar_storage.url(avatar_storage.save('avatars/me.jpg', ContentFile(b'one'))))
+        response.close()
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        (self.media_root / 'avatars').mkdir(exist_ok=True)
+        (self.media_root / 'avatars' / 'legacy.jpg').write_bytes(b'old')
+        response = self.client.get('/media/avatars/legacy.jpg')
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Cache-Control'))
+
+
+class StaticFilesTests(TestCase):
+    """Собранная статика: хешированные имена по манифесту и предсжатые копии"""
+    css = 'body { color: #333; }\n' * 100
+
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        override = override_settings(STATIC_ROOT=static_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.storage = CompressedManifestStaticFilesStorage(location=static_root)
+        self.storage.save('main/app.css', ContentFile(self.css.encode()))
+        list(self.storage.post_process({'main/app.css': (self.storage, 'main/app.css')}))
+        self.hashed = self.storage.stored_name('main/app.css')
+
+    def get(self, accept_encoding):
+        response = self.client.get(f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING=accept_encoding)
+        content = b''.join(response.streaming_content)
+        return response, content
+
+    def test_manifest_names(self):
+        self.assertRegex(self.hashed, r'^main/app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(is_content_addressed(self.hashed))
+        self.assertTrue(self.storage.exists(self.hashed + '.gz'))
+        # Файла нет в манифесте - ссылка без хеша вместо ошибки страницы
+        self.assertEqual(self.storage.stored_name('main/missing.css'), 'main/missing.css')
+
+    def test_precompressed_copy_follows_accept_encoding(self):
+        response, content = self.get('br;q=0.5, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(content).decode(), self.css)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        for accept_encoding in ('gzip;q=0', 'br;q=0, gzip;q=0', 'identity', '*;q=0', ''):
+            response, content = self.get(accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'), accept_encoding)
+            self.assertEqual(content.decode(), self.css)
+        self.assertEqual(self.get('*')[0]['Content-Encoding'], 'gzip')
+
+
+class MetricsTests(TestCase):
+    """Метрики запросов по имени URL: число SQL-запросов, время шаблонов, эндпоинт /metrics/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('metered', password='x')
+        cls.course = Course.objects.create(name='Химия', code='ХИ-1', teacher='', hours=36)
+        Grade.objects.create(student=cls.student, course=cls.course, work_type='Тест', grade=5,
+                             date=timezone.localdate())
+
+    def setUp(self):
+        for histogram in REGISTRY:
+            histogram.reset()
+        self.client.force_login(self.student)
+
+    @staticmethod
+    def observed(histogram, view):
+        """(сумма, количество наблюдений) серии представления"""
+        return next((total, count) for labels, _, total, count in histogram.collect() if labels['view'] == view)
+
+    def test_sync_view_counts(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('grades'))
+        self.assertEqual(self.observed(REQUEST_QUERIES, 'grades'), (len(queries), 1))
+        self.assertGreater(self.observed(REQUEST_DB_SECONDS, 'grades')[0], 0)
+        self.assertGreater(self.observed(REQUEST_TEMPLATE_SECONDS, 'grades')[0], 0)
+        self.assertEqual(self.observed(REQUEST_UPSTREAM_SECONDS, 'grades'), (0, 1))
+
+    async def test_async_view_counts_queries_from_worker_threads(self):
+        # ORM асинхронного представления работает через sync_to_async в другом потоке
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        response = await client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        queries, count = self.observed(REQUEST_QUERIES, 'dashboard')
+        self.assertEqual(count, 1)
+        self.assertGreater(queries, 0)
+        self.assertGreater(self.observed(REQUEST_DB_SECONDS, 'dashboard')[0], 0)
+
+    def test_endpoint(self):
+        self.client.get(reverse('grades'))
+        self.client.get(reverse('grades'))
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(response, 'cabinet_request_duration_seconds_count{view="grades"} 2')
+        self.assertContains(response, '# TYPE cabinet_request_db_queries histogram')
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+
+class LoadTestHarnessTests(TestCase):
+    """manage.py loadtest: что считается успешным ответом, ошибки клиентов"""
+
+    def test_response_classification(self):
+        login, dashboard = reverse('login'), reverse('dashboard')
+
+        def response(status, url='', location='', history=()):
+            return mock.Mock(status_code=status, url=f'http://server{url}', headers={'Location': location},
+                             history=list(history))
+
+        self.assertTrue(response_ok(response(302, location=dashboard), 'POST'))
+        # Форма входа/регистрации с ошибками показывается заново с 200
+        self.assertFalse(response_ok(response(200), 'POST'))
+        self.assertFalse(response_ok(response(302, location=f'{login}?next={dashboard}'), 'POST'))
+
+        self.assertTrue(response_ok(response(200, dashboard), 'GET'))
+        self.assertTrue(response_ok(response(200, login), 'GET'))
+        # Сессия потеряна: вместо страницы - редирект на вход
+        self.assertFalse(response_ok(response(200, login, history=[response(302)]), 'GET'))
+
+    @mock.patch('main.management.commands.loadtest.VirtualStudent.login', return_value=False)
+    def test_client_error_is_reported(self, login):
+        with self.assertRaisesMessage(CommandError, 'Не удалось войти как load'):
+            call_command('loadtest', concurrency=3, duration=0.1, stdout=StringIO())
+
+
+class CourseSearchTests(TestCase):
+    """Полнотекстовый поиск курсов: ранжирование, префиксы, синхронизация индекса"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('searcher', password='x')
+        cls.web = Course.objects.create(name='Веб-программирование', code='ИС-401', teacher='Иванов А.С.',
+                                        hours=144, description='Django и HTTP')
+        cls.db = Course.objects.create(name='Базы данных', code='ИС-402', teacher='Петрова М.В.',
+                                       hours=120, description='SQL, индексы и программирование запросов')
+
+    def search(self, text):
+        return list(search_courses(text)[:10])
+
+    def test_prefix_and_ranking(self):
+        # Совпадение в названии весит больше, чем в описании
+        self.assertEqual(self.search('програм'), [self.web, self.db])
+
+    def test_all_words_required(self):
+        self.assertEqual(self.search('петрова sql'), [self.db])
+        self.assertEqual(self.search('петрова django'), [])
+
+    def test_index_follows_changes(self):
+        self.web.teacher = 'Сидоров П.К.'
+        self.web.save()
+        self.assertEqual(self.search('сидоров'), [self.web])
+        self.assertEqual(self.search('иванов'), [])
+
+        self.web.delete()
+        self.assertEqual(self.search('програм'), [self.db])
+
+    def test_bulk_created_courses_are_indexed(self):
+        # bulk_create не отправляет post_save - индексирует менеджер курсов
+        Course.objects.bulk_create([
+            Course(name='Теория вероятностей', code='МА-201', teacher='Орлов Д.Е.', hours=72),
+            Course(name='Математическая статистика', code='МА-202', teacher='Орлов Д.Е.', hours=72),
+        ])
+        self.assertEqual(len(self.search('орлов')), 2)
+
+    def test_queries_use_routed_database(self):
+        with mock.patch('main.search.router.db_for_read', return_value='default') as db_for_read:
+            results = search_courses('програм')
+            self.assertEqual(list(results[:10]), [self.web, self.db])
+        db_for_read.assert_called_once_with(Course)
+        self.assertEqual(results.using, 'default')
+
+    def test_view_paginates_results(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('courses'), {'q': 'ИС'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page'].paginator.count, 2)
+        self.assertContains(response, 'Базы данных')
+
+
+class SubjectCourseLinkTests(TestCase):
+    """Связь предметов расписания с курсами при синхронизации"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.algebra = Course.objects.create(name='Алгебра и геометрия', code='МА-1', teacher='', hours=36)
+        cls.it = Course.objects.create(name='Основы информационных технологий', code='ИТ-1', teacher='', hours=36)
+
+    def test_exact_fuzzy_and_unmatched(self):
+        links = resolve_subjects(['АЛГЕБРА и Геометрия (лек.)', 'Основы информационых технологий', 'Философия'])
+        self.assertEqual(links, {
+            'АЛГЕБРА и Геометрия (лек.)': self.algebra.pk,
+            'Основы информационых технологий': self.it.pk,
+            'Философия': None,
+        })
+        # Повторное сопоставление берется из таблицы одним запросом
+        with self.assertNumQueries(1):
+            resolve_subjects(['Философия', 'Алгебра и геометрия'])
+
+    def test_new_course_picks_up_unmatched_subject(self):
+        self.assertEqual(resolve_subjects(['Философия']), {'Философия': None})
+        philosophy = Course.objects.create(name='Философия', code='ФЛ-1', teacher='', hours=36)
+        self.assertEqual(resolve_subjects(['Философия']), {'Философия': philosophy.pk})
+
+    def test_course_changes_reset_only_affected_links(self):
+        resolve_subjects(['Философия', 'История', 'Алгебра и геометрия'])
+        self.assertEqual(SubjectCourseLink.objects.count(), 3)
+
+        # Сохранение без смены названия и несхожий новый курс сопоставлений не трогают
+        self.algebra.hours = 72
+        self.algebra.save()
+        Course.objects.create(name='Физическая культура', code='ФК-1', teacher='', hours=36)
+        self.assertEqual(SubjectCourseLink.objects.count(), 3)
+
+        # Новый подходящий курс сбрасывает только свой несопоставленный предмет
+        Course.objects.create(name='История', code='ИС-1', teacher='', hours=36)
+        self.assertEqual(set(SubjectCourseLink.objects.values_list('subject', flat=True)),
+                         {'Философия', 'Алгебра и геометрия'})
+
+        # Переименование сбрасывает сопоставления самого курса
+        course = Course.objects.get(pk=self.algebra.pk)
+        course.name = 'Линейная алгебра'
+        course.save()
+        self.assertEqual(list(SubjectCourseLink.objects.values_list('subject', flat=True)), ['Философия'])
+
+    @mock.patch('main.parsers.ISUScheduleParser.get_group_schedule')
+    def test_sync_links_lessons(self, get_group_schedule):
+        get_group_schedule.return_value = ([{'day': 'Понедельник', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Алгебра и геометрия', 'type': 'Лекция'},
+            {'time': '09:45-11:15', 'subject': 'Философия', 'type': 'Практика'},
+        ]}], True)
+        success, _ = ISUScheduleParser.update_schedule_for_group('ИС-101')
+        self.assertTrue(success)
+        self.assertEqual(
+            dict(RealSchedule.objects.filter(group='ИС-101').values_list('subject', 'course_id')),
+            {'Алгебра и геометрия': self.algebra.pk, 'Философия': None},
+        )
+        self.assertQuerySetEqual(Course.objects.filter(schedule_lessons__group='ИС-101'), [self.algebra])
+
+    @mock.patch('main.parsers.ISUScheduleParser.get_group_schedule')
+    def test_course_changes_relink_lessons(self, get_group_schedule):
+        get_group_schedule.return_value = ([{'day': 'Понедельник', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Алгебра и геометрия', 'type': 'Лекция'},
+            {'time': '09:45-11:15', 'subject': 'Философия', 'type': 'Практика'},
+        ]}], True)
+        ISUScheduleParser.update_schedule_for_group('ИС-101')
+
+        def lessons():
+            return dict(RealSchedule.objects.filter(group='ИС-101').values_list('subject', 'course_id'))
+
+        # Занятия получают новый курс сразу, без повторной синхронизации группы
+        philosophy, = Course.objects.bulk_create([Course(name='Философия', code='ФЛ-1', teacher='', hours=36)])
+        self.assertEqual(lessons(), {'Алгебра и геометрия': self.algebra.pk, 'Философия': philosophy.pk})
+
+        course = Course.objects.get(pk=self.algebra.pk)
+        course.name = 'Линейная алгебра'
+        course.save()
+        self.assertEqual(lessons(), {'Алгебра и геометрия': None, 'Философия': philosophy.pk})
+
+
+class TaskTests(TestCase):
+    """Разделы страницы заданий и планировщик напоминаний"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.student = User.objects.create_user('tasker', email='tasker@example.com', password='x')
+        cls.course = Course.objects.create(name='Базы данных', code='ИС-402', teacher='', hours=36)
+
+    def create_task(self, hours, **kwargs):
+        return Task.objects.create(student=self.student, course=self.course, title=f'Через {hours} ч',
+                                   deadline=self.now + timedelta(hours=hours), **kwargs)
+
+    def test_buckets(self):
+        overdue = self.create_task(-5)
+        urgent = self.create_task(5)
+        active = self.create_task(24 * 10)
+        done = self.create_task(2, status=Task.STATUS_DONE, completed_at=self.now)
+
+        with self.assertNumQueries(5):
+            buckets = task_buckets(self.student, now=self.now)
+        self.assertEqual(buckets['overdue'], [overdue])
+        self.assertEqual(buckets['urgent'], [urgent])
+        self.assertEqual(buckets['active'], [active])
+        self.assertEqual(buckets['completed'], [done])
+        self.assertEqual(buckets['counts'], {'overdue': 1, 'urgent': 1, 'active': 1, 'completed': 1})
+
+    def test_reminder_time_follows_status(self):
+        task = self.create_task(48)
+        self.assertEqual(task.remind_at, task.deadline - timedelta(hours=24))
+        task.status = Task.STATUS_DONE
+        task.save()
+        self.assertIsNone(task.remind_at)
+
+    def test_scheduler_sends_due_reminders_in_deadline_order(self):
+        tasks = [self.create_task(hours) for hours in (20, 3, 10, 200)]
+        batches = []
+        scheduler = ReminderScheduler(batch_size=2, send=lambda ids, now: batches.append(ids) or len(ids))
+
+        self.assertEqual(scheduler.refill(self.now), 3)
+        self.assertEqual(scheduler.refill(self.now), 0)
+        self.assertEqual(scheduler.run_due(self.now), 3)
+        self.assertEqual(batches, [[tasks[1].pk, tasks[2].pk], [tasks[0].pk]])
+
+    def test_process_due_reminders(self):
+        due = self.create_task(3)
+        later = self.create_task(200)
+        self.assertEqual(process_due_reminders(now=self.now, batch_size=1), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['tasker@example.com'])
+        due.refresh_from_db()
+        self.assertTrue(due.reminder_sent)
+        self.assertIsNone(due.remind_at)
+        later.refresh_from_db()
+        self.assertFalse(later.reminder_sent)
+        # Повторный проход ничего не отправляет
+        self.assertEqual(process_due_reminders(now=self.now), 0)
+
+
+class AsyncScheduleTests(TestCase):
+    """Асинхронные представления расписания под ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('async', password='x')
+        cls.student.studentprofile.group = 'ИС-201'
+        cls.student.studentprofile.save()
+
+    async def test_schedule_loads_missing_group_through_async_parser(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        lessons = [{'day': 'Вторник', 'lessons': [{'time': '09:45-11:15', 'subject': 'Физика', 'type': 'Лекция'}]}]
+
+        with mock.patch('main.parsers.AsyncISUScheduleParser.get_group_schedule',
+                        mock.AsyncMock(return_value=(lessons, True))) as get_group_schedule:
+            response = await client.get(reverse('schedule'))
+            await client.get(reverse('schedule'))
+
+        self.assertEqual(response.status_code, 200)
+        get_group_schedule.assert_awaited_once_with('ИС-201', 'uust')
+        self.assertEqual(response.context['schedule']['Вторник'][0].subject, 'Физика')
+        self.assertEqual(await RealSchedule.objects.filter(group='ИС-201').acount(), 1)
+
+
+class ReplicaRouterTests(TestCase):
+    """Чтение с реплик, запись в основную базу, read-your-writes"""
+
+    def setUp(self):
+        self.router = ReplicaRouter(replicas=['replica0'])
+
+    def route_read(self, state, model=Course):
+        token = _routing_state.set(state)
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            _routing_state.reset(token)
+
+    def test_reads_go_to_replica_only_inside_marked_views(self):
+        state = RoutingState()
+        self.assertEqual(self.route_read(state), 'default')
+        state.replica_reads = True
+        self.assertEqual(self.route_read(state), 'replica0')
+        self.assertEqual(self.route_read(None), 'default')
+
+    def test_sessions_always_read_from_primary(self):
+        from django.contrib.sessions.models import Session
+        state = RoutingState()
+        state.replica_reads = True
+        self.assertEqual(self.route_read(state, Session), 'default')
+
+    def test_write_pins_following_reads_to_primary(self):
+        state = RoutingState()
+        state.replica_reads = True
+        token = _routing_state.set(state)
+        try:
+            self.assertEqual(self.router.db_for_write(Course), 'default')
+        finally:
+            _routing_state.reset(token)
+        self.assertTrue(state.wrote)
+        self.assertEqual(self.route_read(state), 'default')
+
+        pinned = RoutingState(pinned=True)
+        pinned.replica_reads = True
+        self.assertEqual(self.route_read(pinned), 'default')
+
+    def test_sticky_cookie_after_write(self):
+        user = User.objects.create_user('writer', password='x')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('courses'))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        response = self.client.post(reverse('profile_update'), {
+            'group': 'ИС-101', 'student_id': '1', 'phone': '',
+        })
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 10)
+
+
+class AtomicScheduleSyncTests(TestCase):
+    """Синхронизация заменяет расписание группы целиком, одной транзакцией"""
+
+    lessons = [{'day': 'Понедельник', 'lessons': [
+        {'time': '08:00-09:30', 'subject': 'Физика', 'type': 'Лекция'},
+        {'time': '09:45-11:15', 'subject': 'Химия', 'type': 'Практика'},
+    ]}]
+
+    def setUp(self):
+        ISUScheduleParser.save_group_schedule('ИС-101', self.lessons)
+
+    def subjects(self):
+        return set(RealSchedule.objects.filter(group='ИС-101').values_list('subject', flat=True))
+
+    def test_failed_write_keeps_previous_schedule(self):
+        changed = [{'day': 'Вторник', 'lessons': [{'time': '08:00-09:30', 'subject': 'Биология', 'type': 'Лекция'}]}]
+        # Ошибка после удаления и вставки, но до коммита: транзакция откатывается целиком
+        with mock.patch('main.parsers.record_schedule_changes', side_effect=DatabaseError('disk I/O error')):
+            success, _ = ISUScheduleParser.save_group_schedule('ИС-101', changed)
+        self.assertFalse(success)
+        self.assertEqual(self.subjects(), {'Физика', 'Химия'})
+
+    def test_unchanged_schedule_is_not_rewritten(self):
+        with CaptureQueriesContext(connection) as queries:
+            success, _ = ISUScheduleParser.save_group_schedule('ИС-101', self.lessons)
+        self.assertTrue(success)
+        self.assertEqual([query['sql'] for query in queries if query['sql'].startswith(('DELETE', 'INSERT'))], [])
+
+    def test_unparsable_response_keeps_schedule(self):
+        success, _ = ISUScheduleParser.save_group_schedule('ИС-101', [{'day': 'Среда', 'lessons': []}])
+        self.assertFalse(success)
+        self.assertEqual(self.subjects(), {'Физика', 'Химия'})
+
+
+@override_settings(INSTITUTIONS={
+    'uust': {'name': 'УУНиТ', 'database': 'default'},
+    'other': {'name': 'Другой', 'database': 'default', 'isu_base_url': 'http://other.test/api'},
+    'remote': {'name': 'Шард', 'database': 'shard_remote'},
+})
+class InstitutionShardingTests(TestCase):
+    """Данные заведений не смешиваются: своя база, свой источник расписания"""
+    lessons = [{'day': 'Среда', 'lessons': [{'time': '08:00-09:30', 'subject': 'Химия', 'type': 'Лекция'}]}]
+
+    def test_queries_see_only_own_institution(self):
+        for institution in ('uust', 'other'):
+            RealSchedule.objects.create(institution=institution, group='ИС-101', day='Среда',
+                                        time_start='08:00', time_end='09:30', subject='Физика')
+
+        success, _ = ISUScheduleParser.save_group_schedule('ИС-101', self.lessons, institution='other')
+
+        self.assertTrue(success)
+        self.assertEqual(
+            list(RealSchedule.objects.for_institution('uust').filter(group='ИС-101').values_list('subject', flat=True)),
+            ['Физика'],
+        )
+        self.assertEqual(
+            list(RealSchedule.objects.for_institution('other').filter(group='ИС-101').values_list('subject', flat=True)),
+            ['Химия'],
+        )
+
+    def test_shard_routing(self):
+        router = ShardRouter()
+        self.assertEqual(RealSchedule.objects.for_institution('remote').db, 'shard_remote')
+        self.assertEqual(router.db_for_write(RealSchedule, instance=RealSchedule(institution='remote')), 'shard_remote')
+        self.assertIsNone(router.db_for_write(RealSchedule, instance=RealSchedule(institution='uust')))
+        self.assertIsNone(router.db_for_read(Course))
+
+        self.assertTrue(router.allow_migrate('shard_remote', 'main', 'realschedule'))
+        self.assertFalse(router.allow_migrate('shard_remote', 'main', 'course'))
+        self.assertFalse(router.allow_migrate('shard_remote', 'auth', 'user'))
+        self.assertIsNone(router.allow_migrate('default', 'main', 'course'))
+
+    def test_parser_uses_institution_source(self):
+        self.assertTrue(ISUScheduleParser.schedule_endpoints('ИС-101', 'other')[0].startswith('http://other.test/api/'))
+        self.assertTrue(ISUScheduleParser.schedule_endpoints('ИС-101')[0].startswith(ISUScheduleParser.BASE_URL))
+
+
+class WarmupTests(TestCase):
+    """Быстрый старт: тяжелые модули не загружаются при импорте, прогрев заполняет кэши"""
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_startup_does_not_import_http_stack(self):
+        code = ('import django, sys; django.setup(); from django.urls import get_resolver; '
+                'get_resolver().reverse_dict; print(sorted({"main.parsers", "requests"} & set(sys.modules)))')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'student.settings'},
+                                cwd=Path(__file__).resolve().parent.parent)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_warm_up_fills_group_catalogue(self):
+        seed_dataset(students=6, courses=3, groups=2, grades_per_student=0, lessons_per_group=3)
+
+        report = dict((name, result) for name, result, _ in warm_up())
+
+        self.assertGreater(report['шаблоны'], 0)
+        self.assertEqual(report['горячие расписания'], 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(group_catalogue(), ['ГР-000', 'ГР-001'])
+
+        # Новая группа сбрасывает закэшированный каталог
+        ISUScheduleParser.save_group_schedule('ГР-NEW', [
+            {'day': 'Среда', 'lessons': [{'time': '08:00-09:30', 'subject': 'Химия'}]},
+        ])
+        self.assertIn('ГР-NEW', group_catalogue())
+
+
+class UpstreamLoggingTests(TestCase):
+    """Метрики запросов к ИСУ по формам эндпоинтов, сводные сообщения о сбоях, выборочный лог"""
+
+    def setUp(self):
+        UPSTREAM_CALL_SECONDS.reset()
+        group_failures.succeeded('ИС-404')
+
+    @mock.patch('main.parsers.requests.get')
+    def test_failures_are_aggregated_per_group(self, get):
+        get.return_value = mock.Mock(status_code=404)
+
+        with self.assertLogs('main.parsers', 'WARNING') as logs:
+            for _ in range(3):
+                data, success = ISUScheduleParser.get_group_schedule('ИС-404')
+
+        self.assertFalse(success)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('/schedule/group/{group} -> 404', logs.output[0])
+
+        series = {(labels['endpoint'], labels['status']): count
+                  for labels, _, _, count in UPSTREAM_CALL_SECONDS.collect()}
+        self.assertEqual(series[('/schedule/group/{group}', '404')], 3)
+        self.assertEqual(len(series), 3)
+
+    @mock.patch('main.logutils.time.monotonic')
+    def test_failure_log_forgets_expired_groups(self, monotonic):
+        failures = GroupFailureLog(logging.getLogger('main.tests'), interval=60, max_groups=3)
+        attempts = [('/schedule/group/{group}', '404')]
+
+        with self.assertLogs('main.tests', 'WARNING'):
+            monotonic.return_value = 0
+            for group in ('А-1', 'А-2'):
+                failures.failed(group, attempts)
+            self.assertFalse(failures.failed('А-1', attempts))
+
+            # Окно А-1 и А-2 истекло - их вытесняет следующий сбой
+            monotonic.return_value = 100
+            failures.failed('Б-1', attempts)
+            self.assertEqual(list(failures._groups), ['Б-1'])
+
+            # Сверх max_groups вытесняются самые старые
+            for group in ('Б-2', 'Б-3', 'Б-4'):
+                failures.failed(group, attempts)
+        self.assertEqual(list(failures._groups), ['Б-2', 'Б-3', 'Б-4'])
+
+    def test_sampling_is_decided_per_call(self):
+        sampling = SamplingFilter()
+        info = logging.LogRecord('main', logging.INFO, '', 0, 'info', (), None)
+        warning = logging.LogRecord('main', logging.WARNING, '', 0, 'warning', (), None)
+
+        self.assertTrue(sampling.filter(info))
+        with sampled_call(0):
+            self.assertFalse(sampling.filter(info))
+            self.assertTrue(sampling.filter(warning))
+            # Вложенная операция не пересматривает решение внешней
+            with sampled_call(1):
+                self.assertFalse(sampling.filter(info))
+        with sampled_call(1):
+            self.assertTrue(sampling.filter(info))
+
+
+class ScheduleEventsTests(TestCase):
+    """Уведомления об изменении расписания через Server-Sent Events"""
+    lessons = [{'day': 'Среда', 'lessons': [{'time': '08:00-09:30', 'subject': 'Химия'}]}]
+
+    async def test_publish_fans_out_to_group_subscribers_only(self):
+        streams = [schedule_event_stream('uust', 'ИС-101') for _ in range(3)]
+        other = schedule_event_stream('uust', 'ИС-202')
+        for stream in [*streams, other]:
+            self.assertTrue((await anext(stream)).startswith('retry:'))
+        self.assertEqual(broker.subscriber_count(('uust', 'ИС-101')), 3)
+
+        pending = [asyncio.ensure_future(anext(stream)) for stream in [*streams, other]]
+        await asyncio.sleep(0)
+        # Публикация приходит из потока синхронизации, а не из цикла событий
+        await asyncio.to_thread(publish_schedule_change, 'uust', 'ИС-101', lessons=1)
+        done, _ = await asyncio.wait(pending, timeout=1)
+
+        self.assertEqual(len(done), 3)
+        for future in pending[:3]:
+            self.assertEqual(future.result(), 'event: schedule\ndata: {"group": "ИС-101", "lessons": 1}\n\n')
+        pending[3].cancel()
+        await asyncio.gather(pending[3], return_exceptions=True)
+        for stream in [*streams, other]:
+            await stream.aclose()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_sync_publishes_only_when_schedule_changes(self):
+        with mock.patch('main.parsers.publish_schedule_change') as publish:
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    ISUScheduleParser.save_group_schedule('ИС-101', self.lessons)
+            self.assertEqual(publish.call_count, 1)
+
+            changed = [{'day': 'Среда', 'lessons': [{'time': '08:00-09:30', 'subject': 'Химия', 'room': '101'}]}]
+            with self.captureOnCommitCallbacks(execute=True):
+                ISUScheduleParser.save_group_schedule('ИС-101', changed)
+        self.assertEqual(publish.call_count, 2)
+        publish.assert_called_with('uust', 'ИС-101', lessons=1, revision=2)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('sse', password='x')
+        cls.student.studentprofile.group = 'ИС-101'
+        cls.student.studentprofile.save()
+
+    async def test_endpoint_streams_under_asgi(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        response = await client.get(reverse('schedule_events'))
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        await stream.aclose()
+
+    def test_endpoint_declines_under_wsgi(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('schedule_events')).status_code, 204)
+
+
+class OfflineScheduleTests(TestCase):
+    """Версионированный JSON расписания для service worker"""
+    lessons = [{'day': 'Среда', 'lessons': [{'time': '08:00-09:30', 'subject': 'Химия'}]}]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('offline', password='x')
+        cls.student.studentprofile.group = 'ИС-101'
+        cls.student.studentprofile.save()
+
+    def setUp(self):
+        ISUScheduleParser.save_group_schedule('ИС-101', self.lessons)
+        self.client.force_login(self.student)
+
+    def test_version_changes_only_with_schedule(self):
+        version = schedule_version('uust', 'ИС-101')
+        ISUScheduleParser.save_group_schedule('ИС-101', self.lessons)
+        self.assertEqual(schedule_version('uust', 'ИС-101'), version)
+
+        ISUScheduleParser.save_group_schedule('ИС-101', [{'day': 'Среда', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Химия', 'room': '101'}]}])
+        self.assertNotEqual(schedule_version('uust', 'ИС-101'), version)
+
+    def test_json_revalidates_with_etag(self):
+        response = self.client.get(reverse('schedule_json'))
+        data = response.json()
+        self.assertEqual(data['version'], schedule_version('uust', 'ИС-101'))
+        self.assertEqual(data['days'][2], {'day': 'Среда', 'lessons': [{
+            'time_start': '08:00', 'time_end': '09:30', 'subject': 'Химия', 'lesson_type': '',
+            'teacher': '', 'room': '', 'week_type': ''}]})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('schedule_json'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len([q for q in queries if 'main_realschedule' in q['sql']]), 1)
+
+    def test_page_and_service_worker(self):
+        response = self.client.get(reverse('schedule'))
+        self.assertContains(response, f'data-version="{schedule_version("uust", "ИС-101")}"')
+
+        response = self.client.get(reverse('service_worker'))
+        self.assertEqual(response['Content-Type'], 'application/javascript; charset=utf-8')
+        self.assertContains(response, reverse('schedule_json'))
+
+    def test_logout_clears_cached_schedule(self):
+        response = self.client.get(reverse('logout'))
+        self.assertEqual(response['Clear-Site-Data'], '"cache", "storage"')
+
+
+class ConditionalPageTests(TestCase):
+    """304 для страниц кабинета: проверка свежести - не больше одного запроса, без запросов страницы"""
+    lessons = [{'day': 'Среда', 'lessons': [{'time': '08:00-09:30', 'subject': 'Химия'}]}]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('etag', password='x')
+        cls.student.studentprofile.group = 'ИС-101'
+        cls.student.studentprofile.save()
+        cls.course = Course.objects.create(name='Химия', code='ХИ-1', teacher='', hours=36)
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def revalidate(self, view_name):
+        first = self.client.get(reverse(view_name))
+        self.assertEqual(first.status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(view_name), HTTP_IF_NONE_MATCH=first['ETag'])
+        return response, [q['sql'] for q in queries if '"main_' in q['sql'] and 'main_studentprofile' not in q['sql']]
+
+    def test_grades_not_modified_until_grade_changes(self):
+        response, page_queries = self.revalidate('grades')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(page_queries, [])
+
+        etag = response['ETag']
+        Grade.objects.create(student=self.student, course=self.course, work_type='Тест', grade=5,
+                             date=timezone.localdate())
+        self.assertEqual(self.client.get(reverse('grades'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_changed_grade_invalidates_etag_of_loaded_profile(self):
+        grade = Grade.objects.create(student=self.student, course=self.course, work_type='Тест', grade=5,
+                                     date=timezone.localdate())
+        # Профиль уже загружался предыдущими запросами, страница отдается из кэша браузера
+        response, _ = self.revalidate('grades')
+        self.assertEqual(response.status_code, 304)
+
+        grade.grade = 3
+        grade.save()
+        response = self.client.get(reverse('grades'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_schedule_check_costs_one_query(self):
+        ISUScheduleParser.save_group_schedule('ИС-101', self.lessons)
+        response, page_queries = self.revalidate('schedule')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(page_queries), 1)
+
+        etag = response['ETag']
+        ISUScheduleParser.save_group_schedule('ИС-101', [{'day': 'Среда', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Химия', 'room': '101'}]}])
+        self.assertEqual(self.client.get(reverse('schedule'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_are_rendered(self):
+        etag = self.client.get(reverse('record_book'))['ETag']
+        with mock.patch('main.freshness.messages.get_messages', return_value=['Расписание обновлено']):
+            response = self.client.get(reverse('record_book'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class IndexAuditTests(TestCase):
+    """Аудит индексов по планам запросов (manage.py audit_indexes)"""
+
+    def test_suggests_equality_then_ordering_columns(self):
+        sql = ('SELECT "main_grade"."id" FROM "main_grade" WHERE ("main_grade"."grade" IN (4, 5) '
+               'AND "main_grade"."student_id" = 1) ORDER BY "main_grade"."date" DESC LIMIT 5')
+        self.assertEqual(suggest_index(sql, 'main_grade'), ['student_id', 'grade', '-date'])
+
+    def test_cabinet_queries_use_indexes(self):
+        student = seed_dataset(students=3, courses=20, groups=2, grades_per_student=50, lessons_per_group=10)[0]
+        self.client.force_login(student)
+        report = audit_pages(self.client, [reverse('dashboard'), reverse('grades'), reverse('schedule')])
+        self.assertEqual({url: issues for url, issues in report.items() if issues}, {})
+
+        # Проверка версии расписания (ETag, 304) не читает таблицу
+        with CaptureQueriesContext(connection) as queries:
+            schedule_version('uust', 'ГР-000')
+        self.assertIn('COVERING INDEX main_rs_group_version', ' '.join(explain(queries[0]['sql'])))
+
+
+class TimetableIndexTests(TestCase):
+    """Расписания преподавателей и аудиторий, свободные аудитории"""
+
+    def setUp(self):
+        clear_indexes()
+        self.addCleanup(clear_indexes)
+        # Поток: две группы в одной аудитории в пересекающееся время
+        ISUScheduleParser.save_group_schedule('ИС-101', [{'day': 'Среда', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Химия', 'teacher': 'Иванов А.С.', 'room': '101'},
+            {'time': '11:30-13:00', 'subject': 'Физика', 'teacher': 'Петров Б.В.', 'room': '202'},
+        ]}])
+        ISUScheduleParser.save_group_schedule('ИС-102', [{'day': 'Среда', 'lessons': [
+            {'time': '09:00-10:30', 'subject': 'Химия', 'teacher': 'Иванов  А.С.', 'room': '101'},
+        ]}])
+
+    def test_teacher_and_room_lookups(self):
+        index = timetable_index('uust')
+        name, lessons = index.teacher_lessons('иванов а.с.')
+        self.assertEqual(name, 'Иванов А.С.')
+        self.assertEqual([lesson.group for lesson in lessons], ['ИС-101', 'ИС-102'])
+
+        at = lambda hhmm: datetime.strptime(hhmm, '%H:%M').time()
+        self.assertEqual(index.free_rooms('Среда', at('10:00')), [('202', at('11:30'))])
+        self.assertEqual(index.free_rooms('Среда', at('10:30')), [('101', None), ('202', at('11:30'))])
+
+    def test_free_rooms_by_week_type(self):
+        ISUScheduleParser.save_group_schedule('ИС-103', [{'day': 'Среда', 'lessons': [
+            {'time': '10:45-12:15', 'subject': 'Биология', 'room': '101', 'week_type': 'Четная'},
+            {'time': '12:30-14:00', 'subject': 'Биология', 'room': '101', 'week_type': 'Нечетная'},
+        ]}])
+        index = timetable_index('uust')
+        at = lambda hhmm: datetime.strptime(hhmm, '%H:%M').time()
+
+        # Неделя не указана - занятие любой недели занимает аудиторию
+        self.assertEqual(index.free_rooms('Среда', at('11:00')), [('202', at('11:30'))])
+        self.assertEqual(index.free_rooms('Среда', at('10:35')), [('101', at('10:45')), ('202', at('11:30'))])
+        self.assertEqual(index.free_rooms('Среда', at('11:00'), 'нечетная'), [('101', at('12:30')), ('202', at('11:30'))])
+        self.assertEqual(index.free_rooms('Среда', at('12:45'), 'четная'), [('101', None)])
+
+        response = self.client.get(reverse('free_rooms'), {'day': 'Среда', 'time': '11:00', 'week': 'нечетная'})
+        self.assertEqual(response.json()['rooms'][0], {'room': '101', 'free_until': '12:30'})
+
+    def test_sync_updates_index_without_rebuild(self):
+        index = timetable_index('uust')
+        with self.captureOnCommitCallbacks(execute=True):
+            ISUScheduleParser.save_group_schedule('ИС-102', [{'day': 'Среда', 'lessons': [
+                {'time': '09:00-10:30', 'subject': 'Химия', 'teacher': 'Иванов А.С.', 'room': '303'},
+            ]}])
+        self.assertIs(timetable_index('uust'), index)
+        self.assertEqual(len(index.room_lessons('101')[1]), 1)
+        self.assertEqual(index.room_lessons('303')[1][0].group, 'ИС-102')
+
+        # Синхронизация в другом процессе: индекс перечитывает при проверке только измененную группу
+        RealSchedule.objects.filter(group='ИС-101', subject='Физика').update(room='404', updated_at=timezone.now())
+        index.checked_at = 0
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(timetable_index('uust'), index)
+        # Отметка, измененные группы, их занятия
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(index.room_lessons('404')[1][0].subject, 'Физика')
+        self.assertEqual(index.room_lessons('202'), (None, []))
+
+    def test_local_sync_does_not_hide_other_process_changes(self):
+        index = timetable_index('uust')
+        # Другой процесс переписал ИС-101, затем этот процесс синхронизирует ИС-102
+        RealSchedule.objects.filter(group='ИС-101', subject='Физика').update(room='404', updated_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            ISUScheduleParser.save_group_schedule('ИС-102', [{'day': 'Среда', 'lessons': [
+                {'time': '09:00-10:30', 'subject': 'Химия', 'teacher': 'Иванов А.С.', 'room': '303'},
+            ]}])
+
+        self.assertIs(timetable_index('uust'), index)
+        self.assertEqual(index.room_lessons('404')[1][0].group, 'ИС-101')
+        self.assertEqual(index.room_lessons('202'), (None, []))
+        self.assertEqual(index.room_lessons('303')[1][0].group, 'ИС-102')
+
+    def test_views(self):
+        response = self.client.get(reverse('teacher_timetable'), {'name': 'Иванов А.С.'})
+        wednesday = response.json()['days'][2]
+        self.assertEqual([lesson['group'] for lesson in wednesday['lessons']], ['ИС-101', 'ИС-102'])
+        self.assertIn('max-age=30', response['Cache-Control'])
+
+        response = self.client.get(reverse('free_rooms'), {'day': 'Среда', 'time': '12:00'})
+        self.assertEqual(response.json()['rooms'], [{'room': '101', 'free_until': None}])
+        self.assertEqual(self.client.get(reverse('room_timetable', args=['999'])).status_code, 404)
+
+
+class ScheduleChangeFeedTests(TestCase):
+    """Журнал изменений расписания и дельты после версии N"""
+    lessons = [{'day': 'Среда', 'lessons': [
+        {'time': '08:00-09:30', 'subject': 'Химия', 'room': '101'},
+        {'time': '09:45-11:15', 'subject': 'Физика', 'room': '202'},
+    ]}]
+
+    def sync(self, lessons):
+        ISUScheduleParser.save_group_schedule('ИС-101', lessons)
+
+    def test_versions_and_deltas(self):
+        self.sync(self.lessons)
+        self.sync(self.lessons)  # без изменений - новой версии нет
+        self.sync([{'day': 'Среда', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Химия', 'room': '303'},
+            {'time': '13:45-15:15', 'subject': 'История'},
+        ]}])
+
+        response = self.client.get(reverse('group_schedule_changes', args=['ИС-101']), {'since': 1})
+        data = response.json()
+        self.assertEqual((data['revision'], data['reset']), (2, False))
+        self.assertEqual(
+            [(change['version'], change['operation'], change['lesson']['subject'], change['lesson']['room'])
+             for change in data['changes']],
+            [(2, 'changed', 'Химия', '303'), (2, 'removed', 'Физика', '202'), (2, 'added', 'История', '')],
+        )
+
+        # Первая версия - все занятия добавлены: с since=0 расписание собирается целиком
+        data = self.client.get(reverse('group_schedule_changes', args=['ИС-101'])).json()
+        self.assertEqual([change['operation'] for change in data['changes'] if change['version'] == 1], ['added'] * 2)
+
+    def test_unknown_version_requests_reset(self):
+        self.sync(self.lessons)
+        data = self.client.get(reverse('group_schedule_changes', args=['ИС-101']), {'since': 5}).json()
+        self.assertEqual((data['reset'], data['changes']), (True, []))
+        self.assertEqual(
+            self.client.get(reverse('group_schedule_changes', args=['ИС-101']), {'since': 'x'}).status_code, 400)
+
+    def test_version_comes_from_locked_counter(self):
+        self.sync(self.lessons)
+        lesson = {'day': 'Среда', 'time_start': dtime(13, 45), 'time_end': dtime(15, 15), 'subject': 'История',
+                  'lesson_type': '', 'teacher': '', 'room': '', 'week_type': ''}
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as select_for_update:
+            self.assertEqual(record_schedule_changes('uust', 'ИС-101', [], [lesson]), 2)
+        select_for_update.assert_called_once()
+        self.assertEqual(ScheduleRevision.objects.get(group='ИС-101').version, 2)
+
+        # Повтор номера версии для того же занятия - ошибка, а не смешанный журнал
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ScheduleChange.objects.create(group='ИС-101', version=2, operation=ScheduleChange.ADDED, **lesson)
+
+
+class ScheduleRefreshTests(TestCase):
+    """Ручное обновление: пауза для группы, одно обновление в очереди, лимит студента"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('refresh', password='x')
+        cls.student.studentprofile.group = 'ИС-101'
+        cls.student.studentprofile.save()
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(JOBS_EAGER=True)
+    @mock.patch('main.parsers.ISUScheduleParser.update_schedule_for_group', return_value=(True, 'Обновлено'))
+    def test_cooldown_returns_last_result(self, update):
+        self.assertEqual(request_refresh(1, 'ИС-101').status, 'done')
+        result = request_refresh(2, 'ИС-101')
+        self.assertEqual((result.status, result.message), ('cooldown', 'Обновлено'))
+        self.assertEqual(request_refresh(3, 'ИС-102').status, 'done')
+        self.assertEqual(update.call_count, 2)
+
+    @mock.patch('main.refresh.job_queue.submit', return_value=True)
+    def test_concurrent_clicks_collapse(self, submit):
+        self.assertEqual([request_refresh(user_id, 'ИС-101').status for user_id in (1, 2, 3)],
+                         ['queued', 'running', 'running'])
+        submit.assert_called_once()
+
+    @mock.patch('main.refresh.job_queue.submit', return_value=True)
+    def test_user_throttled_with_429(self, submit):
+        self.client.force_login(self.student)
+        statuses = [self.client.get(reverse('update_schedule')).status_code for _ in range(6)]
+        self.assertEqual(statuses, [302] * 5 + [429])
+        response = self.client.get(reverse('update_schedule'))
+        self.assertLessEqual(int(response['Retry-After']), 600)
+
+    @mock.patch('main.refresh.time.time')
+    def test_user_limit_uses_fixed_windows(self, now):
+        now.return_value = 600 * 1000 + 590
+        self.assertEqual([throttle_user(1) for _ in range(6)], [0] * 5 + [10])
+        # Следующее окно начинается с нуля, даже если ключ прошлого еще в кэше
+        now.return_value += 10
+        self.assertEqual(throttle_user(1), 0)
+
+    @mock.patch('main.refresh.job_queue.submit', return_value=True)
+    @mock.patch('main.parsers.ISUScheduleParser.update_schedule_for_group', return_value=(True, 'Обновлено'))
+    def test_queued_result_is_shown_on_schedule_page(self, update, submit):
+        ISUScheduleParser.save_group_schedule('ИС-101', [{'day': 'Среда', 'lessons': [
+            {'time': '08:00-09:30', 'subject': 'Химия'}]}])
+        self.client.force_login(self.student)
+        etag = self.client.get(reverse('schedule'))['ETag']
+
+        self.client.get(reverse('update_schedule'))
+        self.assertContains(self.client.get(reverse('schedule')), 'Результат будет показан')
+        # Пока результат не показан, страница не отвечает 304
+        self.assertEqual(self.client.get(reverse('schedule'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        refresh_group('uust', 'ИС-101')
+        self.assertContains(self.client.get(reverse('schedule')), 'Обновлено')
+        self.assertEqual(self.client.get(reverse('schedule'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_deploy_check_requires_shared_cache(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['main.W001'])
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                   'LOCATION': 'redis://localhost:6379/0'}}):
+            self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,138 @@
+# timetable.py - РАСПИСАНИЕ ГРУППЫ: ВЕРСИЯ И JSON ДЛЯ КЛИЕНТА (SERVICE WORKER)
+import hashlib
+
+from django.db.models import Count, Max
+
+from .institutions import default_institution
+from .models import RealSchedule, ScheduleChange, ScheduleRevision
+
+DAYS_ORDER = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+
+
+def _version(institution, group, stats):
+    raw = f"{institution}:{group}:{stats['lessons']}:{stats['updated'].isoformat() if stats['updated'] else ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _group_lessons(institution, group):
+    return RealSchedule.objects.for_institution(institution or default_institution()).filter(group=group)
+
+
+def schedule_state(institution, group):
+    """(число занятий, версия расписания группы) - один агрегирующий запрос по индексу (institution, group, ...).
+    Синхронизация без изменений строки не перезаписывает, поэтому версия меняется только вместе с данными.
+    """
+    stats = _group_lessons(institution, group).aggregate(lessons=Count('pk'), updated=Max('updated_at'))
+    return stats['lessons'], _version(institution or default_institution(), group, stats)
+
+
+def schedule_version(institution, group):
+    return schedule_state(institution, group)[1]
+
+
+async def aschedule_version(institution, group):
+    stats = await _group_lessons(institution, group).aaggregate(lessons=Count('pk'), updated=Max('updated_at'))
+    return _version(institution or default_institution(), group, stats)
+
+
+def lessons_version(institution, group, lessons):
+    """Та же версия по уже загруженным занятиям группы - без запроса к БД"""
+    stats = {'lessons': len(lessons), 'updated': max((lesson.updated_at for lesson in lessons), default=None)}
+    return _version(institution or default_institution(), group, stats)
+
+
+def lesson_payload(lesson):
+    return {
+        'time_start': lesson.time_start.strftime('%H:%M'),
+        'time_end': lesson.time_end.strftime('%H:%M'),
+        'subject': lesson.subject,
+        'lesson_type': lesson.lesson_type,
+        'teacher': lesson.teacher,
+        'room': lesson.room,
+        'week_type': lesson.week_type,
+    }
+
+
+def group_by_day(lessons):
+    """Занятия по дням недели в порядке DAYS_ORDER"""
+    days = {day: [] for day in DAYS_ORDER}
+    for lesson in lessons:
+        if lesson.day in days:
+            days[lesson.day].append(lesson)
+    return days
+
+
+def schedule_payload(institution, group, version=None):
+    """Неделя группы для клиента: {'group', 'version', 'days': [{'day', 'lessons': [...]}, ...]}"""
+    lessons = _group_lessons(institution, group).order_by('day', 'time_start')
+    days = group_by_day(lessons)
+    return {
+        'group': group,
+        'version': version or schedule_version(institution, group),
+        # Номер в журнале изменений: дальше клиент может догонять дельтами (views.schedule_changes)
+        'revision': schedule_revision(institution, group),
+        'days': [
+            {'day': day, 'lessons': [lesson_payload(lesson) for lesson in day_lessons]}
+            for day, day_lessons in days.items()
+        ],
+    }
+
+
+def _group_changes(institution, group):
+    return ScheduleChange.objects.for_institution(institution or default_institution()).filter(group=group)
+
+
+def _group_revisions(institution, group):
+    return ScheduleRevision.objects.for_institution(institution or default_institution()).filter(group=group)
+
+
+def schedule_revision(institution, group):
+    """Номер последней версии группы в журнале изменений (0 - изменений еще не было)"""
+    return _group_revisions(institution, group).values_list('version', flat=True).first() or 0
+
+
+def _lesson_order(lesson):
+    day = DAYS_ORDER.index(lesson['day']) if lesson['day'] in DAYS_ORDER else len(DAYS_ORDER)
+    return day, lesson['time_start'], lesson['subject']
+
+
+def schedule_delta(previous, current):
+    """Изменения между двумя наборами занятий группы (словари полей занятия):
+    [(операция, занятие), ...]. Занятие определяется ключом (day, time_start, subject).
+    """
+    before = {(lesson['day'], lesson['time_start'], lesson['subject']): lesson for lesson in previous}
+    after = {(lesson['day'], lesson['time_start'], lesson['subject']): lesson for lesson in current}
+    delta = [(ScheduleChange.REMOVED, before[key]) for key in before.keys() - after.keys()]
+    delta += [(ScheduleChange.ADDED, after[key]) for key in after.keys() - before.keys()]
+    delta += [(ScheduleChange.CHANGED, after[key]) for key in after.keys() & before.keys() if after[key] != before[key]]
+    return sorted(delta, key=lambda change: _lesson_order(change[1]))
+
+
+def record_schedule_changes(institution, group, previous, current):
+    """Записать изменения следующей версией группы. Вызывается в транзакции синхронизации:
+    строка счетчика группы заблокирована до ее конца. Возвращает версию или None.
+    """
+    delta = schedule_delta(previous, current)
+    if not delta:
+        return None
+    institution = institution or default_institution()
+    revisions = _group_revisions(institution, group)
+    revisions.get_or_create(institution=institution, group=group)
+    revision = revisions.select_for_update().get()
+    revision.version = version = revision.version + 1
+    revision.save(update_fields=['version'])
+    ScheduleChange.objects.for_institution(institution).bulk_create([
+        ScheduleChange(institution=institution, group=group, version=version, operation=operation, **lesson)
+        for operation, lesson in delta
+    ])
+    return version
+
+
+def schedule_changes(institution, group, since=0):
+    """Изменения группы после версии since по порядку версий"""
+    return _group_changes(institution, group).filter(version__gt=since).order_by('version', 'id')
+
+
+def change_payload(change):
+    return {'version': change.version, 'operation': change.operation,
+            'lesson': {'day': change.day, **lesson_payload(change)}}
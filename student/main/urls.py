@@ -16,10 +16,32 @@ urlpatterns = [
     path('dashboard/grades/', views.grades, name='grades'),
     path('dashboard/schedule/', views.schedule, name='schedule'),
     path('dashboard/schedule/update/', views.update_schedule, name='update_schedule'),
+    path('dashboard/schedule/events/', views.schedule_events, name='schedule_events'),
+    path('dashboard/schedule.json', views.schedule_json, name='schedule_json'),
+    path('dashboard/sw.js', views.service_worker, name='service_worker'),
     path('dashboard/tasks/', views.tasks, name='tasks'),
     path('dashboard/record-book/', views.record_book, name='record_book'),
     path('dashboard/profile/', views.profile_update, name='profile_update'),
     path('dashboard/settings/', views.settings, name='settings'),  # Новая страница настроек
+
+    # Расписания преподавателей и аудиторий, свободные аудитории (JSON, в т.ч. для табло в корпусах)
+    path('timetable/teacher/', views.teacher_timetable, name='teacher_timetable'),
+    path('timetable/room/<str:room>/', views.room_timetable, name='room_timetable'),
+    path('timetable/free-rooms/', views.free_rooms, name='free_rooms'),
+    path('timetable/group/<str:group>/changes/', views.group_schedule_changes, name='group_schedule_changes'),
+
+    # Метрики для Prometheus
+    path('metrics/', views.metrics, name='metrics'),
 ]
+if settings.SERVE_FILES:
+    # Без веб-сервера: аватары с долгим кэшированием для файлов с хешем в имени
+    urlpatterns += [
+        path(f'{settings.MEDIA_URL.lstrip("/")}avatars/<path:path>', views.avatar_file, name='avatar_file'),
+    ]
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+elif settings.SERVE_FILES:
+    # Собранная collectstatic статика: хешированные имена, .br/.gz копии
+    urlpatterns += [
+        path(f'{settings.STATIC_URL.lstrip("/")}<path:path>', views.static_file, name='static_file'),
+    ]
\ No newline at end of file
@@ -1,20 +1,46 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
+from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+from django.views.static import serve
+from .events import schedule_event_stream
+from .freshness import conditional_page, refresh_marker, schedule_marker
+from .institutions import default_institution, get_institution
 from .forms import CustomLoginForm, CustomUserCreationForm, ProfileUpdateForm
-from .models import Course, Grade, StudentProfile, RealSchedule
-from .parsers import ISUScheduleParser
+from .jobs import schedule_avatar_processing, schedule_post_registration
+from .metrics import render_metrics
+from .models import Course, Grade, StudentProfile, RealSchedule, RecordBook
+from .storage import avatar_storage, is_content_addressed
+from .refresh import pop_refresh_result, request_refresh, track_refresh
+from .routers import read_from_replica
+from .schedule_index import timetable_index
+from .search import search_courses
+from .tasks import task_buckets
+from .timetable import (DAYS_ORDER, change_payload, group_by_day, lesson_payload, lessons_version,
+                        schedule_changes, schedule_payload, schedule_revision, schedule_version)
+from .warmup import group_catalogue
 from django.template.defaulttags import register
 from django.template.defaulttags import register
 import logging
+import os
+from collections import Counter
 
 logger = logging.getLogger(__name__)
 
+COURSES_PER_PAGE = 12
+
 def home(request):
     """Главная страница"""
     # Если пользователь авторизован, перенаправляем в кабинет
@@ -39,7 +65,7 @@ def user_login(request):
                 login(request, user)
                 messages.success(request, f'Добро пожаловать, {user.first_name}!')
                 next_url = request.GET.get('next', 'dashboard')
-                return redirect(next_url)
+                return clear_site_data(redirect(next_url))
             else:
                 messages.error(request, 'Неверное имя пользователя или пароль.')
         else:
@@ -58,31 +84,18 @@ def user_register(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
-            user = form.save()
+            # В транзакции только пользователь и профиль, остальное - фоновыми задачами
+            with transaction.atomic():
+                user = form.save()
+                group = form.cleaned_data['group']
+                institution = form.cleaned_data['institution']
+                transaction.on_commit(lambda: schedule_post_registration(user.pk, group, institution))
 
             # Автоматический вход после регистрации
-            login(request, user)
+            login(request, user, backend=django_settings.AUTHENTICATION_BACKENDS[0])
             messages.success(request, f'Аккаунт создан! Добро пожаловать, {user.first_name}!')
-
-            # Создаем тестовые данные для нового пользователя
-            create_sample_data(user)
-
-            # АВТОМАТИЧЕСКАЯ ЗАГРУЗКА РАСПИСАНИЯ
-            try:
-                profile = user.studentprofile
-                group = profile.group
-                if group:
-                    logger.info(f"Автоматическая загрузка расписания для новой группы: {group}")
-                    success, message = ISUScheduleParser.update_schedule_for_group(group)
-                    if success:
-                        messages.info(request, f"✅ Расписание для группы {group} успешно загружено")
-                        logger.info(f"Расписание для {group} загружено успешно")
-                    else:
-                        messages.warning(request, f"⚠️ Расписание временно недоступно: {message}")
-                        logger.warning(f"Не удалось загрузить расписание для {group}: {message}")
-            except Exception as e:
-                logger.error(f"Ошибка автоматической загрузки расписания: {e}")
-                messages.warning(request, "⚠️ Не удалось загрузить расписание. Вы можете обновить его позже в разделе расписания.")
+            if group:
+                messages.info(request, f"🔄 Расписание для группы {group} загружается и скоро появится")
 
             return redirect('dashboard')
     else:
@@ -95,25 +108,37 @@ def user_logout(request):
     """Выход из системы"""
     logout(request)
     messages.info(request, 'Вы успешно вышли из системы.')
-    return redirect('home')
+    return clear_site_data(redirect('home'))
+
+
+def clear_site_data(response):
+    """Удалить в браузере кэш и хранилище прошлого пользователя (service worker хранит его расписание)"""
+    response['Clear-Site-Data'] = '"cache", "storage"'
+    return response
 
 @login_required
 @login_required
-def dashboard(request):
+@read_from_replica
+@conditional_page()
+async def dashboard(request):
     """Главная страница кабинета"""
-    try:
-        profile = request.user.studentprofile
-    except StudentProfile.DoesNotExist:
-        # Создаем профиль если его нет
-        profile = StudentProfile.objects.create(user=request.user)
+    # Профиль загружен StudentProfileMiddleware
+    profile = await request.aprofile()
+
+    student_grades = Grade.objects.filter(student=request.user)
 
-    # Получаем последние оценки
-    recent_grades = Grade.objects.filter(student=request.user).order_by('-date')[:5]
+    # Получаем последние оценки (шаблон отрисовывается без обращений к БД)
+    recent_grades = [grade async for grade in student_grades.select_related('course').order_by('-date')[:5]]
 
-    # Статистика
-    total_grades = Grade.objects.filter(student=request.user).count()
-    avg_grade = Grade.objects.filter(student=request.user).aggregate(Avg('grade'))['grade__avg'] or 0
-    excellent_grades = Grade.objects.filter(student=request.user, grade=5).count()
+    # Статистика одним запросом
+    grade_stats = await student_grades.aaggregate(
+        total=Count('id'),
+        avg=Avg('grade'),
+        excellent=Count('id', filter=Q(grade=5)),
+    )
+    total_grades = grade_stats['total']
+    avg_grade = grade_stats['avg'] or 0
+    excellent_grades = grade_stats['excellent']
 
     # Текущая дата
     from datetime import datetime
@@ -133,16 +158,42 @@ def dashboard(request):
 
 
 @login_required
+@read_from_replica
 def courses(request):
-    """Страница курсов"""
-    courses_list = Course.objects.all()
-    return render(request, 'main/courses.html', {'courses': courses_list})
+    """Страница курсов с поиском и постраничным выводом"""
+    query = request.GET.get('q', '').strip()
+    profile = request.profile
+    group = profile.group
+    only_group = bool(request.GET.get('mine')) and bool(group)
+    if query:
+        courses_list = search_courses(query)
+    elif only_group:
+        # Курсы из расписания группы - по связи занятий с курсами, без сравнения строк.
+        # Расписание может лежать в шарде заведения, поэтому без JOIN: сначала id курсов
+        course_ids = set(
+            RealSchedule.objects.for_institution(profile.institution)
+            .filter(group=group, course__isnull=False).values_list('course_id', flat=True)
+        )
+        courses_list = Course.objects.filter(pk__in=course_ids).order_by('name')
+    else:
+        courses_list = Course.objects.order_by('name')
+
+    page = Paginator(courses_list, COURSES_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'main/courses.html', {
+        'courses': page.object_list,
+        'page': page,
+        'query': query,
+        'group': group,
+        'only_group': only_group,
+    })
 
 
 @login_required
+@read_from_replica
+@conditional_page()
 def grades(request):
     """Страница успеваемости"""
-    grades_list = Grade.objects.filter(student=request.user).order_by('-date')
+    grades_list = list(Grade.objects.filter(student=request.user).select_related('course').order_by('-date'))
 
     subjects = {}
     for grade in grades_list:
@@ -150,11 +201,13 @@ def grades(request):
             subjects[grade.course.name] = []
         subjects[grade.course.name].append(grade)
 
+    # Оценки уже загружены - считаем распределение без дополнительных запросов
+    grade_counts = Counter(grade.grade for grade in grades_list)
     grade_distribution = {
-        '5': Grade.objects.filter(student=request.user, grade=5).count(),
-        '4': Grade.objects.filter(student=request.user, grade=4).count(),
-        '3': Grade.objects.filter(student=request.user, grade=3).count(),
-        '2': Grade.objects.filter(student=request.user, grade=2).count(),
+        '5': grade_counts[5],
+        '4': grade_counts[4],
+        '3': grade_counts[3],
+        '2': grade_counts[2],
     }
 
     context = {
@@ -168,8 +221,10 @@ def grades(request):
 @login_required
 def schedule(request):
     """УЛУЧШЕННАЯ страница расписания с реальными данными"""
+    from .parsers import ISUScheduleParser
+
     try:
-        profile = request.user.studentprofile
+        profile = request.profile
         group = profile.group
 
         if not group:
@@ -185,7 +240,7 @@ def schedule(request):
 
         # Если расписания нет, пытаемся загрузить
         if not schedule_data_loaded:
-            logger.info(f"Расписание для {group} не найдено, пытаемся загрузить...")
+            logger.info("Расписание для %s не найдено, пытаемся загрузить...", group)
             success, message = ISUScheduleParser.update_schedule_for_group(group)
             if success:
                 messages.success(request, f"✅ {message}")
@@ -243,7 +298,7 @@ def schedule(request):
         messages.error(request, '❌ Профиль студента не найден')
         return redirect('dashboard')
     except Exception as e:
-        logger.error(f"Ошибка загрузки расписания: {e}")
+        logger.error("Ошибка загрузки расписания: %s", e)
         messages.error(request, f'❌ Ошибка загрузки расписания: {e}')
         context = {
             'schedule': {},
@@ -263,15 +318,17 @@ def schedule(request):
 @login_required
 def update_schedule(request):
     """УЛУЧШЕННОЕ ручное обновление расписания"""
+    from .parsers import ISUScheduleParser
+
     try:
-        profile = request.user.studentprofile
+        profile = request.profile
         group = profile.group
 
         if not group:
             messages.error(request, '❌ Сначала укажите вашу учебную группу в настройках профиля')
             return redirect('settings')
 
-        logger.info(f"Ручное обновление расписания для группы: {group}")
+        logger.info("Ручное обновление расписания для группы: %s", group)
 
         # Показываем уведомление о начале обновления
         messages.info(request, f'🔄 Обновляем расписание для группы {group}...')
@@ -280,13 +337,13 @@ def update_schedule(request):
 
         if success:
             messages.success(request, f'✅ {message}')
-            logger.info(f"Ручное обновление расписания для {group} успешно")
+            logger.info("Ручное обновление расписания для %s успешно", group)
         else:
             messages.error(request, f'❌ {message}')
-            logger.error(f"Ручное обновление расписания для {group} failed: {message}")
+            logger.error("Ручное обновление расписания для %s failed: %s", group, message)
 
     except Exception as e:
-        logger.error(f"Ошибка ручного обновления расписания: {e}")
+        logger.error("Ошибка ручного обновления расписания: %s", e)
         messages.error(request, f'❌ Ошибка обновления: {e}')
 
     return redirect('schedule')
@@ -295,20 +352,7 @@ def update_schedule(request):
 @login_required
 def tasks(request):
     """Страница заданий"""
-    tasks_data = {
-        'urgent': [
-            {'title': 'Курсовой проект', 'course': 'Веб-программирование', 'deadline': '18.12.2024',
-             'status': 'Не начато'},
-            {'title': 'Лабораторная работа #5', 'course': 'Базы данных', 'deadline': '19.12.2024',
-             'status': 'В процессе'},
-        ],
-        'active': [
-            {'title': 'Практическая работа', 'course': 'Python разработка', 'deadline': '22.12.2024',
-             'status': 'Не начато'},
-        ]
-    }
-
-    return render(request, 'main/tasks.html', {'tasks': tasks_data})
+    return render(request, 'main/tasks.html', {'tasks': task_buckets(request.user)})
 
 
 @login_required
@@ -317,45 +361,10 @@ def record_book(request):
     return render(request, 'main/record_book.html')
 
 
-def create_sample_data(user):
-    """Создание тестовых данных для нового пользователя"""
-    course1, created = Course.objects.get_or_create(
-        name='Веб-программирование',
-        defaults={'code': 'ИС-401', 'teacher': 'Иванов А.С.', 'hours': 144}
-    )
-    course2, created = Course.objects.get_or_create(
-        name='Базы данных',
-        defaults={'code': 'ИС-402', 'teacher': 'Петрова М.В.', 'hours': 120}
-    )
-    course3, created = Course.objects.get_or_create(
-        name='Python разработка',
-        defaults={'code': 'ИС-403', 'teacher': 'Сидоров П.К.', 'hours': 108}
-    )
-
-    Grade.objects.get_or_create(
-        student=user, course=course1,
-        work_type='Лабораторная работа #1', grade=5, date='2024-10-15'
-    )
-    Grade.objects.get_or_create(
-        student=user, course=course1,
-        work_type='Лабораторная работа #2', grade=5, date='2024-10-22'
-    )
-    Grade.objects.get_or_create(
-        student=user, course=course2,
-        work_type='SQL запросы', grade=5, date='2024-10-10'
-    )
-    Grade.objects.get_or_create(
-        student=user, course=course3,
-        work_type='Практическая работа', grade=4, date='2024-10-05'
-    )
-
 @login_required
 def settings(request):
     """Страница настроек"""
-    try:
-        profile = request.user.studentprofile
-    except StudentProfile.DoesNotExist:
-        profile = StudentProfile.objects.create(user=request.user)
+    profile = request.profile
 
     context = {
         'profile': profile,
@@ -364,30 +373,37 @@ def settings(request):
 
 
 @login_required
-def schedule(request):
+@read_from_replica
+@conditional_page(schedule_marker, refresh_marker)
+async def schedule(request):
+    # Асинхронное представление: пока ждем ответа ИСУ, процесс обслуживает других студентов
+    # Парсер (и весь HTTP-стек) загружается при первом обращении, а не при старте процесса
+    from .parsers import AsyncISUScheduleParser
+
     try:
-        profile = request.user.studentprofile
+        profile = await request.aprofile()
         group = profile.group
 
-        schedule_data = RealSchedule.objects.filter(group=group).order_by('day', 'time_start')
-
-        if not schedule_data.exists():
-            success, message = ISUScheduleParser.update_schedule_for_group(group)
+        lessons = RealSchedule.objects.for_institution(profile.institution).filter(group=group).order_by('day', 'time_start')
+        schedule_data = [lesson async for lesson in lessons]
+
+        # Service worker обновляет сохраненную копию страницы: без загрузки из ИСУ и чужих уведомлений
+        shell = request.headers.get('X-Schedule-Shell') == '1'
+        if not shell:
+            # Результат обновления, которое студент запустил кнопкой "Обновить"
+            finished = await sync_to_async(pop_refresh_result)(request.session)
+            if finished is not None:
+                success, message = finished
+                (messages.success if success else messages.error)(request, message)
+        if not schedule_data and not shell:
+            success, message = await AsyncISUScheduleParser.update_schedule_for_group(group, profile.institution)
             if success:
                 messages.success(request, message)
-                schedule_data = RealSchedule.objects.filter(group=group).order_by('day', 'time_start')
+                schedule_data = [lesson async for lesson in lessons.all()]
             else:
                 messages.warning(request, message)
 
-        days_order = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
-        days_schedule = {}
-
-        for day in days_order:
-            days_schedule[day] = []
-
-        for lesson in schedule_data:
-            if lesson.day in days_schedule:
-                days_schedule[lesson.day].append(lesson)
+        days_schedule = group_by_day(schedule_data)
 
         # Текущая дата и день недели
         today = datetime.now()
@@ -408,8 +424,14 @@ def schedule(request):
             'group': group,
             'current_day': current_russian_day,
             'current_week': '8',
-            'days_order': days_order
+            'days_order': DAYS_ORDER,
+            'schedule_data_loaded': bool(schedule_data),
+            'total_lessons': len(schedule_data),
+            'days_with_lessons': sum(1 for lessons in days_schedule.values() if lessons),
+            'version': lessons_version(profile.institution, group, schedule_data),
         }
+        if shell:
+            context['messages'] = []
 
     except StudentProfile.DoesNotExist:
         messages.error(request, 'Профиль студента не найден')
@@ -428,76 +450,178 @@ def schedule(request):
 
 
 @login_required
-def update_schedule(request):
-    """Ручное обновление расписания"""
-    try:
-        profile = request.user.studentprofile
-        group = profile.group
+async def update_schedule(request):
+    """Ручное обновление расписания: в фоне, не чаще паузы группы и лимита студента (main/refresh.py)"""
+    profile = await request.aprofile()
+    if not profile.group:
+        messages.error(request, 'Сначала укажите вашу учебную группу в настройках профиля')
+        return redirect('settings')
+
+    user = await request.auser()
+    result = await sync_to_async(request_refresh)(user.pk, profile.group, profile.institution)
+
+    if result.status == 'throttled':
+        response = HttpResponse(result.message, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(result.retry_after)
+        return response
+    pending = result.status in ('queued', 'running')
+    await sync_to_async(track_refresh)(request.session, profile.institution, profile.group, pending)
+    if result.status == 'cooldown':
+        messages.info(request, f'Расписание недавно обновлялось: {result.message}. '
+                               f'Повторно - через {(result.retry_after + 59) // 60} мин.')
+    elif result.status == 'done':
+        (messages.success if result.success else messages.error)(request, result.message)
+    else:
+        # Итог покажет страница расписания (pop_refresh_result); под ASGI изменения придут и событием
+        messages.info(request, f'{result.message}. Результат будет показан на странице расписания, '
+                               f'когда обновление завершится')
 
-        success, message = ISUScheduleParser.update_schedule_for_group(group)
+    return redirect('schedule')
 
-        if success:
-            messages.success(request, message)
-        else:
-            messages.error(request, message)
 
-    except Exception as e:
-        messages.error(request, f'Ошибка обновления: {e}')
+def _schedule_etag(request):
+    # Запоминаем на запросе: версия нужна и для ETag, и для тела ответа
+    if not hasattr(request, 'schedule_version'):
+        profile = request.profile
+        request.schedule_version = schedule_version(profile.institution, profile.group) if profile.group else None
+    return request.schedule_version
 
-    return redirect('schedule')
 
+@login_required
+@read_from_replica
+@condition(etag_func=_schedule_etag)
+def schedule_json(request):
+    """Неделя группы в JSON для service worker: ETag - версия расписания, повторная проверка
+    с If-None-Match стоит одного агрегирующего запроса и отвечает 304 без тела.
+    """
+    profile = request.profile
+    if not profile.group:
+        return JsonResponse({'error': 'Группа не указана'}, status=404)
+    response = JsonResponse(schedule_payload(profile.institution, profile.group, version=_schedule_etag(request)),
+                            json_dumps_params={'ensure_ascii': False})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-def create_sample_data(user):
-    """Создание тестовых данных для нового пользователя"""
-    # Создаем курсы на основе реального расписания
-    courses_data = [
-        {'name': 'Алгебра и геометрия', 'teacher': 'Белова Анна Сергеевна'},
-        {'name': 'Основы информационных технологий', 'teacher': 'Сметанина Ольга Николаевна'},
-        {'name': 'Программно-аппаратные комплексы', 'teacher': 'Костюкова Анастасия Петровна'},
-        {'name': 'Математический анализ', 'teacher': 'Кужаев Арсен Фанилевич'},
-        {'name': 'Иностранный язык', 'teacher': ''},
-        {'name': 'Физическая культура и спорт', 'teacher': ''},
-    ]
 
-    for course_data in courses_data:
-        course, created = Course.objects.get_or_create(
-            name=course_data['name'],
-            defaults={
-                'code': f"АВТО-{course_data['name'][:8]}",
-                'teacher': course_data['teacher'],
-                'hours': 36,
-                'description': f'Автоматически созданный курс'
-            }
-        )
+def service_worker(request):
+    """Скрипт service worker'а отдается из /dashboard/, чтобы его область охватывала страницы кабинета"""
+    response = render(request, 'main/sw.js', content_type='application/javascript; charset=utf-8')
+    patch_cache_control(response, no_cache=True)
+    return response
 
-    # Создаем тестовые оценки
-    course1 = Course.objects.get(name='Алгебра и геометрия')
-    course2 = Course.objects.get(name='Основы информационных технологий')
-    course3 = Course.objects.get(name='Программно-аппаратные комплексы')
 
-    Grade.objects.get_or_create(
-        student=user, course=course1,
-        work_type='Лабораторная работа #1', grade=5, date='2024-10-15'
-    )
-    Grade.objects.get_or_create(
-        student=user, course=course1,
-        work_type='Лабораторная работа #2', grade=5, date='2024-10-22'
-    )
-    Grade.objects.get_or_create(
-        student=user, course=course2,
-        work_type='SQL запросы', grade=5, date='2024-10-10'
-    )
-    Grade.objects.get_or_create(
-        student=user, course=course3,
-        work_type='Практическая работа', grade=4, date='2024-10-05'
-    )
+# Табло в корпусах опрашивают расписания преподавателей и аудиторий постоянно
+TIMETABLE_MAX_AGE = 30
+
+
+def _timetable_response(payload, status=200):
+    response = JsonResponse(payload, status=status, json_dumps_params={'ensure_ascii': False})
+    if status == 200:
+        patch_cache_control(response, public=True, max_age=TIMETABLE_MAX_AGE)
+    return response
+
+
+def _request_institution(request):
+    institution = request.GET.get('institution') or default_institution()
+    return institution if get_institution(institution) else None
+
+
+def _lessons_by_day(lessons):
+    return [
+        {'day': day, 'lessons': [{**lesson_payload(lesson), 'group': lesson.group} for lesson in day_lessons]}
+        for day, day_lessons in group_by_day(lessons).items()
+    ]
+
 
-    # Обновляем расписание для группы пользователя
+def teacher_timetable(request):
+    """Расписание преподавателя по всем группам (JSON, ?name=Иванов А.С.)"""
+    institution = _request_institution(request)
+    name, lessons = timetable_index(institution).teacher_lessons(request.GET.get('name', '')) if institution else (None, [])
+    if not lessons:
+        return _timetable_response({'error': 'Преподаватель не найден'}, status=404)
+    return _timetable_response({'teacher': name, 'days': _lessons_by_day(lessons)})
+
+
+def room_timetable(request, room):
+    """Занятия в аудитории за неделю (JSON)"""
+    institution = _request_institution(request)
+    name, lessons = timetable_index(institution).room_lessons(room) if institution else (None, [])
+    if not lessons:
+        return _timetable_response({'error': 'Аудитория не найдена'}, status=404)
+    return _timetable_response({'room': name, 'days': _lessons_by_day(lessons)})
+
+
+def free_rooms(request):
+    """Свободные аудитории сейчас или в ?day=Среда&time=10:00 (JSON).
+    ?week=четная|нечетная - учитывать только занятия этой недели и еженедельные
+    """
+    institution = _request_institution(request)
+    if not institution:
+        return _timetable_response({'error': 'Учебное заведение не найдено'}, status=404)
+    now = timezone.localtime()
+    day = request.GET.get('day') or (DAYS_ORDER + ['Воскресенье'])[now.weekday()]
     try:
-        group = user.studentprofile.group
-        ISUScheduleParser.update_schedule_for_group(group)
-    except:
-        pass  # Игнорируем ошибки при создании тестовых данных
+        at = datetime.strptime(request.GET['time'], '%H:%M').time() if request.GET.get('time') else now.time()
+    except ValueError:
+        return _timetable_response({'error': 'Время - в формате ЧЧ:ММ'}, status=400)
+
+    week = request.GET.get('week') or None
+    rooms = timetable_index(institution).free_rooms(day, at, week)
+    return _timetable_response({
+        'day': day,
+        'time': at.strftime('%H:%M'),
+        'week': week,
+        'rooms': [{'room': room, 'free_until': until.strftime('%H:%M') if until else None} for room, until in rooms],
+    })
+
+
+@read_from_replica
+def group_schedule_changes(request, group):
+    """Изменения расписания группы после версии ?since=N (JSON): клиент, у которого есть версия N,
+    применяет дельты по порядку вместо повторной загрузки всей недели.
+    reset - у клиента версия, которой в журнале нет: нужно загрузить расписание заново.
+    """
+    institution = _request_institution(request)
+    if not institution:
+        return _timetable_response({'error': 'Учебное заведение не найдено'}, status=404)
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        since = -1
+    if since < 0:
+        return _timetable_response({'error': 'since - номер версии, целое число от 0'}, status=400)
+
+    revision = schedule_revision(institution, group)
+    changes = [change_payload(change) for change in schedule_changes(institution, group, since)] if since < revision else []
+    return _timetable_response({
+        'group': group,
+        'since': since,
+        'revision': revision,
+        'reset': since > revision,
+        'changes': changes,
+    })
+
+
+@login_required
+async def schedule_events(request):
+    """Server-Sent Events: уведомление об изменении расписания группы студента.
+    Долгое соединение держит только ASGI; под WSGI оно заняло бы поток, поэтому отвечаем 204 -
+    браузер перестает переподключаться, страница работает как раньше.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    profile = await request.aprofile()
+    if not profile.group:
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(schedule_event_stream(profile.institution, profile.group),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 @register.filter
 def get_item(dictionary, key):
@@ -507,28 +631,19 @@ def get_item(dictionary, key):
 @login_required
 def profile_update(request):
     """Редактирование профиля с загрузкой фото"""
-    try:
-        profile = request.user.studentprofile
-    except StudentProfile.DoesNotExist:
-        profile = StudentProfile.objects.create(user=request.user)
+    profile = request.profile
 
     if request.method == 'POST':
-        print("=== DEBUG PROFILE UPDATE ===")
-        print("POST data:", request.POST)
-        print("FILES:", request.FILES)
-        print("Current avatar:", profile.avatar)
-
         form = ProfileUpdateForm(request.POST, request.FILES, instance=profile)
 
         if form.is_valid():
             profile = form.save()
-            print("Profile saved successfully")
-            print("New avatar:", profile.avatar)
-            print("Avatar URL:", profile.avatar.url if profile.avatar else "No avatar")
+            if 'avatar' in form.changed_data and profile.avatar:
+                schedule_avatar_processing(profile.pk)
             messages.success(request, 'Профиль успешно обновлен!')
             return redirect('dashboard')
         else:
-            print("Form errors:", form.errors)
+            logger.debug("Профиль %s не сохранен, ошибки в полях: %s", profile.pk, sorted(form.errors))
             messages.error(request, 'Пожалуйста, исправьте ошибки в форме.')
     else:
         form = ProfileUpdateForm(instance=profile)
@@ -570,7 +685,7 @@ def debug_schedule_api(request):
         }
 
     # Показываем существующие группы в базе
-    context['existing_groups'] = RealSchedule.objects.values_list('group', flat=True).distinct()
+    context['existing_groups'] = group_catalogue()
     context['user_group'] = request.user.studentprofile.group if hasattr(request.user, 'studentprofile') else None
 
     return render(request, 'main/debug_schedule.html', context)
@@ -579,15 +694,12 @@ def debug_schedule_api(request):
 # views.py - ДОБАВЬТЕ ЭТУ ФУНКЦИЮ
 # views.py - ОБНОВЛЕННАЯ ФУНКЦИЯ record_book
 @login_required
+@conditional_page()
 def record_book(request):
     """Страница зачётной книжки"""
     try:
-        # Получаем все семестры студента
-        record_books = RecordBook.objects.filter(student=request.user).prefetch_related('entries')
-
-        # Если нет данных, создаем демо-данные
-        if not record_books.exists():
-            record_books = create_sample_record_book_data(request.user)
+        # Получаем все семестры студента вместе с записями и дисциплинами
+        record_books = RecordBook.objects.filter(student=request.user).prefetch_related('entries__course')
 
         # Вычисляем статистику в Python
         total_subjects = 0
@@ -632,7 +744,7 @@ def record_book(request):
         }
 
     except Exception as e:
-        logger.error(f"Ошибка загрузки зачётной книжки: {e}")
+        logger.error("Ошибка загрузки зачётной книжки: %s", e)
         messages.error(request, f'Ошибка загрузки зачётной книжки: {e}')
         context = {
             'semester_stats': [],
@@ -643,4 +755,69 @@ def record_book(request):
             'completion_percentage': 0
         }
 
-    return render(request, 'main/record_book.html', context)
\ No newline at end of file
+    return render(request, 'main/record_book.html', context)
+
+
+# Файлы с хешем содержимого в имени никогда не меняются
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def avatar_file(request, path):
+    """Отдача аватаров без веб-сервера (SERVE_FILES); файлы из ContentHashStorage
+    кэшируются браузером навсегда. В продакшене их отдает nginx (deploy/nginx.conf)
+    """
+    response = serve(request, f'avatars/{path}', document_root=avatar_storage.location)
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
+
+
+def _encoding_qualities(accept_encoding):
+    """Accept-Encoding -> {кодировка: q}; "br;q=0" - кодировка запрещена"""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def static_file(request, path):
+    """Отдача собранной статики без веб-сервера (SERVE_FILES): предсжатые копии (.br, .gz)
+    и вечный кэш для хешированных имен. В продакшене статику отдает nginx (deploy/nginx.conf)
+    """
+    qualities = _encoding_qualities(request.headers.get('Accept-Encoding', ''))
+
+    def quality(encoding):
+        # Кодировка, которой нет в заголовке, разрешена, только если есть "*"
+        return qualities.get(encoding, qualities.get('*', 0))
+
+    served_path = path
+    # При равном q предпочитаем brotli
+    for suffix, encoding in sorted((('.br', 'br'), ('.gz', 'gzip')), key=lambda item: -quality(item[1])):
+        if quality(encoding) > 0 and os.path.exists(os.path.join(django_settings.STATIC_ROOT, path + suffix)):
+            served_path = path + suffix
+            break
+
+    response = serve(request, served_path, document_root=django_settings.STATIC_ROOT)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if is_content_addressed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
+
+
+def metrics(request):
+    """Метрики производительности в формате Prometheus (только с локальных адресов)"""
+    allowed_ips = getattr(django_settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,163 @@
+# warmup.py - ПРОГРЕВ ПРОЦЕССА ПОСЛЕ СТАРТА: ШАБЛОНЫ, ОТЛОЖЕННЫЕ ИМПОРТЫ, КАТАЛОГ ГРУПП, ГОРЯЧИЕ РАСПИСАНИЯ
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+from .institutions import default_institution, institution_choices
+from .models import RealSchedule, StudentProfile
+
+logger = logging.getLogger(__name__)
+
+# Модули, которые представления загружают при первом обращении (HTTP-стек парсера ИСУ)
+LAZY_MODULES = ['main.parsers']
+GROUP_CATALOGUE_TIMEOUT = 60 * 60
+HOT_GROUPS = 50
+
+
+def group_catalogue_key(institution):
+    return f'groups:{institution}'
+
+
+def group_catalogue(institution=None):
+    """Группы заведения, для которых загружено расписание (кэшируется)"""
+    institution = institution or default_institution()
+    key = group_catalogue_key(institution)
+    groups = cache.get(key)
+    if groups is None:
+        groups = list(
+            RealSchedule.objects.for_institution(institution)
+            .order_by('group').values_list('group', flat=True).distinct()
+        )
+        cache.set(key, groups, GROUP_CATALOGUE_TIMEOUT)
+    return groups
+
+
+def hot_groups(limit=HOT_GROUPS):
+    """Группы с наибольшим числом студентов: [(заведение, группа), ...]"""
+    rows = (
+        StudentProfile.objects.exclude(group='')
+        .values_list('institution', 'group')
+        .annotate(students=Count('pk'))
+        .order_by('-students')[:limit]
+    )
+    return [(institution, group) for institution, group, _ in rows]
+
+
+def warm_urls():
+    """Загрузить URLconf и представления, построить таблицы reverse()"""
+    resolver = get_resolver()
+    return len(resolver.reverse_dict)
+
+
+def warm_templates():
+    """Скомпилировать шаблоны проекта (в продакшене их держит cached.Loader).
+    Шаблоны сторонних приложений (admin) не трогаем - они нужны редко.
+    """
+    project_dirs = [
+        Path(app.path) / 'templates' for app in apps.get_app_configs()
+        if Path(app.path).is_relative_to(settings.BASE_DIR)
+    ]
+    count = 0
+    for engine in engines.all():
+        for directory in dict.fromkeys([*map(Path, engine.dirs), *project_dirs]):
+            for path in directory.rglob('*.html'):
+                try:
+                    engine.get_template(path.relative_to(directory).as_posix())
+                except TemplateSyntaxError as e:
+                    logger.warning("Шаблон %s не скомпилирован: %s", path, e)
+                    continue
+                count += 1
+    return count
+
+
+def warm_imports():
+    for module in LAZY_MODULES:
+        importlib.import_module(module)
+    return len(LAZY_MODULES)
+
+
+def warm_group_catalogue():
+    return sum(len(group_catalogue(slug)) for slug, _ in institution_choices())
+
+
+def warm_timetable_indexes():
+    """Построить индексы преподавателей и аудиторий (main/schedule_index.py) - табло опрашивают их сразу"""
+    from .schedule_index import timetable_index
+
+    return sum(len(timetable_index(slug).groups) for slug, _ in institution_choices())
+
+
+def warm_schedules(limit=HOT_GROUPS, fetch_missing=False):
+    """Прочитать расписания самых многочисленных групп - страницы БД попадают в кэш.
+    fetch_missing - загрузить из ИСУ расписания, которых еще нет.
+    """
+    from .jobs import ensure_group_schedule
+
+    lessons = 0
+    for institution, group in hot_groups(limit):
+        rows = len(RealSchedule.objects.for_institution(institution).filter(group=group).order_by('day', 'time_start'))
+        if not rows and fetch_missing:
+            ensure_group_schedule(group, institution)
+        lessons += rows
+    return lessons
+
+
+def warm_up(hot_groups_limit=HOT_GROUPS, fetch_missing=False):
+    """Прогреть процесс до приема запросов. Возвращает [(шаг, результат, секунды), ...]"""
+    steps = [
+        # Сначала маршруты: views.py регистрирует фильтры, нужные шаблонам
+        ('маршруты', warm_urls),
+        ('шаблоны', warm_templates),
+        ('модули', warm_imports),
+        ('каталог групп', warm_group_catalogue),
+        ('индексы преподавателей и аудиторий', warm_timetable_indexes),
+        ('горячие расписания', lambda: warm_schedules(hot_groups_limit, fetch_missing)),
+    ]
+    report = []
+    for name, step in steps:
+        started = time.perf_counter()
+        result = step()
+        report.append((name, result, time.perf_counter() - started))
+    logger.info("Прогрев завершен за %.2f с", sum(seconds for *_, seconds in report))
+    return report
+
+
+def warm_up_on_start():
+    """Вызывается из wsgi.py/asgi.py при WARMUP_ON_START = True; ошибка прогрева не мешает старту"""
+    if not getattr(settings, 'WARMUP_ON_START', False):
+        return
+
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning("Прогрев не выполнен: %s", e)
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        run()
+        return
+    # ASGI-сервер может загружать приложение внутри цикла событий, а запросы к БД
+    # из цикла запрещены - прогреваем в отдельном потоке (запросов еще нет, ждать можно)
+    def run_in_thread():
+        try:
+            run()
+        finally:
+            # Запросы этот поток не обслуживает - его соединения не должны висеть открытыми
+            connections.close_all()
+
+    thread = threading.Thread(target=run_in_thread, name='warmup')
+    thread.start()
+    thread.join()
@@ -1,5 +1,7 @@
 from pathlib import Path
+import json
 import os
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,11 +25,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.metrics.MetricsMiddleware',
+    'main.routers.PrimaryStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.StudentProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -36,7 +41,8 @@ ROOT_URLCONF = 'student.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для метрик (main/metrics.py)
+        'BACKEND': 'main.metrics.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -62,6 +68,68 @@ DATABASES = {
     }
 }
 
+# Рабочий режим SQLite: WAL (читатели не ждут синхронизацию расписания), synchronous=NORMAL
+# (в WAL безопасно), кэш 64 МБ, mmap 256 МБ, ожидание блокировки до 20 с и постоянные соединения.
+# Включен при DEBUG = False; принудительно - SQLITE_PRODUCTION=1/0. Сравнение: manage.py bench_sqlite
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION', '0' if DEBUG else '1') == '1'
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-65536;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    # Писатель сразу берет блокировку записи: без взаимных блокировок при повышении уровня
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
+if SQLITE_PRODUCTION:
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Учебные заведения (main/institutions.py). У каждого свой источник расписания (isu_base_url,
+# по умолчанию ISU_API_BASE_URL) и своя база (database) - шард с таблицей расписания.
+# Дополнительные заведения - JSON в INSTITUTIONS_JSON, например:
+# {"bsu": {"name": "БашГУ", "isu_base_url": "https://isu.example.ru/api", "database": "shard_bsu"}}
+DEFAULT_INSTITUTION = 'uust'
+INSTITUTIONS = {
+    DEFAULT_INSTITUTION: {'name': 'УУНиТ', 'database': 'default'},
+    **json.loads(os.environ.get('INSTITUTIONS_JSON', '{}')),
+}
+for _config in INSTITUTIONS.values():
+    _alias = _config.setdefault('database', 'default')
+    if _alias not in DATABASES:
+        DATABASES[_alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / f'{_alias}.sqlite3',
+            **{key: DATABASES['default'][key] for key in ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+               if key in DATABASES['default']},
+        }
+
+# Реплики только для чтения: пути к копиям базы через запятую (для SQLite - manage.py sync_replicas).
+# Представления с @read_from_replica читают с них, запись всегда идет в default (main/routers.py)
+REPLICA_DATABASES = []
+for _index, _path in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(','))):
+    REPLICA_DATABASES.append(f'replica{_index}')
+    DATABASES[f'replica{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _path,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['main.routers.ShardRouter', 'main.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает только с основной базы (отставание реплик)
+REPLICA_STICKY_SECONDS = 10
+
+
+# Пользователь сессии загружается вместе с профилем студента одним запросом (main/backends.py).
+# ModelBackend - для сессий, созданных до его появления: они остаются действительными
+AUTHENTICATION_BACKENDS = [
+    'main.backends.StudentProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -106,10 +174,25 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# В продакшене collectstatic собирает CSS/JS шаблонов (main/static) с хешем в имени и сжатыми копиями
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'main.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Настройки для медиа-файлов
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Аватары (и собранную статику) в продакшене отдает веб-сервер - sendfile, Range, предсжатые
+# копии, пример в deploy/nginx.conf. Django отдает файлы сам только при DEBUG или SERVE_FILES=1
+SERVE_FILES = os.environ.get('SERVE_FILES', '1' if DEBUG else '0') == '1'
+
 # Настройки аутентификации
 LOGIN_REDIRECT_URL = '/dashboard/'  # Куда перенаправлять после входа
 LOGOUT_REDIRECT_URL = '/'  # Куда перенаправлять после выхода
@@ -128,4 +211,91 @@ MESSAGE_TAGS = {
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Кэш: паузы и лимиты ручного обновления расписания (main/refresh.py), каталог групп, индексы.
+# По умолчанию - в памяти процесса: при нескольких рабочих процессах (gunicorn -w N, uvicorn --workers)
+# у каждого свои паузы и лимиты, а результат обновления виден только процессу, который его выполнил.
+# Такому развертыванию нужен общий кэш: REDIS_URL=redis://host:6379/0 (пакет redis);
+# manage.py check --deploy предупреждает, если его нет
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Фоновые задачи (main/jobs.py): загрузка расписания и тестовых данных после регистрации
+JOBS_WORKERS = 2
+JOBS_EAGER = False  # True - выполнять задачи сразу, без очереди
+
+# Ручное обновление расписания (main/refresh.py): пауза для группы и лимит нажатий студента
+SCHEDULE_REFRESH_COOLDOWN = 5 * 60
+SCHEDULE_REFRESH_USER_LIMIT = 5
+SCHEDULE_REFRESH_USER_WINDOW = 10 * 60
+
+# Логирование (main/logutils.py): строка сообщения + поля ключ=значение из extra.
+# INFO-сообщения обновлений расписания пишутся для доли ISU_LOG_SAMPLE_RATE операций
+# (решение принимается на операцию целиком), предупреждения и ошибки - всегда
+ISU_LOG_SAMPLE_RATE = float(os.environ.get('ISU_LOG_SAMPLE_RATE', '1' if DEBUG else '0.1'))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {'()': 'main.logutils.SamplingFilter'},
+    },
+    'formatters': {
+        'keyvalue': {
+            '()': 'main.logutils.KeyValueFormatter',
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'keyvalue',
+            'filters': ['sampling'],
+        },
+    },
+    'loggers': {
+        'main': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+if sys.argv[1:2] == ['test']:
+    # В выводе тестов - только предупреждения и ошибки
+    LOGGING['loggers']['main']['level'] = 'WARNING'
+
+# Метрики производительности (main/metrics.py): /metrics/ и лог медленных запросов
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+
+# API расписания ИСУ; для нагрузочных тестов подменяется заглушкой (manage.py loadtest --stub-isu)
+ISU_API_BASE_URL = os.environ.get('ISU_API_BASE_URL', 'https://api.schedule-uust.arpakit.com/api')
+# Одновременных запросов к ИСУ из асинхронных представлений (main.parsers.AsyncISUClient)
+ISU_POOL_SIZE = 20
+# Уведомления об изменении расписания (main/events.py, только под ASGI): keepalive-интервал потока SSE
+SSE_KEEPALIVE_SECONDS = 25
+
+# Прогрев процесса при старте WSGI/ASGI-приложения (main/warmup.py): шаблоны, парсер ИСУ,
+# каталог групп и расписания самых многочисленных групп. Вручную - manage.py warmup
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '0' if DEBUG else '1') == '1'
+
+# Версия выкладки для ETag страниц кабинета (main/freshness.py); пусто - по времени изменения шаблонов и статики
+RELEASE = os.environ.get('RELEASE', '')
+
+# Задания (main/tasks.py): окно "срочных" заданий и напоминания о дедлайнах
+TASK_URGENT_DAYS = 3
+TASK_REMINDER_HOURS = 24
+TASK_REMINDER_BATCH = 500
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
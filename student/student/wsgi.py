@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student.settings')
 
 application = get_wsgi_application()
+
+# До приема запросов: шаблоны, отложенные импорты, каталог групп, горячие расписания
+from main.warmup import warm_up_on_start  # noqa: E402
+
+warm_up_on_start()